@@ -0,0 +1,148 @@
+"""
+Analítica sobre los detalles de asientos con NumPy.
+
+Para tendencias mensuales por cuenta o por perfil no hace falta una instancia
+ni un dict por línea: las columnas (cuenta, fecha, valor con signo, perfil) se
+leen con values_list en bloques por clave primaria y se copian a arreglos
+tipados. Agrupar y pivotar es entonces un np.unique más un np.bincount sobre un
+índice fila * columnas + columna, que suma millones de líneas en milisegundos.
+"""
+import logging
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from asientos_detalle.models import AsientoDetalle
+from perfiles.models import Perfil
+from plan_cuentas.models import Cuenta
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 100_000
+AGRUPACIONES = ('cuenta', 'perfil')
+SIN_PERFIL = -1
+
+
+@dataclass(frozen=True)
+class Movimientos:
+    """Columnas de los detalles: una posición por línea"""
+    cuentas: np.ndarray    # int64, ID de la cuenta
+    dias: np.ndarray       # datetime64[D], fecha del asiento
+    valores: np.ndarray    # float64, debe - haber
+    perfiles: np.ndarray   # int32, posición en perfil_ids (SIN_PERFIL si el asiento no tiene)
+    perfil_ids: tuple
+
+    def __len__(self):
+        return len(self.valores)
+
+
+def cargar_movimientos(empresa=None, desde=None, hasta=None, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Detalles con valor de `empresa` (todas si es None) con fecha entre `desde`
+    y `hasta`, en bloques de `tamano_bloque` líneas por clave primaria: la
+    memoria de cada bloque se libera al pasarlo a arreglos.
+    """
+    consulta = AsientoDetalle.objects.filter(valor__isnull=False)
+    if empresa is not None:
+        consulta = consulta.filter(cuenta__plan_cuentas__empresa=empresa)
+    if desde is not None:
+        consulta = consulta.filter(asiento__fecha__gte=desde)
+    if hasta is not None:
+        consulta = consulta.filter(asiento__fecha__lte=hasta)
+    consulta = consulta.order_by('pk').values_list(
+        'pk', 'cuenta_id', 'asiento__fecha', 'polaridad', 'valor', 'asiento__id_perfil_id'
+    )
+
+    inicio = time.perf_counter()
+    indice_perfiles = {}
+    bloques = []
+    ultimo = None
+    while True:
+        filas = list((consulta.filter(pk__gt=ultimo) if ultimo is not None else consulta)[:tamano_bloque])
+        if not filas:
+            break
+        ultimo = filas[-1][0]
+        _, cuentas, fechas, polaridades, valores, perfiles = zip(*filas)
+        valores = np.array(valores, dtype=np.float64)
+        bloques.append((
+            np.array(cuentas, dtype=np.int64),
+            np.array(fechas, dtype='datetime64[D]'),
+            np.where(np.array(polaridades) == '+', valores, -valores),
+            np.fromiter(
+                (SIN_PERFIL if p is None else indice_perfiles.setdefault(p, len(indice_perfiles)) for p in perfiles),
+                dtype=np.int32, count=len(perfiles),
+            ),
+        ))
+        if len(filas) < tamano_bloque:
+            break
+
+    if bloques:
+        columnas = [np.concatenate(columna) for columna in zip(*bloques)]
+    else:
+        columnas = [np.empty(0, np.int64), np.empty(0, 'datetime64[D]'), np.empty(0, np.float64), np.empty(0, np.int32)]
+    movimientos = Movimientos(*columnas, perfil_ids=tuple(indice_perfiles))
+    logger.info(
+        f"{len(movimientos)} movimientos cargados en {len(bloques)} bloques en "
+        f"{(time.perf_counter() - inicio) * 1000:.0f} ms"
+    )
+    return movimientos
+
+
+def pivote(claves, columnas, valores):
+    """
+    Suma `valores` por (clave, columna). Retorna (claves distintas ordenadas,
+    columnas distintas ordenadas, matriz claves x columnas)
+    """
+    filas_unicas, fila = np.unique(claves, return_inverse=True)
+    columnas_unicas, columna = np.unique(columnas, return_inverse=True)
+    ancho = len(columnas_unicas)
+    matriz = np.bincount(
+        fila * ancho + columna, weights=valores, minlength=len(filas_unicas) * ancho
+    ).reshape(len(filas_unicas), ancho)
+    return filas_unicas, columnas_unicas, matriz
+
+
+def meses(dias):
+    """Mes (datetime64[M]) de cada fecha"""
+    return dias.astype('datetime64[M]')
+
+
+def tendencia_mensual(empresa=None, desde=None, hasta=None, por='cuenta', movimientos=None):
+    """
+    Movimiento neto (debe - haber) por mes de cada cuenta o perfil (`por`).
+    Retorna {'por', 'meses': ['AAAA-MM', ...], 'filas': [{id, nombre, valores,
+    total}]}; los meses sin movimientos en ninguna fila no aparecen.
+    """
+    if por not in AGRUPACIONES:
+        raise ValueError(f"Agrupación inválida: {por} (use {' o '.join(AGRUPACIONES)})")
+    if movimientos is None:
+        movimientos = cargar_movimientos(empresa, desde, hasta)
+
+    claves = movimientos.cuentas if por == 'cuenta' else movimientos.perfiles
+    filas, columnas, matriz = pivote(claves, meses(movimientos.dias), movimientos.valores)
+
+    if por == 'cuenta':
+        ids = [int(cuenta_id) for cuenta_id in filas]
+        nombres = {
+            cuenta_id: f"{codigo} - {descripcion}"
+            for cuenta_id, codigo, descripcion in Cuenta.objects.filter(pk__in=ids).values_list('id', 'cuenta', 'descripcion')
+        }
+    else:
+        ids = [movimientos.perfil_ids[posicion] if posicion != SIN_PERFIL else None for posicion in filas]
+        nombres = dict(Perfil.objects.filter(pk__in=[i for i in ids if i]).values_list('id', 'nombre'))
+        nombres[None] = "Sin perfil"
+
+    return {
+        'por': por,
+        'meses': [str(mes) for mes in columnas],
+        'filas': [
+            {
+                'id': fila_id,
+                'nombre': nombres.get(fila_id, str(fila_id)),
+                'valores': [round(valor, 2) for valor in valores.tolist()],
+                'total': round(float(valores.sum()), 2),
+            }
+            for fila_id, valores in zip(ids, matriz)
+        ],
+    }
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AsientosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'asientos'
+
+    def ready(self):
+        from . import signals
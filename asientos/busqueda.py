@@ -0,0 +1,281 @@
+"""
+Búsqueda de texto completo sobre los asientos.
+
+Cada asiento tiene un documento AsientoBusqueda con su descripción y la causa y
+referencia de sus detalles. En MySQL el documento tiene un índice FULLTEXT y la
+relevancia sale de MATCH…AGAINST; en SQLite (desarrollo y pruebas) una tabla
+virtual FTS5 hace de índice y la relevancia es bm25. Las señales de Asiento y
+AsientoDetalle reindexan cada asiento modificado una sola vez, al confirmar la
+transacción.
+"""
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from asientos_detalle.models import AsientoDetalle
+
+from .models import Asiento, AsientoBusqueda
+
+logger = logging.getLogger(__name__)
+
+TABLA_FTS = 'asientos_asientobusqueda_fts'
+# innodb_ft_min_token_size: InnoDB no indexa palabras más cortas
+MIN_TOKEN_MYSQL = 3
+LOTE = 500
+_TOKEN = re.compile(r'\w+')
+
+_local = threading.local()
+
+
+def _asegurar_fts():
+    """
+    Crea la tabla FTS5 si falta (las pruebas corren sin migraciones). En SQLite
+    el DDL es transaccional, así que no se recuerda entre llamadas: una
+    transacción revertida puede haberla descartado.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} "
+            "USING fts5(asiento_id UNINDEXED, texto, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+
+def componer_texto(descripcion, detalles):
+    """Texto indexado de un asiento: descripción, causas y referencias de sus detalles"""
+    partes = [descripcion]
+    for causa, referencia in detalles:
+        partes.extend((causa, referencia))
+    return ' '.join(parte.strip() for parte in partes if parte and parte.strip())
+
+
+def indexar_asientos(asiento_ids):
+    """
+    Reescribe los documentos de búsqueda de `asiento_ids`; los de asientos que
+    ya no existen se eliminan. Retorna el número de documentos escritos.
+    """
+    ids = list(dict.fromkeys(i for i in asiento_ids if i))
+    escritos = 0
+    for inicio in range(0, len(ids), LOTE):
+        lote = ids[inicio:inicio + LOTE]
+        detalles = defaultdict(list)
+        for asiento_id, causa, referencia in (
+            AsientoDetalle.objects.filter(asiento_id__in=lote)
+            .order_by('id')
+            .values_list('asiento_id', 'DetalleDeCausa', 'Referencia')
+        ):
+            detalles[asiento_id].append((causa, referencia))
+
+        documentos = [
+            AsientoBusqueda(
+                asiento_id=asiento['id'],
+                fecha=asiento['fecha'],
+                empresa_id=asiento['empresa'],
+                texto=componer_texto(asiento['descripcion'], detalles[asiento['id']]),
+            )
+            for asiento in Asiento.objects.filter(pk__in=lote).values('id', 'fecha', 'empresa', 'descripcion')
+        ]
+
+        with transaction.atomic():
+            AsientoBusqueda.objects.filter(asiento_id__in=lote).delete()
+            AsientoBusqueda.objects.bulk_create(documentos)
+            if connection.vendor == 'sqlite':
+                _asegurar_fts()
+                marcadores = ', '.join(['%s'] * len(lote))
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE asiento_id IN ({marcadores})", lote)
+                    cursor.executemany(
+                        f"INSERT INTO {TABLA_FTS} (asiento_id, texto) VALUES (%s, %s)",
+                        [(documento.asiento_id, documento.texto) for documento in documentos],
+                    )
+        escritos += len(documentos)
+    return escritos
+
+
+def reindexar_todo(lote=LOTE):
+    """Reconstruye el índice de todos los asientos. Retorna el número de documentos"""
+    if connection.vendor == 'sqlite':
+        _asegurar_fts()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS}")
+    AsientoBusqueda.objects.all().delete()
+
+    total = 0
+    ultimo = ''
+    while True:
+        ids = list(Asiento.objects.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:lote])
+        if not ids:
+            break
+        total += indexar_asientos(ids)
+        ultimo = ids[-1]
+    logger.info(f"Índice de búsqueda reconstruido: {total} asientos")
+    return total
+
+
+class _LotePendiente:
+    """Asientos por reindexar al confirmar la transacción en curso"""
+
+    def __init__(self):
+        self.ids = set()
+
+    def __call__(self):
+        if getattr(_local, 'lote', None) is self:
+            _local.lote = None
+        indexar_asientos(self.ids)
+
+
+def programar_indexacion(asiento_id):
+    """
+    Reindexa el asiento al confirmar la transacción (de inmediato fuera de una).
+    Los cambios de un asiento y sus detalles dentro de la misma transacción se
+    reindexan una sola vez, y una transacción revertida no toca el índice.
+    """
+    if not asiento_id:
+        return
+    if not connection.in_atomic_block:
+        try:
+            indexar_asientos([asiento_id])
+        except Exception:
+            logger.exception(f"No se pudo indexar el asiento {asiento_id}")
+        return
+
+    lote = getattr(_local, 'lote', None)
+    # Un rollback descarta el callback registrado: en ese caso el lote ya no sirve
+    if lote is None or not any(callback is lote for _, callback, _ in connection.run_on_commit):
+        lote = _local.lote = _LotePendiente()
+        transaction.on_commit(lote, robust=True)
+    lote.ids.add(asiento_id)
+
+
+def _tokens(texto):
+    tokens = _TOKEN.findall(texto or '')
+    if connection.vendor == 'mysql':
+        tokens = [token for token in tokens if len(token) >= MIN_TOKEN_MYSQL]
+    return tokens
+
+
+class ResultadosBusqueda:
+    """
+    Resultados de una búsqueda ordenados por relevancia (y fecha descendente),
+    consultados de a una página: soporta count() y rebanadas, así que puede
+    pasarse directamente a un Paginator. Cada Asiento trae su `puntaje`.
+    """
+
+    def __init__(self, texto, fecha_desde=None, fecha_hasta=None, empresa_id=None, cuenta_id=None, perfil_id=None):
+        self.tokens = _tokens(texto)
+        self.filtros = {
+            'fecha_desde': fecha_desde,
+            'fecha_hasta': fecha_hasta,
+            'empresa_id': empresa_id,
+            'cuenta_id': cuenta_id,
+            'perfil_id': perfil_id,
+        }
+        self._total = None
+
+    def _consulta(self):
+        """(FROM/WHERE, parámetros, expresión de puntaje, parámetros del puntaje)"""
+        q = connection.ops.quote_name
+        documentos = q(AsientoBusqueda._meta.db_table)
+        condiciones, parametros = [], []
+
+        if connection.vendor == 'mysql':
+            consulta = ' '.join(f'+{token}*' for token in self.tokens)
+            coincidencia = "MATCH(d.texto) AGAINST (%s IN BOOLEAN MODE)"
+            desde = f"FROM {documentos} d"
+            condiciones.append(coincidencia)
+            parametros.append(consulta)
+            puntaje, parametros_puntaje = coincidencia, [consulta]
+        elif connection.vendor == 'sqlite':
+            _asegurar_fts()
+            consulta = ' '.join(f'"{token}"*' for token in self.tokens)
+            desde = f"FROM {TABLA_FTS} JOIN {documentos} d ON d.asiento_id = {TABLA_FTS}.asiento_id"
+            condiciones.append(f"{TABLA_FTS} MATCH %s")
+            parametros.append(consulta)
+            puntaje, parametros_puntaje = f"-bm25({TABLA_FTS})", []
+        else:
+            desde = f"FROM {documentos} d"
+            for token in self.tokens:
+                condiciones.append("LOWER(d.texto) LIKE %s")
+                parametros.append(f"%{token.lower()}%")
+            puntaje, parametros_puntaje = "0", []
+
+        if self.filtros['fecha_desde']:
+            condiciones.append("d.fecha >= %s")
+            parametros.append(self.filtros['fecha_desde'])
+        if self.filtros['fecha_hasta']:
+            condiciones.append("d.fecha <= %s")
+            parametros.append(self.filtros['fecha_hasta'])
+        if self.filtros['empresa_id']:
+            condiciones.append("d.empresa_id = %s")
+            parametros.append(self.filtros['empresa_id'])
+        if self.filtros['cuenta_id']:
+            detalles = q(AsientoDetalle._meta.db_table)
+            condiciones.append(
+                f"EXISTS (SELECT 1 FROM {detalles} ad WHERE ad.asiento_id = d.asiento_id AND ad.cuenta_id = %s)"
+            )
+            parametros.append(self.filtros['cuenta_id'])
+        if self.filtros['perfil_id']:
+            asientos = q(Asiento._meta.db_table)
+            perfil = q(Asiento._meta.get_field('id_perfil').column)
+            condiciones.append(f"EXISTS (SELECT 1 FROM {asientos} a WHERE a.id = d.asiento_id AND a.{perfil} = %s)")
+            parametros.append(self.filtros['perfil_id'])
+
+        return f"{desde} WHERE {' AND '.join(condiciones)}", parametros, puntaje, parametros_puntaje
+
+    def count(self):
+        if self._total is None:
+            if not self.tokens:
+                self._total = 0
+            else:
+                sql, parametros, _, _ = self._consulta()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT COUNT(*) {sql}", parametros)
+                    self._total = cursor.fetchone()[0]
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def pagina(self, desplazamiento, limite):
+        """Lista de (asiento_id, puntaje) de la página pedida"""
+        if not self.tokens or limite <= 0:
+            return []
+        sql, parametros, puntaje, parametros_puntaje = self._consulta()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT d.asiento_id, {puntaje} AS puntaje {sql} "
+                "ORDER BY puntaje DESC, d.fecha DESC, d.asiento_id DESC LIMIT %s OFFSET %s",
+                parametros_puntaje + parametros + [limite, desplazamiento],
+            )
+            return cursor.fetchall()
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio = indice.start or 0
+            fin = indice.stop if indice.stop is not None else self.count()
+            filas = self.pagina(inicio, fin - inicio)
+        else:
+            filas = self.pagina(indice, 1)
+            if not filas:
+                raise IndexError(indice)
+
+        puntajes = {asiento_id: puntaje for asiento_id, puntaje in filas}
+        asientos = (
+            Asiento.objects.select_related('id_perfil', 'empresa')
+            .prefetch_related('detalles__cuenta')
+            .in_bulk(puntajes)
+        )
+        resultado = []
+        for asiento_id, puntaje in filas:
+            asiento = asientos.get(asiento_id)
+            if asiento is not None:
+                asiento.puntaje = round(float(puntaje), 4)
+                resultado.append(asiento)
+        return resultado if isinstance(indice, slice) else resultado[0]
+
+
+def buscar_asientos(texto, **filtros):
+    """Asientos que contienen todas las palabras de `texto` (por prefijo), ver ResultadosBusqueda"""
+    return ResultadosBusqueda(texto, **filtros)
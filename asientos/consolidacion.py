@@ -0,0 +1,158 @@
+"""
+Estados financieros consolidados de un grupo de empresas.
+
+Cada empresa tiene su propio plan de cuentas. Los saldos de cada una se agregan
+en paralelo (un hilo y una conexión a la base de datos por empresa) y se
+asignan a las cuentas de un plan de consolidación: por el mapeo explícito del
+código o, si no hay, por la cuenta de consolidación de código más largo que
+sea prefijo del código de la empresa (110505 -> 1105 -> 11 -> 1). Luego se
+suman y se acumulan por la jerarquía del plan de consolidación. Así el tiempo
+total se acerca al de la empresa más lenta y no a la suma de todas.
+
+Las eliminaciones de operaciones entre empresas del grupo no se calculan.
+"""
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+
+from plan_cuentas.instantaneas import instantanea_plan
+from plan_cuentas.models import PlanCuenta
+
+from .reportes import (
+    TTL_REPORTES, componer, rangos_periodos, saldos_por_cuenta, validar_periodos, version_diario,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cada hilo abre su propia conexión: no superar el límite de conexiones de la base de datos
+MAX_HILOS = getattr(settings, 'CONSOLIDACION_MAX_HILOS', 8)
+
+
+class Mapeo:
+    """Asigna los códigos de cuenta de las empresas a cuentas del plan de consolidación"""
+
+    def __init__(self, por_codigo, explicito=None):
+        self.por_codigo = por_codigo
+        self.explicito = explicito or {}
+
+    def cuenta(self, codigo):
+        """ID de la cuenta consolidada para `codigo`, o None si no tiene"""
+        destino = self.explicito.get(codigo)
+        if destino is not None:
+            return self.por_codigo.get(destino)
+        for largo in range(len(codigo), 0, -1):
+            cuenta_id = self.por_codigo.get(codigo[:largo])
+            if cuenta_id is not None:
+                return cuenta_id
+        return None
+
+
+def _saldos_empresa(empresa, rangos, mapeo):
+    """
+    Saldos propios de `empresa` por cuenta consolidada ({id: [saldos]}), las
+    cuentas sin mapeo con saldo y el tiempo que tomó, en milisegundos
+    """
+    inicio = time.perf_counter()
+    saldos = saldos_por_cuenta(empresa, rangos)
+    consolidados, sin_mapear = {}, []
+    # Códigos de las cuentas desde las instantáneas de los planes: sin releerlas si no cambiaron
+    planes = PlanCuenta.objects.filter(empresa=empresa).order_by('pk').only('id', 'version') if saldos else []
+    for plan in planes:
+        instantanea = instantanea_plan(plan)
+        for cuenta_id, codigo, descripcion in zip(instantanea.ids, instantanea.codigos, instantanea.descripciones):
+            propios = saldos.get(cuenta_id)
+            if not propios:
+                continue
+            destino = mapeo.cuenta(codigo)
+            if destino is None:
+                sin_mapear.append({
+                    'empresa': empresa.nombre,
+                    'cuenta': codigo,
+                    'descripcion': descripcion,
+                    'saldos': [round(valor, 2) for valor in propios],
+                })
+                continue
+            acumulado = consolidados.setdefault(destino, [0.0] * len(rangos))
+            consolidados[destino] = [a + b for a, b in zip(acumulado, propios)]
+    return consolidados, sin_mapear, (time.perf_counter() - inicio) * 1000
+
+
+def _en_hilo(empresa, rangos, mapeo):
+    try:
+        return _saldos_empresa(empresa, rangos, mapeo)
+    finally:
+        # Las conexiones de Django son por hilo: cerrar la de este hilo del pool
+        connections.close_all()
+
+
+def _clave(tipo, empresas, plan, periodos, mapeo, nivel_max, incluir_vacias):
+    ids = [empresa.pk for empresa in empresas]
+    planes = list(
+        PlanCuenta.objects.filter(empresa_id__in=ids + [plan.empresa_id]).order_by('pk').values_list('pk', 'version')
+    )
+    firma = repr((ids, plan.pk, planes, [p.as_dict() for p in periodos], sorted(mapeo.items()), nivel_max, incluir_vacias))
+    return f"reportes:consolidado:{tipo}:{version_diario()}:{hashlib.md5(firma.encode()).hexdigest()}"
+
+
+def consolidar(tipo, empresas, plan, periodos, mapeo=None, nivel_max=None, incluir_vacias=False, max_hilos=MAX_HILOS):
+    """
+    Reporte consolidado (`tipo` 'balance' o 'resultados') de `empresas` sobre las
+    cuentas del plan de consolidación `plan`. `mapeo` ({código de empresa:
+    código consolidado}) tiene prioridad sobre la asignación por prefijo. Las
+    cuentas con saldo que no se pueden asignar se listan en `sin_mapear`.
+    """
+    validar_periodos(periodos)
+    empresas = sorted(empresas, key=lambda empresa: empresa.pk)
+    if not empresas:
+        raise ValueError("Debe indicar al menos una empresa")
+    mapeo = mapeo or {}
+    clave = _clave(tipo, empresas, plan, periodos, mapeo, nivel_max, incluir_vacias)
+    reporte = cache.get(clave)
+    if reporte is not None:
+        return reporte
+
+    inicio = time.perf_counter()
+    columnas = len(periodos)
+    rangos = rangos_periodos(tipo, periodos)
+    consolidacion = instantanea_plan(plan)
+    asignacion = Mapeo(consolidacion.por_codigo, mapeo)
+
+    hilos = min(max_hilos, len(empresas))
+    if hilos <= 1 or connection.in_atomic_block:
+        # Dentro de una transacción las otras conexiones no verían sus cambios
+        parciales = [_saldos_empresa(empresa, rangos, asignacion) for empresa in empresas]
+    else:
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='consolidacion') as pool:
+            parciales = list(pool.map(lambda empresa: _en_hilo(empresa, rangos, asignacion), empresas))
+
+    saldos, sin_mapear, por_empresa = {}, [], []
+    for empresa, (consolidados, pendientes, milisegundos) in zip(empresas, parciales):
+        for cuenta_id, valores in consolidados.items():
+            acumulado = saldos.setdefault(cuenta_id, [0.0] * columnas)
+            saldos[cuenta_id] = [a + b for a, b in zip(acumulado, valores)]
+        sin_mapear.extend(pendientes)
+        por_empresa.append({'id': empresa.pk, 'nombre': empresa.nombre, 'ms': round(milisegundos, 1)})
+
+    secciones, totales = componer(tipo, consolidacion.filas(saldos, columnas), saldos, columnas, nivel_max, incluir_vacias)
+    reporte = {
+        'tipo': tipo,
+        'consolidado': True,
+        'plan': {'id': plan.pk, 'descripcion': plan.descripcion},
+        'empresas': por_empresa,
+        'periodos': [periodo.as_dict() for periodo in periodos],
+        'secciones': secciones,
+        'totales': totales,
+        'sin_mapear': sin_mapear,
+    }
+    cache.set(clave, reporte, TTL_REPORTES)
+    logger.info(
+        f"Consolidado {tipo} de {len(empresas)} empresas con {hilos} hilos en "
+        f"{(time.perf_counter() - inicio) * 1000:.0f} ms (empresa más lenta: "
+        f"{max(e['ms'] for e in por_empresa):.0f} ms)"
+    )
+    return reporte
@@ -0,0 +1,179 @@
+"""
+Histórico columnar de los períodos cerrados.
+
+Los movimientos de los años cerrados no cambian, pero cada reporte los vuelve a
+sumar en la base de datos. `generar_historico` guarda, por empresa, los detalles
+con fecha hasta un corte (por defecto el 31 de diciembre del año anterior) en
+archivos .npy por columna, ordenados por fecha, en ASIENTOS_HISTORICO_DIR:
+
+    <empresa_id>/<versión>/{cuentas,cuenta,dia,valor}.npy
+    <empresa_id>/actual.json    {versión, hasta, filas, generado}
+
+Los reportes abren las columnas con mmap (sin copiarlas a memoria), suman cada
+rango de fechas con un searchsorted y un bincount, y consultan en la base de
+datos solo lo posterior al corte. actual.json se reemplaza de forma atómica al
+regenerar. Cualquier escritura de asientos con fecha en o antes de un corte
+descarta el histórico de la empresa (ver descartar), así que las correcciones a
+un año ya guardado vuelven a leerse de la base de datos hasta regenerarlo. El
+directorio es local: con varios servidores debe ser un volumen compartido.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .analitica import cargar_movimientos
+
+logger = logging.getLogger(__name__)
+
+FORMATO = 1
+_abiertos = {}
+_abiertos_lock = threading.Lock()
+
+
+def directorio():
+    return Path(getattr(settings, 'ASIENTOS_HISTORICO_DIR', Path(settings.BASE_DIR) / 'historico'))
+
+
+def ultimo_corte_permitido():
+    """Último día del mes anterior: el mes en curso nunca se considera cerrado"""
+    return timezone.localdate().replace(day=1) - timedelta(days=1)
+
+
+class Historico:
+    """Columnas de los detalles de una empresa hasta `hasta`, abiertas con mmap"""
+
+    def __init__(self, ruta, hasta, version):
+        self.hasta = hasta
+        self.version = version
+        self.cuentas = np.load(ruta / 'cuentas.npy')                # int64, IDs de cuenta distintos
+        self.cuenta = np.load(ruta / 'cuenta.npy', mmap_mode='r')   # int32, posición en `cuentas`
+        self.dia = np.load(ruta / 'dia.npy', mmap_mode='r')         # datetime64[D], ordenado
+        self.valor = np.load(ruta / 'valor.npy', mmap_mode='r')     # float64, debe - haber
+
+    def __len__(self):
+        return len(self.valor)
+
+    def saldos(self, rangos):
+        """
+        {cuenta_id: [debe - haber por rango]} de las cuentas con movimientos
+        hasta el corte, como saldos_por_cuenta. Cada rango es un tramo contiguo
+        de las columnas: dos búsquedas binarias y un bincount
+        """
+        sumas = np.zeros((len(self.cuentas), len(rangos)))
+        lineas = np.zeros(len(self.cuentas), dtype=np.int64)
+        for i, (desde, hasta) in enumerate(rangos):
+            inicio = 0 if desde is None else int(np.searchsorted(self.dia, np.datetime64(desde, 'D'), 'left'))
+            fin = int(np.searchsorted(self.dia, np.datetime64(min(hasta, self.hasta), 'D'), 'right'))
+            if fin <= inicio:
+                continue
+            cuenta = self.cuenta[inicio:fin]
+            sumas[:, i] = np.bincount(cuenta, weights=self.valor[inicio:fin], minlength=len(self.cuentas))
+            lineas += np.bincount(cuenta, minlength=len(self.cuentas))
+        return {
+            int(self.cuentas[posicion]): sumas[posicion].tolist()
+            for posicion in np.flatnonzero(lineas)
+        }
+
+
+def _leer_actual(carpeta):
+    try:
+        meta = json.loads((carpeta / 'actual.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('formato') == FORMATO else None
+
+
+def abrir(empresa_id):
+    """Histórico vigente de la empresa, o None si no hay"""
+    carpeta = directorio() / str(empresa_id)
+    meta = _leer_actual(carpeta)
+    if meta is None:
+        return None
+    with _abiertos_lock:
+        historico = _abiertos.get(empresa_id)
+    if historico is not None and historico.version == meta['version']:
+        return historico
+    try:
+        historico = Historico(carpeta / meta['version'], date.fromisoformat(meta['hasta']), meta['version'])
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo abrir el histórico de la empresa {empresa_id}: {e}")
+        return None
+    with _abiertos_lock:
+        _abiertos[empresa_id] = historico
+    return historico
+
+
+def generar(empresa, hasta=None):
+    """
+    Guarda el histórico de `empresa` hasta `hasta` (por defecto el cierre del año
+    anterior) y lo deja vigente. Retorna el número de líneas guardadas
+    """
+    hasta = hasta or date(timezone.localdate().year - 1, 12, 31)
+    if hasta > ultimo_corte_permitido():
+        raise ValueError(f"El corte {hasta} no es un período cerrado (máximo {ultimo_corte_permitido()})")
+
+    inicio = time.perf_counter()
+    movimientos = cargar_movimientos(empresa, hasta=hasta)
+    orden = np.argsort(movimientos.dias, kind='stable')
+    cuentas, cuenta = np.unique(movimientos.cuentas[orden], return_inverse=True)
+
+    carpeta = directorio() / str(empresa.pk)
+    version = str(time.time_ns())
+    destino = carpeta / version
+    destino.mkdir(parents=True)
+    np.save(destino / 'cuentas.npy', cuentas.astype(np.int64))
+    np.save(destino / 'cuenta.npy', cuenta.astype(np.int32))
+    np.save(destino / 'dia.npy', movimientos.dias[orden])
+    np.save(destino / 'valor.npy', movimientos.valores[orden])
+
+    temporal = carpeta / f'actual.{version}.tmp'
+    temporal.write_text(json.dumps({
+        'formato': FORMATO,
+        'version': version,
+        'hasta': hasta.isoformat(),
+        'filas': len(movimientos),
+        'generado': timezone.now().isoformat(),
+    }), encoding='utf-8')
+    os.replace(temporal, carpeta / 'actual.json')
+
+    # Las versiones anteriores ya no están vigentes (un proceso que las tenga abiertas conserva su mmap)
+    for anterior in carpeta.iterdir():
+        if anterior.is_dir() and anterior.name != version:
+            shutil.rmtree(anterior, ignore_errors=True)
+    logger.info(
+        f"Histórico de {empresa.nombre} hasta {hasta}: {len(movimientos)} líneas en "
+        f"{(time.perf_counter() - inicio) * 1000:.0f} ms"
+    )
+    return len(movimientos)
+
+
+def descartar(fechas=None, empresa_id=None):
+    """
+    Deja sin vigencia los históricos cuyo corte cubre alguna de `fechas`, de
+    todas las empresas o solo de `empresa_id`; sin fechas, sin importar el
+    corte. Las escrituras del mes en curso no hacen más que una comparación
+    """
+    fechas = [fecha for fecha in (fechas or []) if fecha is not None]
+    if fechas and min(fechas) > ultimo_corte_permitido():
+        return
+    raiz = directorio()
+    if not raiz.is_dir():
+        return
+    carpetas = [raiz / str(empresa_id)] if empresa_id is not None else [c for c in raiz.iterdir() if c.is_dir()]
+    for carpeta in carpetas:
+        meta = _leer_actual(carpeta)
+        if meta is None:
+            continue
+        if fechas and min(fechas) > date.fromisoformat(meta['hasta']):
+            continue
+        (carpeta / 'actual.json').unlink(missing_ok=True)
+        logger.warning(f"Histórico de la empresa {carpeta.name} descartado: cambios en un período guardado")
@@ -0,0 +1,93 @@
+"""
+Claves de idempotencia para la creación de asientos.
+
+Los clientes de integración reintentan las peticiones ante cualquier error de
+red. Con una clave de idempotencia, la primera petición crea el asiento y
+guarda su respuesta en la misma transacción; las siguientes con la misma clave
+la reciben de nuevo con una sola consulta. Dos peticiones simultáneas con la
+misma clave se serializan en la restricción única (usuario, clave): la segunda
+espera a la primera y recibe su respuesta.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import ClaveIdempotencia
+
+logger = logging.getLogger(__name__)
+
+TTL_CLAVES = getattr(settings, 'ASIENTOS_IDEMPOTENCIA_TTL', 24 * 60 * 60)
+CLAVE_MAX = ClaveIdempotencia._meta.get_field('clave').max_length
+
+
+class ClaveEnConflicto(Exception):
+    """La clave ya se usó con un contenido distinto"""
+
+
+def huella(datos):
+    """SHA-256 de la representación JSON canónica de `datos`"""
+    canonico = json.dumps(datos, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonico.encode()).hexdigest()
+
+
+def _vigente(usuario, clave):
+    return ClaveIdempotencia.objects.filter(usuario=usuario, clave=clave, expira__gt=timezone.now()).first()
+
+
+def _repetir(registro, firma, clave):
+    if registro.huella != firma:
+        raise ClaveEnConflicto(f'La clave de idempotencia "{clave}" ya se usó con un contenido distinto')
+    return registro.respuesta
+
+
+def ejecutar(usuario, clave, datos, operacion):
+    """
+    Ejecuta `operacion()` una sola vez por (usuario, clave). `operacion` crea el
+    asiento y retorna (asiento, respuesta); la respuesta debe ser serializable a
+    JSON. Retorna (respuesta, repetida). Lanza ClaveEnConflicto si la clave ya
+    se usó con otros `datos`; las excepciones de `operacion` no consumen la clave.
+    """
+    clave = str(clave).strip()
+    if not clave or len(clave) > CLAVE_MAX:
+        raise ValueError(f"La clave de idempotencia debe tener entre 1 y {CLAVE_MAX} caracteres")
+    firma = huella(datos)
+
+    registro = _vigente(usuario, clave)
+    if registro is not None:
+        return _repetir(registro, firma, clave), True
+
+    try:
+        with transaction.atomic():
+            # Una clave vencida puede reutilizarse
+            ClaveIdempotencia.objects.filter(usuario=usuario, clave=clave, expira__lte=timezone.now()).delete()
+            registro = ClaveIdempotencia.objects.create(
+                usuario=usuario,
+                clave=clave,
+                huella=firma,
+                expira=timezone.now() + timedelta(seconds=TTL_CLAVES),
+            )
+            asiento, respuesta = operacion()
+            registro.asiento = asiento
+            registro.respuesta = respuesta
+            registro.save(update_fields=['asiento', 'respuesta'])
+    except IntegrityError:
+        # Otra petición con la misma clave confirmó primero
+        registro = _vigente(usuario, clave)
+        if registro is None:
+            raise
+        logger.info(f"Clave de idempotencia {clave} resuelta por una petición concurrente")
+        return _repetir(registro, firma, clave), True
+
+    return respuesta, False
+
+
+def purgar_vencidas():
+    """Elimina las claves vencidas. Retorna cuántas se eliminaron"""
+    eliminadas, _ = ClaveIdempotencia.objects.filter(expira__lte=timezone.now()).delete()
+    return eliminadas
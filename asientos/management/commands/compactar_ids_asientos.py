@@ -0,0 +1,87 @@
+"""
+Management command para migrar los IDs SHA-256 (64 caracteres) de los asientos
+existentes a IDs compactos ordenados por tiempo (ULID, 26 caracteres).
+
+El ID anterior se conserva en `Asiento.id_legacy`, de modo que los enlaces y
+referencias externas antiguas siguen resolviendo (ver get_asiento_or_404).
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, When, Value
+from django.db.models.functions import Length
+
+from asientos.busqueda import indexar_asientos
+from asientos.models import Asiento, generar_id_asiento
+from asientos_detalle.models import AsientoDetalle
+
+
+class Command(BaseCommand):
+    help = 'Reemplaza los IDs SHA-256 de los asientos por IDs compactos ordenados por tiempo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Asientos migrados por transacción (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra cuántos asientos se migrarían',
+        )
+
+    def handle(self, *args, **options):
+        pendientes = Asiento.objects.annotate(largo_id=Length('id')).filter(largo_id=64, id_legacy__isnull=True)
+        total = pendientes.count()
+        self.stdout.write(f'Asientos con ID SHA-256: {total}')
+        if options['dry_run'] or not total:
+            return
+
+        migrados = 0
+        while True:
+            lote = list(pendientes.order_by('fecha_creacion', 'id')[:options['lote']])
+            if not lote:
+                break
+            with transaction.atomic():
+                self.migrar_lote(lote)
+            migrados += len(lote)
+            self.stdout.write(f'  ✓ {migrados}/{total} asientos migrados')
+
+        # Las filas se insertaron con bulk_create (sin señales) y las antiguas se eliminaron
+        # con señales: resincronizar el contador del dashboard
+        from asientos_contables.estadisticas import recalcular, invalidar_recientes
+        recalcular('asientos')
+        invalidar_recientes()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {migrados} asientos migrados a IDs compactos'))
+
+    def migrar_lote(self, lote):
+        mapa = {}
+        nuevos = []
+        campos = [f.attname for f in Asiento._meta.concrete_fields if f.attname not in ('id', 'id_legacy')]
+        for asiento in lote:
+            momento_ms = int(asiento.fecha_creacion.timestamp() * 1000) if asiento.fecha_creacion else None
+            nuevo_id = generar_id_asiento(momento_ms)
+            mapa[asiento.id] = nuevo_id
+            nuevo = Asiento(id=nuevo_id, id_legacy=asiento.id)
+            for campo in campos:
+                setattr(nuevo, campo, getattr(asiento, campo))
+            nuevos.append(nuevo)
+
+        Asiento.objects.bulk_create(nuevos)
+
+        # bulk_create reasigna auto_now/auto_now_add: restaurar las fechas originales
+        Asiento.objects.filter(pk__in=mapa.values()).update(
+            fecha_creacion=Case(*[When(pk=mapa[a.id], then=Value(a.fecha_creacion)) for a in lote]),
+            fecha_modificacion=Case(*[When(pk=mapa[a.id], then=Value(a.fecha_modificacion)) for a in lote]),
+        )
+
+        AsientoDetalle.objects.filter(asiento_id__in=mapa.keys()).update(
+            asiento_id=Case(*[When(asiento_id=anterior, then=Value(nuevo)) for anterior, nuevo in mapa.items()])
+        )
+
+        Asiento.objects.filter(pk__in=mapa.keys()).delete()
+
+        # Los asientos nuevos no pasaron por las señales: indexarlos para la búsqueda
+        indexar_asientos(mapa.values())
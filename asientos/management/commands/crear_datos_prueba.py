@@ -227,11 +227,12 @@ class Command(BaseCommand):
             from decimal import Decimal
             
             perfil = Perfil.objects.get(empresa='DEFAULT', secuencial=1)
+            empresa = Empresa.objects.order_by('pk').first()
             
             # Asiento 1: Venta de mercancía
             asiento1 = Asiento.objects.create(
                 fecha=date.today(),
-                empresa='DEFAULT',
+                empresa=empresa,
                 id_perfil=perfil
             )
             
@@ -260,7 +261,7 @@ class Command(BaseCommand):
             # Asiento 2: Compra de inventario
             asiento2 = Asiento.objects.create(
                 fecha=date.today() - timedelta(days=1),
-                empresa='DEFAULT',
+                empresa=empresa,
                 id_perfil=perfil
             )
             
@@ -0,0 +1,104 @@
+"""
+Management command para generar los estados financieros consolidados de un
+grupo de empresas sobre un plan de consolidación.
+
+Los saldos de cada empresa se agregan en paralelo (ver asientos.consolidacion).
+El mapeo opcional es un archivo JSON {"código de la empresa": "código
+consolidado"} para las cuentas que no se asignan por prefijo del código.
+"""
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from asientos.consolidacion import MAX_HILOS, consolidar
+from asientos.reportes import GENERADORES, parse_periodo
+from empresas.models import Empresa
+from plan_cuentas.models import PlanCuenta
+
+
+class Command(BaseCommand):
+    help = 'Genera el balance general y el estado de resultados consolidados de un grupo de empresas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('plan_id', type=int, help='ID del plan de cuentas de consolidación')
+        parser.add_argument(
+            '--periodo',
+            action='append',
+            dest='periodos',
+            help='Período AAAA, AAAA-MM o AAAA-MM-DD:AAAA-MM-DD; repetir para comparar (default: mes anterior)',
+        )
+        parser.add_argument(
+            '--empresa',
+            action='append',
+            type=int,
+            dest='empresas',
+            help='ID de empresa; repetir para varias (default: todas las activas)',
+        )
+        parser.add_argument(
+            '--tipo',
+            choices=sorted(GENERADORES),
+            action='append',
+            dest='tipos',
+            help='Reporte a generar (default: todos)',
+        )
+        parser.add_argument('--mapeo', help='Archivo JSON con el mapeo explícito de códigos de cuenta')
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=MAX_HILOS,
+            help=f'Empresas agregadas en paralelo (default: {MAX_HILOS})',
+        )
+        parser.add_argument('--salida', help='Directorio donde guardar un JSON por reporte')
+
+    def handle(self, *args, **options):
+        plan = PlanCuenta.objects.filter(pk=options['plan_id']).first()
+        if plan is None:
+            raise CommandError(f"El plan de cuentas {options['plan_id']} no existe")
+
+        textos = options['periodos']
+        if not textos:
+            primero_del_mes = timezone.localdate().replace(day=1)
+            textos = [(primero_del_mes - timezone.timedelta(days=1)).strftime('%Y-%m')]
+        try:
+            periodos = [parse_periodo(texto) for texto in textos]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        mapeo = {}
+        if options['mapeo']:
+            try:
+                mapeo = json.loads(Path(options['mapeo']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer el mapeo: {e}")
+            if not isinstance(mapeo, dict):
+                raise CommandError("El mapeo debe ser un objeto JSON {código: código consolidado}")
+            mapeo = {str(origen): str(destino) for origen, destino in mapeo.items()}
+
+        if options['empresas']:
+            empresas = list(Empresa.objects.filter(pk__in=options['empresas']))
+        else:
+            empresas = list(Empresa.objects.filter(activa=True))
+        salida = Path(options['salida']) if options['salida'] else None
+        if salida:
+            salida.mkdir(parents=True, exist_ok=True)
+
+        for tipo in options['tipos'] or sorted(GENERADORES):
+            inicio = time.perf_counter()
+            try:
+                reporte = consolidar(tipo, empresas, plan, periodos, mapeo=mapeo, max_hilos=options['hilos'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            if salida:
+                archivo = salida / f"consolidado_{tipo}_{plan.pk}.json"
+                archivo.write_text(json.dumps(reporte, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2))
+            if reporte['sin_mapear']:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  {len(reporte['sin_mapear'])} cuentas con saldo sin cuenta consolidada"
+                ))
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Consolidado {tipo} de {len(empresas)} empresas en {time.perf_counter() - inicio:.2f} s"
+            ))
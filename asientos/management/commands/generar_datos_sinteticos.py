@@ -0,0 +1,70 @@
+"""
+Management command para generar volumen de datos sintético y reproducible para
+pruebas de rendimiento (ver asientos.sinteticos). A diferencia de
+crear_datos_prueba, escala a decenas de millones de líneas: todo se inserta con
+bulk_create por lotes y la misma semilla produce siempre los mismos datos.
+
+Después de generar, `reindexar_busqueda` construye el índice de búsqueda de los
+asientos nuevos (bulk_create no dispara señales).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from asientos.sinteticos import PROFUNDIDAD_MAX, TAMANO_LOTE, Parametros, generar
+
+
+class Command(BaseCommand):
+    help = 'Genera empresas, planes de cuentas, perfiles y asientos balanceados sintéticos y reproducibles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador (default: 42)')
+        parser.add_argument('--empresas', type=int, default=3, help='Empresas a crear (default: 3)')
+        parser.add_argument('--asientos', type=int, default=10_000, help='Asientos por empresa (default: 10000)')
+        parser.add_argument(
+            '--profundidad',
+            type=int,
+            default=5,
+            help=f'Niveles del plan de cuentas, 2 a {PROFUNDIDAD_MAX} (default: 5)',
+        )
+        parser.add_argument('--ramas', type=int, default=4, help='Hijas por cuenta (default: 4)')
+        parser.add_argument('--perfiles', type=int, default=4, help='Perfiles por empresa (default: 4)')
+        parser.add_argument('--desde', help='Primera fecha AAAA-MM-DD (default: 1 de enero de hace dos años)')
+        parser.add_argument('--hasta', help='Última fecha AAAA-MM-DD (default: 31 de diciembre del año anterior)')
+        parser.add_argument('--prefijo', default='SINTETICA', help='Prefijo del nombre de las empresas (default: SINTETICA)')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Asientos insertados por transacción (default: {TAMANO_LOTE})',
+        )
+
+    def handle(self, *args, **options):
+        fechas = {}
+        for nombre in ('desde', 'hasta'):
+            if options[nombre]:
+                fechas[nombre] = parse_date(options[nombre])
+                if fechas[nombre] is None:
+                    raise CommandError(f"Fecha inválida: {options[nombre]} (use AAAA-MM-DD)")
+
+        parametros = Parametros(
+            semilla=options['semilla'],
+            empresas=options['empresas'],
+            asientos=options['asientos'],
+            profundidad=options['profundidad'],
+            ramas=options['ramas'],
+            perfiles=options['perfiles'],
+            prefijo=options['prefijo'],
+            tamano_lote=max(1, options['lote']),
+            **fechas,
+        )
+        try:
+            resumen = generar(parametros, progreso=lambda texto: self.stdout.write(f'  {texto}'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resumen['empresas']} empresas, {resumen['cuentas']} cuentas, {resumen['perfiles']} perfiles, "
+            f"{resumen['asientos']} asientos y {resumen['lineas']} líneas en {resumen['segundos']:.2f} s "
+            f"(semilla {parametros.semilla})"
+        ))
+        self.stdout.write('Ejecute `python manage.py reindexar_busqueda` para indexar los asientos nuevos')
@@ -0,0 +1,65 @@
+"""
+Management command para guardar el histórico columnar de los períodos cerrados
+(ver asientos.historico). Se ejecuta tras cerrar el año, o cuando una corrección
+en un año ya guardado descartó el histórico de la empresa.
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from asientos import historico
+from empresas.models import Empresa
+
+
+class Command(BaseCommand):
+    help = 'Guarda los movimientos de los períodos cerrados en archivos columnares para los reportes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasta',
+            help='Fecha de corte AAAA-MM-DD, incluida (default: 31 de diciembre del año anterior)',
+        )
+        parser.add_argument(
+            '--empresa',
+            action='append',
+            type=int,
+            dest='empresas',
+            help='ID de empresa; repetir para varias (default: todas las activas)',
+        )
+        parser.add_argument(
+            '--descartar',
+            action='store_true',
+            help='Quitar la vigencia de los históricos en lugar de generarlos',
+        )
+
+    def handle(self, *args, **options):
+        hasta = date(timezone.localdate().year - 1, 12, 31)
+        if options['hasta']:
+            hasta = parse_date(options['hasta'])
+            if hasta is None:
+                raise CommandError(f"Fecha de corte inválida: {options['hasta']} (use AAAA-MM-DD)")
+
+        empresas = Empresa.objects.all() if options['empresas'] else Empresa.objects.filter(activa=True)
+        if options['empresas']:
+            empresas = empresas.filter(pk__in=options['empresas'])
+
+        if options['descartar']:
+            for empresa in empresas:
+                historico.descartar(empresa_id=empresa.pk)
+            self.stdout.write(self.style.SUCCESS(f'✅ Históricos descartados ({empresas.count()} empresas)'))
+            return
+
+        inicio = time.perf_counter()
+        lineas = 0
+        for empresa in empresas:
+            try:
+                lineas += historico.generar(empresa, hasta)
+            except ValueError as e:
+                raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Histórico hasta {hasta}: '
+            f'{lineas} líneas de {empresas.count()} empresas en {time.perf_counter() - inicio:.2f} s'
+        ))
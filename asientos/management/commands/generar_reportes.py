@@ -0,0 +1,81 @@
+"""
+Management command para generar los estados financieros de cierre de mes de
+todas las empresas activas (o de las indicadas) y guardarlos como JSON.
+
+Cada reporte queda además en la caché, así que las consultas posteriores desde
+la aplicación para los mismos períodos no vuelven a la base de datos.
+"""
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from asientos.reportes import GENERADORES, parse_periodo
+from empresas.models import Empresa
+
+
+class Command(BaseCommand):
+    help = 'Genera el balance general y el estado de resultados de las empresas para uno o más períodos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            action='append',
+            dest='periodos',
+            help='Período AAAA, AAAA-MM o AAAA-MM-DD:AAAA-MM-DD; repetir para comparar (default: mes anterior)',
+        )
+        parser.add_argument(
+            '--empresa',
+            action='append',
+            type=int,
+            dest='empresas',
+            help='ID de empresa; repetir para varias (default: todas las activas)',
+        )
+        parser.add_argument(
+            '--tipo',
+            choices=sorted(GENERADORES),
+            action='append',
+            dest='tipos',
+            help='Reporte a generar (default: todos)',
+        )
+        parser.add_argument(
+            '--salida',
+            help='Directorio donde guardar un JSON por empresa y reporte',
+        )
+
+    def handle(self, *args, **options):
+        textos = options['periodos']
+        if not textos:
+            primero_del_mes = timezone.localdate().replace(day=1)
+            textos = [(primero_del_mes - timezone.timedelta(days=1)).strftime('%Y-%m')]
+        try:
+            periodos = [parse_periodo(texto) for texto in textos]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        empresas = Empresa.objects.all() if options['empresas'] else Empresa.objects.filter(activa=True)
+        if options['empresas']:
+            empresas = empresas.filter(pk__in=options['empresas'])
+        tipos = options['tipos'] or sorted(GENERADORES)
+        salida = Path(options['salida']) if options['salida'] else None
+        if salida:
+            salida.mkdir(parents=True, exist_ok=True)
+
+        inicio = time.perf_counter()
+        generados = 0
+        for empresa in empresas:
+            for tipo in tipos:
+                reporte = GENERADORES[tipo](empresa, periodos)
+                generados += 1
+                if salida:
+                    archivo = salida / f"{tipo}_{empresa.pk}.json"
+                    archivo.write_text(json.dumps(reporte, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2))
+                if tipo == 'balance' and not all(reporte['totales']['cuadra']):
+                    self.stdout.write(self.style.WARNING(f'⚠️  El balance de {empresa.nombre} no cuadra'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {generados} reportes generados en {time.perf_counter() - inicio:.2f} s'
+        ))
@@ -0,0 +1,100 @@
+"""
+Management command para medir el rendimiento de las rutas críticas (ver
+asientos.rendimiento) y guardar el resultado como JSON.
+
+Mide contra la base de datos configurada, así que para comparar motores basta
+correrlo con otro DATABASE_URL (por ejemplo sqlite:///rendimiento.sqlite3 y el
+MySQL local de docker-compose). Debe ser una base de pruebas: genera y borra
+empresas con el prefijo RENDIMIENTO, así que exige --confirmar-base-de-pruebas
+y no corre si ya existen empresas con ese prefijo.
+"""
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from asientos.rendimiento import REPETICIONES, TAMANOS, comparar, ejecutar, escenarios_registrados
+
+
+class Command(BaseCommand):
+    help = 'Mide creación de asientos, vistas, APIs, matriz y reportes con datos sintéticos de varios tamaños'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamano',
+            action='append',
+            type=int,
+            dest='tamanos',
+            help=f"Asientos por empresa; repetir para varios (default: {', '.join(str(t) for t in TAMANOS)})",
+        )
+        parser.add_argument(
+            '--escenario',
+            action='append',
+            choices=escenarios_registrados(),
+            dest='escenarios',
+            help='Escenario a medir; repetir para varios (default: todos)',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=REPETICIONES,
+            help=f'Ejecuciones medidas por escenario (default: {REPETICIONES})',
+        )
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla de los datos (default: 42)')
+        parser.add_argument(
+            '--salida',
+            help='Archivo JSON (default: rendimiento/<motor>_<fecha>.json)',
+        )
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar el cambio de las medianas')
+        parser.add_argument(
+            '--confirmar-base-de-pruebas',
+            action='store_true',
+            dest='base_de_pruebas',
+            help='Confirma que la base de datos configurada es de pruebas (obligatorio)',
+        )
+        parser.add_argument(
+            '--conservar',
+            action='store_true',
+            help='No borrar los datos generados del último tamaño al terminar',
+        )
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            try:
+                anterior = json.loads(Path(options['comparar']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {e}")
+
+        salida = options['salida']
+        if salida:
+            salida = Path(salida)
+        else:
+            salida = Path('rendimiento') / f"{connection.vendor}_{timezone.now():%Y%m%d-%H%M%S}.json"
+        salida.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            resultado = ejecutar(
+                tamanos=options['tamanos'] or TAMANOS,
+                escenarios=options['escenarios'],
+                repeticiones=options['repeticiones'],
+                semilla=options['semilla'],
+                conservar=options['conservar'],
+                base_de_pruebas=options['base_de_pruebas'],
+                progreso=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        salida.write_text(json.dumps(resultado, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2), encoding='utf-8')
+        if anterior is not None:
+            for tamano, nombre, antes, ahora, cambio in comparar(resultado, anterior):
+                estilo = self.style.WARNING if cambio > 10 else self.style.SUCCESS if cambio < -10 else str
+                self.stdout.write(estilo(f"{tamano:>8} {nombre:<22} {antes:>10.1f} ms -> {ahora:>10.1f} ms ({cambio:+.1f}%)"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(len(m['escenarios']) for m in resultado['tamanos'])} mediciones en "
+            f"{resultado['base_de_datos']['motor']} guardadas en {salida}"
+        ))
@@ -0,0 +1,15 @@
+"""
+Management command para eliminar las claves de idempotencia vencidas
+(ver asientos.idempotencia). Pensado para ejecutarse periódicamente (cron).
+"""
+from django.core.management.base import BaseCommand
+
+from asientos.idempotencia import purgar_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Elimina las claves de idempotencia de asientos vencidas'
+
+    def handle(self, *args, **options):
+        eliminadas = purgar_vencidas()
+        self.stdout.write(self.style.SUCCESS(f'✅ {eliminadas} claves de idempotencia eliminadas'))
@@ -0,0 +1,34 @@
+"""
+Management command para reconstruir el índice de búsqueda de texto completo de
+los asientos (AsientoBusqueda y, en SQLite, la tabla FTS5).
+
+Las señales mantienen el índice al día; este comando sirve para la carga inicial
+después de migrar y tras operaciones masivas que no disparan señales.
+"""
+from django.core.management.base import BaseCommand
+
+from asientos.busqueda import LOTE, indexar_asientos, reindexar_todo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo de los asientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'asiento_ids',
+            nargs='*',
+            help='IDs de los asientos a reindexar (por defecto, todos)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=LOTE,
+            help=f'Asientos indexados por lote (default: {LOTE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['asiento_ids']:
+            total = indexar_asientos(options['asiento_ids'])
+        else:
+            total = reindexar_todo(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} asientos indexados'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asientos', '0007_asiento_descripcion_asiento_fecha_creacion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asiento',
+            name='id_legacy',
+            field=models.CharField(blank=True, editable=False, help_text='ID SHA-256 previo a la compactación, para resolver enlaces antiguos', max_length=64, null=True, unique=True, verbose_name='ID Anterior'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-19 12:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def crear_indice_texto(apps, schema_editor):
+    """Índice de texto completo según el motor: FULLTEXT en MySQL, tabla FTS5 en SQLite"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE asientos_asientobusqueda ADD FULLTEXT INDEX asiento_busqueda_texto_ft (texto)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS asientos_asientobusqueda_fts "
+            "USING fts5(asiento_id UNINDEXED, texto, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+
+def borrar_indice_texto(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS asientos_asientobusqueda_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asientos', '0008_asiento_id_legacy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsientoBusqueda',
+            fields=[
+                ('asiento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='documento_busqueda', serialize=False, to='asientos.asiento', verbose_name='Asiento')),
+                ('fecha', models.DateField(db_index=True, verbose_name='Fecha')),
+                ('empresa', models.CharField(db_index=True, max_length=24, verbose_name='Empresa')),
+                ('texto', models.TextField(blank=True, default='', verbose_name='Texto indexado')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Documento de Búsqueda',
+                'verbose_name_plural': 'Documentos de Búsqueda',
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, borrar_indice_texto),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-19 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('asientos', '0009_asiento_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, verbose_name='Clave')),
+                ('huella', models.CharField(help_text='SHA-256 del contenido de la petición original', max_length=64, verbose_name='Huella')),
+                ('respuesta', models.JSONField(default=dict, verbose_name='Respuesta')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('expira', models.DateTimeField(db_index=True, verbose_name='Expira')),
+                ('asiento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claves_idempotencia', to='asientos.asiento', verbose_name='Asiento')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claves_idempotencia', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Clave de Idempotencia',
+                'verbose_name_plural': 'Claves de Idempotencia',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='claveidempotencia',
+            constraint=models.UniqueConstraint(fields=('usuario', 'clave'), name='clave_idempotencia_usuario_uniq'),
+        ),
+    ]
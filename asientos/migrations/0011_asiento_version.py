@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asientos', '0010_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asiento',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Se incrementa en cada edición; las ediciones concurrentes se detectan comparándola', verbose_name='Versión'),
+        ),
+    ]
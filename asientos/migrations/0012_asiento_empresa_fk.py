@@ -0,0 +1,101 @@
+# Generated by Django 4.2 on 2026-10-19 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def vincular_empresas(apps, schema_editor):
+    """
+    Asigna la empresa de cada asiento a partir del texto anterior: por nombre o,
+    si el texto es un número, por ID. Los textos sin empresa se registran como
+    empresas nuevas para no perder la agrupación. Una actualización por valor
+    distinto, no por asiento.
+    """
+    Asiento = apps.get_model('asientos', 'Asiento')
+    AsientoDetalle = apps.get_model('asientos_detalle', 'AsientoDetalle')
+    Empresa = apps.get_model('empresas', 'Empresa')
+
+    por_nombre = {}
+    for empresa_id, nombre in Empresa.objects.order_by('-pk').values_list('pk', 'nombre'):
+        por_nombre[nombre] = empresa_id
+    ids = set(por_nombre.values())
+
+    for valor in Asiento.objects.order_by().values_list('empresa', flat=True).distinct():
+        nombre = (valor or '').strip() or 'DEFAULT'
+        empresa_id = por_nombre.get(nombre)
+        if empresa_id is None and nombre.isdigit() and int(nombre) in ids:
+            empresa_id = int(nombre)
+        if empresa_id is None:
+            empresa_id = Empresa.objects.create(
+                nombre=nombre,
+                descripcion="Creada al asignar la empresa de los asientos existentes",
+            ).pk
+            por_nombre[nombre] = empresa_id
+        Asiento.objects.filter(empresa=valor).update(empresa_ref_id=empresa_id)
+
+    # Detalles creados sin empresa porque el nombre no coincidía con ninguna
+    AsientoDetalle.objects.filter(empresa_id__isnull=True).update(
+        empresa_id=Subquery(Asiento.objects.filter(pk=OuterRef('asiento_id')).values('empresa_ref_id')[:1])
+    )
+
+
+def desvincular_empresas(apps, schema_editor):
+    Asiento = apps.get_model('asientos', 'Asiento')
+    Empresa = apps.get_model('empresas', 'Empresa')
+    for empresa_id, nombre in Empresa.objects.values_list('pk', 'nombre'):
+        Asiento.objects.filter(empresa_ref_id=empresa_id).update(empresa=nombre[:24])
+
+
+def copiar_empresa_busqueda(apps, schema_editor):
+    Asiento = apps.get_model('asientos', 'Asiento')
+    AsientoBusqueda = apps.get_model('asientos', 'AsientoBusqueda')
+    AsientoBusqueda.objects.update(
+        empresa_id=Subquery(Asiento.objects.filter(pk=OuterRef('asiento_id')).values('empresa_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asientos', '0011_asiento_version'),
+        ('asientos_detalle', '0012_alter_asientodetalle_cuenta'),
+        ('empresas', '0003_alter_empresa_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asiento',
+            name='empresa_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='empresas.empresa'),
+        ),
+        migrations.RunPython(vincular_empresas, desvincular_empresas),
+        migrations.RemoveField(
+            model_name='asiento',
+            name='empresa',
+        ),
+        migrations.RenameField(
+            model_name='asiento',
+            old_name='empresa_ref',
+            new_name='empresa',
+        ),
+        migrations.AlterField(
+            model_name='asiento',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='asientos', to='empresas.empresa', verbose_name='Empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='asiento',
+            index=models.Index(fields=['empresa', 'fecha'], name='asiento_empresa_fecha_idx'),
+        ),
+        migrations.RemoveField(
+            model_name='asientobusqueda',
+            name='empresa',
+        ),
+        migrations.AddField(
+            model_name='asientobusqueda',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='empresas.empresa', verbose_name='Empresa'),
+        ),
+        migrations.RunPython(copiar_empresa_busqueda, migrations.RunPython.noop),
+    ]
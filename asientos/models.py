@@ -1,14 +1,42 @@
 from django.db import models
 from django.conf import settings
 import uuid
-import hashlib
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from asientos_contables.ids import generar_ulid
+
+
+def generar_id_asiento(momento_ms=None):
+    """
+    Genera un ID compacto ordenado por tiempo (ULID de 26 caracteres, ver
+    asientos_contables.ids). Los inserts quedan al final del índice de InnoDB.
+    """
+    return generar_ulid(momento_ms)
+
+
 class Asiento(models.Model):
+    # IDs nuevos: ULID de 26 caracteres (generar_id_asiento). Los asientos antiguos
+    # conservan su SHA-256 de 64 caracteres hasta ejecutar `compactar_ids_asientos`
     id = models.CharField(primary_key=True, max_length=64, editable=False)
+    id_legacy = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="ID Anterior",
+        help_text="ID SHA-256 previo a la compactación, para resolver enlaces antiguos"
+    )
     fecha = models.DateField(null=False, verbose_name="Fecha")
-    empresa = models.CharField(max_length=24, default='DEFAULT', verbose_name="Empresa")
+    empresa = models.ForeignKey(
+        'empresas.Empresa',
+        on_delete=models.PROTECT,  # No permitir eliminar una empresa con asientos
+        related_name='asientos',
+        verbose_name="Empresa",
+        null=True,
+        blank=True
+    )
     id_perfil = models.ForeignKey(  # Campo ID_PERFIL según diagrama
         'perfiles.Perfil',
         on_delete=models.CASCADE,
@@ -55,11 +83,21 @@ class Asiento(models.Model):
         verbose_name="Fecha de Modificación",
         help_text="Fecha y hora de la última modificación"
     )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Versión",
+        help_text="Se incrementa en cada edición; las ediciones concurrentes se detectan comparándola"
+    )
     
     class Meta:
         verbose_name = "Asiento Contable"
         verbose_name_plural = "Asientos Contables"
         ordering = ['-fecha']
+        indexes = [
+            # Listados y reportes filtrados por empresa y rango de fechas
+            models.Index(fields=['empresa', 'fecha'], name='asiento_empresa_fecha_idx'),
+        ]
 
     @property
     def empresa_obj(self):
@@ -70,11 +108,7 @@ class Asiento(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.id:
-            # Generar ID basado en fecha y timestamp para evitar colisiones
-            import time
-            timestamp = str(int(time.time()))
-            unique_str = f"{self.fecha}-{timestamp}"
-            self.id = hashlib.sha256(unique_str.encode()).hexdigest()
+            self.id = generar_id_asiento()
 
         # Note: Balance validation is handled in views during bulk creation of details
         # Individual validation here would fail for new asientos since details
@@ -83,6 +117,81 @@ class Asiento(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        empresa_desc = self.empresa if self.empresa else "Sin Empresa"
+        empresa_desc = self.empresa.nombre if self.empresa else "Sin Empresa"
         usuario_info = f" - {self.usuario_creacion.username}" if self.usuario_creacion else ""
         return f"Asiento {empresa_desc} - {self.fecha}{usuario_info}"
+
+
+class AsientoBusqueda(models.Model):
+    """
+    Documento de búsqueda de texto completo de un asiento: su descripción más
+    la causa y la referencia de cada detalle. Se mantiene desde las señales de
+    Asiento y AsientoDetalle (ver asientos.busqueda); en MySQL `texto` tiene un
+    índice FULLTEXT.
+    """
+    asiento = models.OneToOneField(
+        Asiento,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='documento_busqueda',
+        verbose_name="Asiento"
+    )
+    fecha = models.DateField(db_index=True, verbose_name="Fecha")
+    empresa = models.ForeignKey(
+        'empresas.Empresa',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        verbose_name="Empresa",
+        null=True,
+        blank=True
+    )
+    texto = models.TextField(blank=True, default='', verbose_name="Texto indexado")
+    actualizado = models.DateTimeField(auto_now=True, verbose_name="Actualizado")
+
+    class Meta:
+        verbose_name = "Documento de Búsqueda"
+        verbose_name_plural = "Documentos de Búsqueda"
+
+    def __str__(self):
+        return f"Búsqueda {self.asiento_id}"
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Clave de idempotencia enviada por un cliente al crear asientos. La primera
+    petición con una clave guarda su respuesta; los reintentos con la misma clave
+    (y el mismo contenido) la reciben de nuevo sin crear nada hasta que vence.
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='claves_idempotencia',
+        verbose_name="Usuario"
+    )
+    clave = models.CharField(max_length=100, verbose_name="Clave")
+    huella = models.CharField(
+        max_length=64,
+        verbose_name="Huella",
+        help_text="SHA-256 del contenido de la petición original"
+    )
+    asiento = models.ForeignKey(
+        Asiento,
+        on_delete=models.SET_NULL,
+        related_name='claves_idempotencia',
+        verbose_name="Asiento",
+        null=True,
+        blank=True
+    )
+    respuesta = models.JSONField(default=dict, verbose_name="Respuesta")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    expira = models.DateTimeField(db_index=True, verbose_name="Expira")
+
+    class Meta:
+        verbose_name = "Clave de Idempotencia"
+        verbose_name_plural = "Claves de Idempotencia"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'clave'], name='clave_idempotencia_usuario_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} -> {self.asiento_id}"
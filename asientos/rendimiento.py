@@ -0,0 +1,463 @@
+"""
+Benchmarks de las rutas críticas de la contabilidad.
+
+Por cada tamaño se genera un conjunto de datos sintético y reproducible (ver
+sinteticos) y se mide cada escenario registrado con `escenario`: creación de
+asientos y lotes, carga masiva de detalles, lista y detalle de asientos, APIs de
+perfiles y cuentas, guardado y carga de la matriz segura y reportes. Los
+escenarios HTTP pasan por el cliente de pruebas de Django con todos los
+middlewares (sin el segundo factor), así que miden lo mismo que un navegador
+salvo la red. Cada escenario corre una vez sin medir (para calentar cachés y
+contar las consultas SQL) y luego `repeticiones` veces.
+
+El resultado es un dict serializable a JSON con el motor de base de datos, el
+entorno y las estadísticas en milisegundos, para comparar corridas en el tiempo
+(ver comparar). Se mide contra la base de datos configurada (DATABASE_URL), así
+que la misma corrida sirve para SQLite y para MySQL; debe ser una base de
+pruebas: no corre si ya hay empresas con el prefijo RENDIMIENTO y borra las
+que genera al terminar.
+"""
+import hashlib
+import json
+import logging
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from unittest import mock
+
+import django
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from empresas.models import Empresa
+from perfiles.models import PerfilPlanCuenta
+from plan_cuentas.models import PlanCuenta
+from secure_data import views as secure_views
+from secure_data.models import SecureDataMatrix
+
+from . import sinteticos
+from .models import Asiento
+from .reportes import invalidar_reportes
+from .services import crear_asiento
+
+logger = logging.getLogger(__name__)
+
+FORMATO = 1
+TAMANOS = (100, 1000, 10_000)   # asientos por empresa
+REPETICIONES = 5
+EMPRESAS = 2
+PREFIJO = 'RENDIMIENTO'
+USUARIO = 'rendimiento'
+MUESTRA_ASIENTOS = 200
+ASIENTOS_POR_LOTE = 100
+LINEAS_BULK = 200
+# Cada celda de la matriz deriva su clave con PBKDF2 (100k iteraciones): pocas celdas bastan
+MATRIZ_FILAS, MATRIZ_COLUMNAS = 3, 4
+CODIGO_ACCESO = 'RENDIMIENTO1'
+CLAVE_MATRIZ = 'clave-de-rendimiento'
+
+_escenarios = {}
+
+
+class ErrorEscenario(Exception):
+    """Un escenario recibió una respuesta de error: su tiempo no sería comparable"""
+
+
+def escenario(nombre):
+    """
+    Decorador que registra `func(contexto)` bajo `nombre`. La función prepara
+    una repetición (fuera de la medición) y retorna la operación a medir, sin
+    argumentos.
+    """
+    def decorator(func):
+        _escenarios[nombre] = func
+        return func
+    return decorator
+
+
+def escenarios_registrados():
+    return list(_escenarios)
+
+
+@dataclass
+class Contexto:
+    """Datos de un tamaño que comparten los escenarios"""
+    tamano: int
+    empresas: list
+    plan: PlanCuenta
+    cuentas: list          # (id, código, polaridad) de las cuentas del perfil del plan
+    asientos: list         # muestra de IDs de asientos generados
+    periodo: str           # año de los datos generados (AAAA)
+    cliente: Client
+    rng: random.Random
+
+    @property
+    def empresa(self):
+        return self.empresas[0]
+
+    @property
+    def perfil_id(self):
+        return self.plan.perfil_id
+
+    def lineas(self, pares):
+        """Líneas balanceadas: `pares` débitos, cada uno con su crédito por el mismo monto"""
+        lineas = []
+        for _ in range(pares):
+            (debe, _, _), (haber, _, _) = self.rng.sample(self.cuentas, 2)
+            monto = round(self.rng.uniform(10, 5000), 2)
+            lineas.append({'cuenta_id': debe, 'polaridad': '+', 'monto': monto})
+            lineas.append({'cuenta_id': haber, 'polaridad': '-', 'monto': monto})
+        return lineas
+
+    def asiento(self, pares=2):
+        # Fecha de hoy: el mes en curso nunca está en el histórico, así que no lo descarta
+        return {
+            'fecha': timezone.localdate().isoformat(),
+            'descripcion': 'Asiento de rendimiento',
+            'id_perfil': self.perfil_id,
+            'lineas': self.lineas(pares),
+        }
+
+
+def _verificar(response, nombre):
+    if response.status_code >= 400 or response.status_code in (301, 302):
+        raise ErrorEscenario(f"{nombre}: respuesta {response.status_code}")
+    if response.get('Content-Type', '').startswith('application/json'):
+        datos = response.json()
+        if isinstance(datos, dict) and datos.get('success') is False:
+            raise ErrorEscenario(f"{nombre}: {datos.get('error') or datos.get('errores')}")
+    return response
+
+
+def _get(contexto, nombre, url, **parametros):
+    return lambda: _verificar(contexto.cliente.get(url, parametros), nombre)
+
+
+def _post_json(contexto, nombre, url, datos):
+    cuerpo = json.dumps(datos)
+    return lambda: _verificar(contexto.cliente.post(url, cuerpo, content_type='application/json'), nombre)
+
+
+@escenario('crear_asiento')
+def _crear_asiento(contexto):
+    return _post_json(contexto, 'crear_asiento', reverse('asientos:api_crear_asiento'), contexto.asiento())
+
+
+@escenario('crear_asientos_lote')
+def _crear_asientos_lote(contexto):
+    lote = [contexto.asiento(pares=contexto.rng.randint(1, 3)) for _ in range(ASIENTOS_POR_LOTE)]
+    return _post_json(contexto, 'crear_asientos_lote', reverse('asientos:api_crear_asientos_lote'), {'asientos': lote})
+
+
+@escenario('detalles_bulk')
+def _detalles_bulk(contexto):
+    asiento = crear_asiento(contexto.asiento(pares=1))
+    codigos = {cuenta_id: codigo for cuenta_id, codigo, _ in contexto.cuentas}
+    detalles = [
+        {
+            'perfil_id': contexto.perfil_id,
+            'cuenta': codigos[linea['cuenta_id']],
+            'polaridad': linea['polaridad'],
+            'monto': linea['monto'],
+            'causa': 'Carga masiva',
+            'Referencia': f"R-{numero}",
+        }
+        for numero, linea in enumerate(contexto.lineas(LINEAS_BULK // 2), 1)
+    ]
+    datos = {'asiento_id': asiento.id, 'detalles': json.dumps(detalles)}
+    url = reverse('asientos:add_detalles_bulk')
+    return lambda: _verificar(contexto.cliente.post(url, datos), 'detalles_bulk')
+
+
+@escenario('lista_asientos')
+def _lista_asientos(contexto):
+    return _get(
+        contexto, 'lista_asientos', reverse('asientos:asiento_list'),
+        empresa=contexto.empresa.pk, page=contexto.rng.randint(1, 4),
+    )
+
+
+@escenario('detalle_asiento')
+def _detalle_asiento(contexto):
+    asiento_id = contexto.rng.choice(contexto.asientos)
+    return _get(contexto, 'detalle_asiento', reverse('asientos:asiento_detail', args=[asiento_id]))
+
+
+@escenario('api_perfil_cuentas')
+def _api_perfil_cuentas(contexto):
+    return _get(contexto, 'api_perfil_cuentas', reverse('asientos:api_perfil_cuentas', args=[contexto.perfil_id]))
+
+
+@escenario('typeahead_cuentas')
+def _typeahead_cuentas(contexto):
+    _, codigo, _ = contexto.rng.choice(contexto.cuentas)
+    return _get(
+        contexto, 'typeahead_cuentas', reverse('plan_cuentas:cuenta_typeahead', args=[contexto.plan.pk]),
+        q=codigo[:3], perfil=contexto.perfil_id,
+    )
+
+
+@escenario('matriz_guardar')
+def _matriz_guardar(contexto):
+    celdas = {
+        str(fila): {str(columna): f"{contexto.rng.randint(0, 10 ** 6):,}" for columna in range(MATRIZ_COLUMNAS)}
+        for fila in range(MATRIZ_FILAS)
+    }
+    url = reverse('secure_data:save_matrix', kwargs={'access_code': CODIGO_ACCESO})
+    return _post_json(contexto, 'matriz_guardar', url, {'matrix_data': celdas})
+
+
+@escenario('matriz_cargar')
+def _matriz_cargar(contexto):
+    url = reverse('secure_data:api_load_cells', kwargs={'access_code': CODIGO_ACCESO})
+    rango = {'start_row': 0, 'end_row': 50, 'start_col': 0, 'end_col': 26}
+    return _post_json(contexto, 'matriz_cargar', url, rango)
+
+
+@escenario('balance')
+def _balance(contexto):
+    # Sin caché: se mide el cálculo, no la lectura del reporte ya generado
+    invalidar_reportes()
+    return _get(
+        contexto, 'balance', reverse('asientos:reporte_financiero', args=['balance', contexto.empresa.pk]),
+        periodos=contexto.periodo, formato='json',
+    )
+
+
+@escenario('estado_resultados')
+def _estado_resultados(contexto):
+    invalidar_reportes()
+    meses = ','.join(f"{contexto.periodo}-{mes:02d}" for mes in range(1, 13))
+    return _get(
+        contexto, 'estado_resultados', reverse('asientos:reporte_financiero', args=['resultados', contexto.empresa.pk]),
+        periodos=meses, formato='json',
+    )
+
+
+@escenario('consolidado')
+def _consolidado(contexto):
+    invalidar_reportes()
+    return _get(
+        contexto, 'consolidado', reverse('asientos:api_reporte_consolidado', args=['balance']),
+        plan=contexto.plan.pk, empresas=','.join(str(empresa.pk) for empresa in contexto.empresas),
+        periodos=contexto.periodo,
+    )
+
+
+@escenario('tendencia_mensual')
+def _tendencia_mensual(contexto):
+    return _get(
+        contexto, 'tendencia_mensual', reverse('asientos:api_tendencia_mensual'),
+        empresa=contexto.empresa.pk, periodo=contexto.periodo,
+    )
+
+
+def resumir(tiempos):
+    """Estadísticas (ms) de una lista de tiempos en milisegundos"""
+    tiempos = np.array(tiempos)
+    return {
+        'n': len(tiempos),
+        'min_ms': round(float(tiempos.min()), 3),
+        'mediana_ms': round(float(np.median(tiempos)), 3),
+        'media_ms': round(float(tiempos.mean()), 3),
+        'p95_ms': round(float(np.percentile(tiempos, 95)), 3),
+        'max_ms': round(float(tiempos.max()), 3),
+        'desviacion_ms': round(float(tiempos.std()), 3),
+    }
+
+
+def medir(nombre, contexto, repeticiones=REPETICIONES):
+    """Estadísticas del escenario `nombre` más las consultas SQL de la ejecución sin medir"""
+    funcion = _escenarios[nombre]
+    consultas = 0
+
+    def contar(execute, sql, params, many, context):
+        nonlocal consultas
+        consultas += 1
+        return execute(sql, params, many, context)
+
+    operacion = funcion(contexto)
+    # Un contador y no connection.queries: con DEBUG el registro tiene un límite y deja de crecer
+    with connection.execute_wrapper(contar):
+        operacion()
+    tiempos = []
+    for _ in range(repeticiones):
+        operacion = funcion(contexto)
+        inicio = time.perf_counter()
+        operacion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {**resumir(tiempos), 'consultas': consultas}
+
+
+def base_de_datos():
+    return {
+        'motor': connection.vendor,
+        'version': '.'.join(str(parte) for parte in connection.get_database_version()),
+        'nombre': str(connection.settings_dict.get('NAME') or ''),
+    }
+
+
+def _commit():
+    try:
+        salida = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5, check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def entorno():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'debug': settings.DEBUG,
+        'commit': _commit(),
+    }
+
+
+def _contexto(tamano, parametros, cliente):
+    empresas = list(Empresa.objects.filter(nombre__startswith=f"{PREFIJO} ").order_by('pk'))
+    plan = PlanCuenta.objects.filter(empresa=empresas[0]).order_by('pk').first()
+    cuentas = list(
+        PerfilPlanCuenta.objects.filter(perfil_id=plan.perfil_id)
+        .order_by('cuentas_id').values_list('cuentas_id', 'cuentas_id__cuenta', 'polaridad')
+    )
+    asientos = list(
+        Asiento.objects.filter(empresa=empresas[0]).order_by('id').values_list('id', flat=True)[:MUESTRA_ASIENTOS]
+    )
+    return Contexto(
+        tamano=tamano,
+        empresas=empresas,
+        plan=plan,
+        cuentas=cuentas,
+        asientos=asientos,
+        periodo=str(parametros.hasta.year),
+        cliente=cliente,
+        rng=random.Random(f"{parametros.semilla}:rendimiento:{tamano}"),
+    )
+
+
+def _cliente(usuario):
+    cliente = Client()
+    cliente.force_login(usuario)
+    # La matriz exige haber pasado por el acceso seguro; la clave define las celdas del benchmark
+    sesion = cliente.session
+    sesion['secure_password_used'] = CLAVE_MATRIZ
+    sesion['is_decoy_mode'] = True
+    sesion.save()
+    return cliente
+
+
+def ejecutar(tamanos=TAMANOS, escenarios=None, repeticiones=REPETICIONES, semilla=42, empresas=EMPRESAS,
+             conservar=False, progreso=None, base_de_pruebas=False):
+    """
+    Mide `escenarios` (por defecto todos) sobre datos de cada uno de `tamanos`
+    (asientos por empresa). `progreso` recibe un texto por escenario medido.
+    Con `conservar` los datos del último tamaño quedan en la base de datos.
+    Escribe y borra datos, así que solo corre con `base_de_pruebas` (quien
+    llama confirma que la base de datos es de pruebas) y si no hay empresas
+    con el prefijo que no haya creado esta corrida. Retorna el resultado
+    serializable a JSON
+    """
+    if not base_de_pruebas:
+        raise ValueError(
+            f"El benchmark crea y borra datos: confirme que {base_de_datos()['nombre']} es una base de datos de pruebas"
+        )
+    if Empresa.objects.filter(nombre__startswith=f"{PREFIJO} ").exists():
+        raise ValueError(
+            f"Ya existen empresas con el prefijo {PREFIJO} (¿de una corrida con --conservar?): "
+            "bórrelas antes de medir, el benchmark no toca datos que no creó"
+        )
+    escenarios = list(escenarios or escenarios_registrados())
+    desconocidos = [nombre for nombre in escenarios if nombre not in _escenarios]
+    if desconocidos:
+        raise ValueError(f"Escenarios desconocidos: {', '.join(desconocidos)}")
+    if not tamanos or min(tamanos) < 1 or repeticiones < 1:
+        raise ValueError("Los tamaños y las repeticiones deben ser al menos 1")
+    progreso = progreso or (lambda texto: None)
+
+    resultado = {
+        'formato': FORMATO,
+        'fecha': timezone.now().isoformat(),
+        'base_de_datos': base_de_datos(),
+        'entorno': entorno(),
+        'parametros': {
+            'tamanos': list(tamanos),
+            'repeticiones': repeticiones,
+            'semilla': semilla,
+            'empresas': empresas,
+        },
+        'tamanos': [],
+    }
+    # Solo se borra al final si lo creó esta corrida: una cuenta existente con ese nombre se conserva
+    usuario, usuario_creado = get_user_model().objects.get_or_create(
+        username=USUARIO, defaults={'email': f"{USUARIO}@localhost"}
+    )
+    # El acceso a la matriz está limitado a una lista de correos: se autoriza al usuario del benchmark
+    autorizar = mock.patch.object(
+        secure_views, 'validate_user_access', lambda user: user.is_authenticated and user.pk == usuario.pk
+    )
+    # Solo se borran empresas con el prefijo después de haberlas generado aquí
+    generadas = False
+    try:
+        with override_settings(TWO_FACTOR_BYPASS=True), autorizar:
+            cliente = _cliente(usuario)
+            for tamano in tamanos:
+                if generadas:
+                    sinteticos.eliminar(PREFIJO)
+                parametros = sinteticos.Parametros(
+                    semilla=semilla, empresas=empresas, asientos=tamano, profundidad=4, perfiles=3, prefijo=PREFIJO,
+                )
+                generadas = True
+                datos = sinteticos.generar(parametros)
+                progreso(f"{tamano}: {datos['asientos']} asientos, {datos['lineas']} líneas en {datos['segundos']} s")
+                contexto = _contexto(tamano, parametros, cliente)
+                medidos = {}
+                for nombre in escenarios:
+                    medidos[nombre] = medir(nombre, contexto, repeticiones)
+                    progreso(
+                        f"{tamano} {nombre}: mediana {medidos[nombre]['mediana_ms']} ms, "
+                        f"{medidos[nombre]['consultas']} consultas"
+                    )
+                resultado['tamanos'].append({'tamano': tamano, 'datos': datos, 'escenarios': medidos})
+    finally:
+        SecureDataMatrix.objects.filter(password_hash=hashlib.sha256(CLAVE_MATRIZ.encode()).hexdigest()).delete()
+        if not conservar:
+            if generadas:
+                sinteticos.eliminar(PREFIJO)
+            if usuario_creado:
+                usuario.delete()
+    logger.info(f"Benchmark en {resultado['base_de_datos']['motor']}: {len(tamanos)} tamaños, {len(escenarios)} escenarios")
+    return resultado
+
+
+def comparar(actual, anterior):
+    """
+    Cambio de la mediana de cada escenario medido en ambas corridas:
+    [(tamaño, escenario, mediana anterior, mediana actual, cambio %)]
+    """
+    previos = {
+        (medicion['tamano'], nombre): estadisticas['mediana_ms']
+        for medicion in anterior.get('tamanos', [])
+        for nombre, estadisticas in medicion['escenarios'].items()
+    }
+    cambios = []
+    for medicion in actual['tamanos']:
+        for nombre, estadisticas in medicion['escenarios'].items():
+            antes = previos.get((medicion['tamano'], nombre))
+            if antes:
+                ahora = estadisticas['mediana_ms']
+                cambios.append((medicion['tamano'], nombre, antes, ahora, round((ahora - antes) / antes * 100, 1)))
+    return cambios
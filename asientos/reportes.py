@@ -0,0 +1,321 @@
+"""
+Estados financieros por empresa: balance general y estado de resultados.
+
+Los saldos de las cuentas con movimientos salen de una sola consulta agregada
+sobre AsientoDetalle, con una columna por período (agregación condicional), y se
+acumulan hacia las cuentas madre sobre la instantánea en memoria de cada plan
+(plan_cuentas.instantaneas), sin leer las cuentas mientras el plan no cambie. El
+grupo de cada cuenta (1=Activos … 5=Gastos) es el suyo o el de su ancestro más
+cercano que lo tenga.
+
+Los reportes se cachean por empresa, períodos y versión del diario: cualquier
+cambio en asientos o detalles genera una versión nueva (invalidar_reportes) y
+las versiones de los planes de la empresa cubren los cambios de cuentas. La
+versión del diario vive en la base de datos (una fila ContadorEstadistica), así
+que también invalida los reportes de los demás procesos aunque la caché sea
+local a cada uno (LocMemCache).
+"""
+import calendar
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+
+from asientos_contables.models import ContadorEstadistica
+from asientos_detalle.models import AsientoDetalle
+from plan_cuentas.instantaneas import instantanea_plan
+from plan_cuentas.models import PlanCuenta
+
+from . import historico
+
+logger = logging.getLogger(__name__)
+
+TTL_REPORTES = getattr(settings, 'REPORTES_TTL', 60 * 60)
+CLAVE_VERSION_DIARIO = 'reportes:version_diario'
+CONTADOR_VERSION_DIARIO = 'version_diario'
+MAX_PERIODOS = 12
+
+ACTIVOS, PASIVOS, PATRIMONIO, INGRESOS, GASTOS = 1, 2, 3, 4, 5
+NOMBRES_GRUPO = {
+    ACTIVOS: 'Activos',
+    PASIVOS: 'Pasivos',
+    PATRIMONIO: 'Patrimonio',
+    INGRESOS: 'Ingresos',
+    GASTOS: 'Gastos',
+}
+# Grupos de saldo acreedor: su saldo se presenta como haber - debe
+ACREEDORES = {PASIVOS, PATRIMONIO, INGRESOS}
+GRUPOS_BALANCE = (ACTIVOS, PASIVOS, PATRIMONIO)
+GRUPOS_RESULTADOS = (INGRESOS, GASTOS)
+
+
+@dataclass(frozen=True)
+class Periodo:
+    nombre: str
+    desde: date
+    hasta: date
+
+    def as_dict(self):
+        return {'nombre': self.nombre, 'desde': self.desde.isoformat(), 'hasta': self.hasta.isoformat()}
+
+
+def parse_periodo(texto):
+    """
+    Período a partir de 'AAAA' (año), 'AAAA-MM' (mes) o 'AAAA-MM-DD:AAAA-MM-DD'
+    (rango). Lanza ValueError si el formato no es válido.
+    """
+    texto = (texto or '').strip()
+    if ':' in texto:
+        desde, hasta = (date.fromisoformat(parte) for parte in texto.split(':', 1))
+        if desde > hasta:
+            raise ValueError(f"Período inválido: {texto}")
+        return Periodo(texto, desde, hasta)
+    partes = texto.split('-')
+    if len(partes) == 1 and len(texto) == 4 and texto.isdigit():
+        anio = int(texto)
+        return Periodo(texto, date(anio, 1, 1), date(anio, 12, 31))
+    if len(partes) == 2 and all(parte.isdigit() for parte in partes):
+        anio, mes = int(partes[0]), int(partes[1])
+        if not 1 <= mes <= 12:
+            raise ValueError(f"Período inválido: {texto}")
+        return Periodo(texto, date(anio, mes, 1), date(anio, mes, calendar.monthrange(anio, mes)[1]))
+    raise ValueError(f"Período inválido: {texto} (use AAAA, AAAA-MM o AAAA-MM-DD:AAAA-MM-DD)")
+
+
+def version_diario():
+    """
+    Versión actual del diario: cambia con cualquier escritura de asientos o
+    detalles. Combina la versión compartida (base de datos, una lectura por
+    clave única) con la de este proceso, que cubre lo escrito en una
+    transacción aún sin confirmar
+    """
+    compartida = ContadorEstadistica.objects.filter(nombre=CONTADOR_VERSION_DIARIO).values_list('valor', flat=True).first()
+    if compartida is None:
+        compartida = ContadorEstadistica.objects.get_or_create(
+            nombre=CONTADOR_VERSION_DIARIO, defaults={'valor': time.time_ns()}
+        )[0].valor
+    local = cache.get(CLAVE_VERSION_DIARIO)
+    if local is None:
+        # Si la entrada se pierde, una versión nueva no puede coincidir con claves anteriores
+        local = cache.get_or_set(CLAVE_VERSION_DIARIO, time.time_ns(), None)
+    return f"{compartida}.{local}"
+
+
+def _nueva_version():
+    cache.set(CLAVE_VERSION_DIARIO, time.time_ns(), None)
+
+
+def _nueva_version_compartida():
+    # time_ns y no F('valor') + 1: tras restaurar la base de datos o revertir
+    # una transacción, un valor ya usado no puede volver a coincidir con la caché
+    if not ContadorEstadistica.objects.filter(nombre=CONTADOR_VERSION_DIARIO).update(valor=time.time_ns()):
+        ContadorEstadistica.objects.get_or_create(nombre=CONTADOR_VERSION_DIARIO, defaults={'valor': time.time_ns()})
+
+
+def invalidar_reportes(fechas=None, **kwargs):
+    """
+    Nueva versión del diario; los reportes cacheados con la anterior dejan de
+    usarse. En este proceso el cambio es inmediato; la versión compartida con
+    los demás procesos se actualiza al confirmar la transacción (antes no verían
+    los datos nuevos, y así la fila no queda bloqueada mientras dura). `fechas`
+    son las de los asientos modificados: si caen en un período guardado en el
+    histórico, este se descarta.
+    """
+    if fechas:
+        historico.descartar(fechas)
+    _nueva_version()
+    transaction.on_commit(_nueva_version_compartida)
+
+
+def _clave(tipo, empresa, periodos, nivel_max, incluir_vacias):
+    planes = list(PlanCuenta.objects.filter(empresa=empresa).order_by('pk').values_list('pk', 'version'))
+    firma = repr((planes, [p.as_dict() for p in periodos], nivel_max, incluir_vacias))
+    return f"reportes:{tipo}:{empresa.pk}:{version_diario()}:{hashlib.md5(firma.encode()).hexdigest()}"
+
+
+def saldos_por_cuenta(empresa, rangos):
+    """
+    {cuenta_id: [debe - haber por rango]} de las cuentas con movimientos de la
+    empresa. `rangos` es una lista de (desde o None, hasta); una consulta.
+    """
+    columnas = {}
+    for i, (desde, hasta) in enumerate(rangos):
+        condicion = {'asiento__fecha__lte': hasta}
+        if desde is not None:
+            condicion['asiento__fecha__gte'] = desde
+        columnas[f'p{i}'] = Sum(
+            Case(
+                When(polaridad='+', then=F('valor'), **condicion),
+                When(polaridad='-', then=-F('valor'), **condicion),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+    filas = (
+        AsientoDetalle.objects.filter(cuenta__plan_cuentas__empresa=empresa, valor__isnull=False)
+        .filter(asiento__fecha__lte=max(hasta for _, hasta in rangos))
+        .values('cuenta_id')
+        .annotate(**columnas)
+        .order_by()
+    )
+    # Los períodos cerrados salen del histórico en disco; la base de datos solo suma lo posterior al corte
+    guardado = historico.abrir(empresa.pk)
+    if guardado is None:
+        saldos = {}
+    else:
+        saldos = guardado.saldos(rangos)
+        if max(hasta for _, hasta in rangos) <= guardado.hasta:
+            return saldos
+        filas = filas.filter(asiento__fecha__gt=guardado.hasta)
+    for fila in filas:
+        recientes = [fila[f'p{i}'] or 0.0 for i in range(len(rangos))]
+        anteriores = saldos.get(fila['cuenta_id'])
+        saldos[fila['cuenta_id']] = [a + b for a, b in zip(anteriores, recientes)] if anteriores else recientes
+    return saldos
+
+
+def _arbol(empresa, saldos, columnas):
+    """Cuentas de los planes de la empresa en preorden con sus saldos acumulados y su grupo efectivo"""
+    cuentas = []
+    for plan in PlanCuenta.objects.filter(empresa=empresa).order_by('pk').only('id', 'version'):
+        cuentas.extend(instantanea_plan(plan).filas(saldos, columnas))
+    return cuentas
+
+
+def _presentar(cuentas, saldos, grupos, columnas, nivel_max, incluir_vacias):
+    """Secciones por grupo con los saldos en su signo natural y sus totales"""
+    secciones = {grupo: {'grupo': grupo, 'nombre': NOMBRES_GRUPO[grupo], 'totales': [0.0] * columnas, 'cuentas': []}
+                 for grupo in grupos}
+    for cuenta in cuentas:
+        seccion = secciones.get(cuenta['grupo'])
+        if seccion is None:
+            continue
+        signo = -1 if cuenta['grupo'] in ACREEDORES else 1
+        valores = [round(signo * valor, 2) for valor in cuenta['saldos']]
+        # Los totales suman cada movimiento una vez: solo los saldos propios
+        propios = saldos.get(cuenta['id'])
+        if propios:
+            seccion['totales'] = [t + signo * v for t, v in zip(seccion['totales'], propios)]
+        if nivel_max and cuenta['nivel'] > nivel_max:
+            continue
+        if not incluir_vacias and not any(valores):
+            continue
+        seccion['cuentas'].append({
+            'id': cuenta['id'],
+            'cuenta': cuenta['cuenta'],
+            'descripcion': cuenta['descripcion'],
+            'nivel': cuenta['nivel'],
+            'saldos': valores,
+        })
+    for seccion in secciones.values():
+        seccion['totales'] = [round(total, 2) for total in seccion['totales']]
+    return [secciones[grupo] for grupo in grupos]
+
+
+def rangos_periodos(tipo, periodos):
+    """(desde, hasta) de cada período: el balance acumula desde el inicio, el estado de resultados no"""
+    if tipo == 'balance':
+        return [(None, periodo.hasta) for periodo in periodos]
+    return [(periodo.desde, periodo.hasta) for periodo in periodos]
+
+
+def componer(tipo, cuentas, saldos, columnas, nivel_max=None, incluir_vacias=False):
+    """
+    (secciones, totales) del reporte `tipo` a partir de las cuentas con saldos
+    acumulados (InstantaneaPlan.filas) y los saldos propios de cada cuenta
+    """
+    if tipo == 'resultados':
+        secciones = _presentar(cuentas, saldos, GRUPOS_RESULTADOS, columnas, nivel_max, incluir_vacias)
+        ingresos, gastos = (seccion['totales'] for seccion in secciones)
+        return secciones, {
+            'ingresos': ingresos,
+            'gastos': gastos,
+            'utilidad': [round(i - g, 2) for i, g in zip(ingresos, gastos)],
+        }
+
+    secciones = _presentar(cuentas, saldos, GRUPOS_BALANCE, columnas, nivel_max, incluir_vacias)
+    resultados = _presentar(cuentas, saldos, GRUPOS_RESULTADOS, columnas, 1, False)
+    activos, pasivos, patrimonio = (seccion['totales'] for seccion in secciones)
+    ingresos, gastos = (seccion['totales'] for seccion in resultados)
+    resultado = [round(i - g, 2) for i, g in zip(ingresos, gastos)]
+    pasivo_patrimonio = [round(p + q + r, 2) for p, q, r in zip(pasivos, patrimonio, resultado)]
+    return secciones, {
+        'activos': activos,
+        'pasivos': pasivos,
+        'patrimonio': patrimonio,
+        'resultados_no_cerrados': resultado,
+        'pasivo_mas_patrimonio': pasivo_patrimonio,
+        'cuadra': [abs(a - b) < 0.01 for a, b in zip(activos, pasivo_patrimonio)],
+    }
+
+
+def validar_periodos(periodos):
+    if not periodos:
+        raise ValueError("Debe indicar al menos un período")
+    if len(periodos) > MAX_PERIODOS:
+        raise ValueError(f"Se pueden comparar hasta {MAX_PERIODOS} períodos")
+
+
+def balance_general(empresa, periodos, nivel_max=None, incluir_vacias=False):
+    """
+    Balance general de `empresa` al cierre (`hasta`) de cada período, en columnas.
+    Los resultados no cerrados (ingresos - gastos acumulados) se presentan aparte
+    para que Activos = Pasivos + Patrimonio + Resultados.
+    """
+    validar_periodos(periodos)
+    clave = _clave('balance', empresa, periodos, nivel_max, incluir_vacias)
+    reporte = cache.get(clave)
+    if reporte is not None:
+        return reporte
+
+    inicio = time.perf_counter()
+    columnas = len(periodos)
+    saldos = saldos_por_cuenta(empresa, rangos_periodos('balance', periodos))
+    secciones, totales = componer('balance', _arbol(empresa, saldos, columnas), saldos, columnas, nivel_max, incluir_vacias)
+    reporte = {
+        'tipo': 'balance',
+        'empresa': {'id': empresa.pk, 'nombre': empresa.nombre},
+        'periodos': [periodo.as_dict() for periodo in periodos],
+        'secciones': secciones,
+        'totales': totales,
+    }
+    cache.set(clave, reporte, TTL_REPORTES)
+    logger.info(f"Balance general de {empresa.nombre} ({columnas} períodos) en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return reporte
+
+
+def estado_resultados(empresa, periodos, nivel_max=None, incluir_vacias=False):
+    """Estado de resultados de `empresa`: ingresos y gastos de cada período, en columnas"""
+    validar_periodos(periodos)
+    clave = _clave('resultados', empresa, periodos, nivel_max, incluir_vacias)
+    reporte = cache.get(clave)
+    if reporte is not None:
+        return reporte
+
+    inicio = time.perf_counter()
+    columnas = len(periodos)
+    saldos = saldos_por_cuenta(empresa, rangos_periodos('resultados', periodos))
+    secciones, totales = componer('resultados', _arbol(empresa, saldos, columnas), saldos, columnas, nivel_max, incluir_vacias)
+    reporte = {
+        'tipo': 'resultados',
+        'empresa': {'id': empresa.pk, 'nombre': empresa.nombre},
+        'periodos': [periodo.as_dict() for periodo in periodos],
+        'secciones': secciones,
+        'totales': totales,
+    }
+    cache.set(clave, reporte, TTL_REPORTES)
+    logger.info(f"Estado de resultados de {empresa.nombre} ({columnas} períodos) en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return reporte
+
+
+GENERADORES = {
+    'balance': balance_general,
+    'resultados': estado_resultados,
+}
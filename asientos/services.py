@@ -0,0 +1,526 @@
+"""
+Lógica de negocio de asientos compartida entre vistas, APIs y tareas en segundo plano
+"""
+import logging
+from collections import defaultdict
+from contextlib import nullcontext
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from asientos_contables.identidad import precargar, registrar, relacionado
+from asientos_detalle.models import AsientoDetalle
+from empresas.models import Empresa
+from perfiles.models import Perfil
+from plan_cuentas.models import Cuenta
+
+from . import historico
+from .busqueda import indexar_asientos, programar_indexacion
+from .models import Asiento, generar_id_asiento
+from .reportes import invalidar_reportes
+
+logger = logging.getLogger(__name__)
+
+DESCRIPCION_MAX = Asiento._meta.get_field('descripcion').max_length
+CAUSA_MAX = AsientoDetalle._meta.get_field('DetalleDeCausa').max_length
+REFERENCIA_MAX = AsientoDetalle._meta.get_field('Referencia').max_length
+POLARIDADES = {'+': '+', '-': '-', 'debe': '+', 'haber': '-'}
+# Campos de AsientoDetalle que fija una línea (nombres para bulk_update y atributos).
+# La empresa se deriva del asiento: se escribe con el resto, pero no cuenta como cambio
+CAMPOS_DETALLE = ('cuenta', 'polaridad', 'tipo_cuenta', 'valor', 'DetalleDeCausa', 'Referencia', 'empresa_id')
+CAMPOS_DETALLE_ATTR = tuple(AsientoDetalle._meta.get_field(campo).attname for campo in CAMPOS_DETALLE)
+CAMPOS_COMPARADOS = CAMPOS_DETALLE_ATTR[:-1]
+# Asientos insertados por transacción en crear_asientos_lote
+TAMANO_LOTE = 500
+
+
+class ConflictoVersion(Exception):
+    """Otro usuario modificó el asiento después de que se cargó para editarlo"""
+
+    def __init__(self, asiento_id, version_actual):
+        self.asiento_id = asiento_id
+        self.version_actual = version_actual
+        super().__init__(
+            f"El asiento {asiento_id} fue modificado por otro usuario (versión actual: {version_actual}). "
+            "Recargue el asiento y vuelva a aplicar sus cambios."
+        )
+
+
+def _incrementar_version(asiento, version_esperada=None, **campos):
+    """
+    UPDATE … SET version = version + 1 [WHERE version = `version_esperada`] con
+    los `campos` del encabezado. Lanza ConflictoVersion si la versión cambió.
+    """
+    filas = Asiento.objects.filter(pk=asiento.pk)
+    if version_esperada is not None:
+        filas = filas.filter(version=version_esperada)
+    if not filas.update(version=F('version') + 1, fecha_modificacion=timezone.now(), **campos):
+        actual = Asiento.objects.filter(pk=asiento.pk).values_list('version', flat=True).first()
+        raise ConflictoVersion(asiento.pk, actual)
+    asiento.version = (version_esperada or asiento.version) + 1
+    for campo, valor in campos.items():
+        setattr(asiento, campo, valor)
+
+
+def actualizar_asiento(asiento, version, lineas, usuario=None, **encabezado):
+    """
+    Edita el encabezado (fecha, descripcion, id_perfil_id) y las líneas de
+    `asiento` si su versión sigue siendo `version`. La comprobación es un UPDATE
+    condicional, sin bloquear el asiento mientras el usuario edita: si otro lo
+    modificó antes se lanza ConflictoVersion y no se escribe nada. Retorna el
+    resumen de sincronizar_detalles.
+    """
+    version = _entero(version)
+    if version is None:
+        raise ValidationError("Falta la versión del asiento que se está editando")
+    if 'fecha' in encabezado:
+        encabezado['fecha'] = parse_date(str(encabezado['fecha'] or ''))
+        if encabezado['fecha'] is None:
+            raise ValidationError("La fecha es obligatoria y debe tener el formato AAAA-MM-DD")
+    if usuario is not None:
+        encabezado['usuario_modificacion'] = usuario
+
+    fecha_anterior = asiento.fecha
+    try:
+        with transaction.atomic():
+            _incrementar_version(asiento, version, **encabezado)
+            resumen = sincronizar_detalles(asiento, lineas)
+    except Exception:
+        # La transacción se revirtió pero la instancia ya tenía la versión y el
+        # encabezado nuevos: se recarga para que un reintento no reciba un conflicto falso
+        asiento.refresh_from_db()
+        raise
+
+    # update() no dispara señales: la lista de recientes del dashboard muestra el encabezado
+    from asientos_contables.estadisticas import invalidar_recientes
+    invalidar_recientes()
+    # sincronizar_detalles ya cubrió la fecha nueva; la anterior también pudo estar en el histórico
+    historico.descartar([fecha_anterior])
+    return resumen
+
+
+def guardar_detalles_bulk(asiento, detalles_data):
+    """
+    Reemplaza los detalles de `asiento` por `detalles_data` (lista de dicts con
+    perfil_id, cuenta (código), polaridad, monto, causa, Referencia y opcionalmente
+    el `id` del detalle) y valida el balance. Las filas sin cuenta o con monto
+    cero se ignoran. Solo escribe las líneas que cambian (ver sincronizar_detalles). Lanza ValidationError si algún detalle es inválido
+    o el asiento no cuadra.
+    """
+    errores = []
+    detalles_data = descartar_lineas_vacias(detalles_data, campo_cuenta='cuenta')
+    perfiles = {
+        pk: perfil.nombre
+        for pk, perfil in precargar(Perfil, {str(d.get('perfil_id')) for d in detalles_data if d.get('perfil_id')}).items()
+    }
+
+    # Cuentas por código en una consulta; el mismo código puede existir en varios planes.
+    # Quedan en el mapa de identidad: sincronizar_detalles no vuelve a leerlas
+    candidatas = defaultdict(list)
+    for cuenta in registrar(Cuenta.objects.filter(
+        cuenta__in={d.get('cuenta', '') for d in detalles_data}
+    ).select_related('plan_cuentas')):
+        candidatas[cuenta.cuenta].append(cuenta)
+
+    lineas = []
+    for detalle_data in detalles_data:
+        polaridad = detalle_data.get('polaridad')
+        codigo = detalle_data.get('cuenta', '')
+        perfil_id = str(detalle_data.get('perfil_id') or '')
+        if polaridad not in ('+', '-'):
+            errores.append(f"Polaridad inválida o no especificada: {polaridad} para cuenta {codigo}")
+        if not perfil_id:
+            errores.append("Falta el ID del perfil para el detalle.")
+            continue
+        if perfil_id not in perfiles:
+            errores.append(f"El perfil con ID {perfil_id} no existe.")
+            continue
+
+        opciones = candidatas.get(codigo, [])
+        if len(opciones) > 1:
+            opciones = [c for c in opciones if c.plan_cuentas.perfil_id == perfil_id]
+        if len(opciones) != 1:
+            errores.append(f"La cuenta {codigo} no existe en el plan de cuentas (Perfil: {perfiles[perfil_id]}).")
+            continue
+
+        lineas.append({
+            'id': detalle_data.get('id'),
+            'cuenta_id': opciones[0].id,
+            'polaridad': polaridad,
+            'monto': detalle_data.get('monto', 0),
+            'causa': detalle_data.get('causa', ''),
+            'referencia': detalle_data.get('Referencia', ''),
+        })
+    if errores:
+        raise ValidationError(errores)
+
+    with transaction.atomic():
+        sincronizar_detalles(asiento, lineas)
+        # Quien esté editando el asiento con la versión anterior recibirá un conflicto
+        _incrementar_version(asiento)
+    return len(detalles_data)
+
+
+def _firma(detalle):
+    """Valores de un detalle que importan al comparar líneas"""
+    return tuple(getattr(detalle, campo) or None for campo in CAMPOS_COMPARADOS)
+
+
+def _copiar(origen, destino):
+    """Copia a `destino` los campos de `origen`; retorna True si alguno cambió"""
+    if _firma(origen) == _firma(destino):
+        return False
+    for campo in CAMPOS_DETALLE_ATTR:
+        setattr(destino, campo, getattr(origen, campo))
+    return True
+
+
+def sincronizar_detalles(asiento, lineas):
+    """
+    Deja los detalles de `asiento` iguales a `lineas` (formato de
+    preparar_asiento; cada línea puede traer el `id` del detalle que modifica)
+    escribiendo solo lo necesario, en bloque: las líneas idénticas a un detalle
+    existente no se tocan, las modificadas reutilizan detalles sobrantes con un
+    bulk_update y solo se insertan o eliminan las que faltan o sobran. Valida el
+    balance. Retorna {'insertados', 'actualizados', 'eliminados', 'sin_cambios'}.
+    """
+    if not isinstance(lineas, list):
+        raise ValidationError("Las líneas del asiento deben ser una lista")
+    cuentas = precargar(Cuenta, {
+        _entero(linea.get('cuenta_id')) for linea in lineas if isinstance(linea, dict)
+    }, select_related=('plan_cuentas',))
+    # Un asiento sin empresa toma la del plan de sus cuentas
+    empresa_nueva = None if asiento.empresa_id else empresa_de_cuentas(cuentas.values())
+    nuevos, errores = _preparar_lineas(lineas, cuentas, asiento.empresa_id or empresa_nueva)
+    if errores:
+        raise ValidationError(errores)
+
+    with transaction.atomic():
+        if empresa_nueva:
+            Asiento.objects.filter(pk=asiento.pk).update(empresa_id=empresa_nueva)
+            asiento.empresa_id = empresa_nueva
+        existentes = {
+            detalle.id: detalle
+            for detalle in AsientoDetalle.objects.select_for_update().filter(asiento=asiento).order_by('id')
+        }
+        por_actualizar = []
+        sin_cambios = 0
+
+        # 1. Líneas que indican qué detalle modifican
+        pendientes = []
+        for linea, nuevo in zip(lineas, nuevos):
+            actual = existentes.pop(_entero(linea.get('id')), None)
+            if actual is None:
+                pendientes.append(nuevo)
+            elif _copiar(nuevo, actual):
+                por_actualizar.append(actual)
+            else:
+                sin_cambios += 1
+
+        # 2. Líneas idénticas a un detalle existente: no se escriben
+        libres = defaultdict(list)
+        for detalle in existentes.values():
+            libres[_firma(detalle)].append(detalle)
+        restantes = []
+        for nuevo in pendientes:
+            iguales = libres.get(_firma(nuevo))
+            if iguales:
+                iguales.pop(0)
+                sin_cambios += 1
+            else:
+                restantes.append(nuevo)
+
+        # 3. El resto reutiliza los detalles sobrantes; solo se inserta o elimina la diferencia
+        sobrantes = sorted((detalle for grupo in libres.values() for detalle in grupo), key=lambda d: d.id)
+        for nuevo, actual in zip(restantes, sobrantes):
+            _copiar(nuevo, actual)
+            por_actualizar.append(actual)
+        insertar = restantes[len(sobrantes):]
+        eliminar = [detalle.id for detalle in sobrantes[len(restantes):]]
+
+        if por_actualizar:
+            AsientoDetalle.objects.bulk_update(por_actualizar, CAMPOS_DETALLE)
+        if insertar:
+            for detalle in insertar:
+                detalle.asiento = asiento
+            AsientoDetalle.objects.bulk_create(insertar)
+        if eliminar:
+            AsientoDetalle.objects.filter(id__in=eliminar).delete()
+
+    # bulk_update y bulk_create no disparan señales
+    programar_indexacion(asiento.id)
+    invalidar_reportes(fechas=[asiento.fecha])
+    resumen = {
+        'insertados': len(insertar),
+        'actualizados': len(por_actualizar),
+        'eliminados': len(eliminar),
+        'sin_cambios': sin_cambios,
+    }
+    logger.info(f"Detalles del asiento {asiento.id} sincronizados: {resumen}")
+    return resumen
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sin_importe(valor):
+    """True si el monto está vacío o es cero; un monto que no es número lo rechaza la validación"""
+    if valor is None or str(valor).strip() == '':
+        return True
+    try:
+        return float(valor) == 0
+    except (TypeError, ValueError):
+        return False
+
+
+def descartar_lineas_vacias(lineas, campo_cuenta='cuenta_id'):
+    """
+    Quita las filas sin cuenta o sin importe que mandan los formularios (la
+    edición siempre envía `total_detalles` filas, incluidas las vacías). Las
+    APIs no las pasan por aquí: ahí una línea así es un error
+    """
+    return [
+        linea for linea in lineas
+        if not isinstance(linea, dict) or (linea.get(campo_cuenta) and not _sin_importe(linea.get('monto')))
+    ]
+
+
+def _preparar_lineas(lineas, cuentas, empresa_id):
+    """
+    Valida las líneas de un asiento contra las cuentas ya leídas (id -> Cuenta) y
+    retorna (detalles sin guardar, errores), incluido el error de balance
+    """
+    errores = []
+    detalles = []
+    total = 0.0
+    for i, linea in enumerate(lineas, 1):
+        if not isinstance(linea, dict):
+            errores.append(f"Línea {i}: debe ser un objeto")
+            continue
+        cuenta = cuentas.get(_entero(linea.get('cuenta_id')))
+        if cuenta is None:
+            errores.append(f"Línea {i}: la cuenta {linea.get('cuenta_id')} no existe")
+        polaridad = POLARIDADES.get(str(linea.get('polaridad') or linea.get('tipo') or '').lower())
+        if polaridad is None:
+            errores.append(f"Línea {i}: polaridad inválida: {linea.get('polaridad') or linea.get('tipo')}")
+        try:
+            monto = float(linea.get('monto'))
+        except (TypeError, ValueError):
+            monto = 0.0
+        if not monto > 0:
+            errores.append(f"Línea {i}: el monto debe ser un número mayor que cero")
+        causa = str(linea.get('causa') or '')
+        referencia = str(linea.get('referencia') or '')
+        if len(causa) > CAUSA_MAX:
+            errores.append(f"Línea {i}: la causa excede {CAUSA_MAX} caracteres")
+        if len(referencia) > REFERENCIA_MAX:
+            errores.append(f"Línea {i}: la referencia excede {REFERENCIA_MAX} caracteres")
+
+        if polaridad:
+            total += monto if polaridad == '+' else -monto
+        detalles.append(AsientoDetalle(
+            cuenta=cuenta,
+            polaridad=polaridad,
+            tipo_cuenta='DEBE' if polaridad == '+' else 'HABER',
+            valor=monto,
+            DetalleDeCausa=causa,
+            Referencia=referencia,
+            empresa_id_id=empresa_id,
+        ))
+
+    if not errores and abs(total) >= 0.01:
+        errores.append(f"El asiento debe estar balanceado: la suma de débitos y créditos es {total:.2f}")
+    return detalles, errores
+
+
+def cargar_referencias(lista):
+    """
+    Cuentas, perfiles y empresas citados por los asientos de `lista` (ver
+    preparar_asiento), leídos en tres consultas para validar todos en memoria
+    """
+    cuenta_ids, perfil_ids, empresa_ids, nombres = set(), set(), set(), set()
+    for datos in lista:
+        if not isinstance(datos, dict):
+            continue
+        if datos.get('id_perfil'):
+            perfil_ids.add(str(datos['id_perfil']))
+        empresa = datos.get('empresa')
+        if _entero(empresa) is not None:
+            empresa_ids.add(_entero(empresa))
+        elif empresa:
+            nombres.add(str(empresa))
+        for linea in datos.get('lineas') or []:
+            if isinstance(linea, dict):
+                cuenta_ids.add(_entero(linea.get('cuenta_id')))
+    cuenta_ids.discard(None)
+
+    empresas = {}
+    if empresa_ids or nombres:
+        for empresa_id, nombre in (
+            Empresa.objects.filter(Q(pk__in=empresa_ids) | Q(nombre__in=nombres)).order_by('-pk').values_list('pk', 'nombre')
+        ):
+            empresas[empresa_id] = empresa_id
+            empresas[nombre] = empresa_id
+    return {
+        # El plan de cada cuenta da la empresa de los asientos que no la indican
+        'cuentas': precargar(Cuenta, cuenta_ids, select_related=('plan_cuentas',)),
+        'perfiles': set(precargar(Perfil, perfil_ids)),
+        'empresas': empresas,
+    }
+
+
+def _empresa_referida(empresa, referencias):
+    """ID de la empresa indicada por ID o por nombre, o None si no existe"""
+    if _entero(empresa) is not None:
+        return referencias['empresas'].get(_entero(empresa))
+    return referencias['empresas'].get(str(empresa))
+
+
+def empresa_de_cuentas(cuentas):
+    """Empresa del plan de la primera cuenta (objetos Cuenta), o None"""
+    for cuenta in cuentas:
+        if cuenta is not None and cuenta.plan_cuentas_id:
+            return relacionado(cuenta, 'plan_cuentas').empresa_id
+    return None
+
+
+def preparar_asiento(datos, usuario=None, referencias=None):
+    """
+    Valida en memoria un asiento recibido como JSON y retorna (asiento, detalles)
+    sin guardar. `datos`: {fecha (AAAA-MM-DD), descripcion, id_perfil, empresa
+    (ID o nombre; por defecto la del plan de las cuentas), lineas: [{cuenta_id,
+    polaridad ('+'/'-' o 'debe'/'haber'), monto, causa, referencia}]}.
+    `referencias` viene de cargar_referencias (se consulta si falta). Lanza
+    ValidationError con todos los errores encontrados.
+    """
+    if not isinstance(datos, dict):
+        raise ValidationError("El asiento debe ser un objeto JSON")
+    if referencias is None:
+        referencias = cargar_referencias([datos])
+    errores = []
+
+    fecha = parse_date(str(datos.get('fecha') or ''))
+    if fecha is None:
+        errores.append("La fecha es obligatoria y debe tener el formato AAAA-MM-DD")
+    descripcion = str(datos.get('descripcion') or '')
+    if len(descripcion) > DESCRIPCION_MAX:
+        errores.append(f"La descripción excede {DESCRIPCION_MAX} caracteres")
+    perfil_id = str(datos['id_perfil']) if datos.get('id_perfil') else None
+    if perfil_id and perfil_id not in referencias['perfiles']:
+        errores.append(f"El perfil con ID {perfil_id} no existe")
+
+    lineas = datos.get('lineas')
+    if not isinstance(lineas, list) or len(lineas) < 2:
+        raise ValidationError(errores + ["El asiento debe tener al menos dos líneas"])
+
+    cuentas = referencias['cuentas']
+    if datos.get('empresa'):
+        empresa_id = _empresa_referida(datos['empresa'], referencias)
+        if empresa_id is None:
+            errores.append(f"La empresa {datos['empresa']} no existe")
+    else:
+        empresa_id = empresa_de_cuentas(
+            cuentas.get(_entero(linea.get('cuenta_id'))) for linea in lineas if isinstance(linea, dict)
+        )
+
+    detalles, errores_lineas = _preparar_lineas(lineas, cuentas, empresa_id)
+    errores.extend(errores_lineas)
+    if errores:
+        raise ValidationError(errores)
+
+    asiento = Asiento(
+        fecha=fecha,
+        descripcion=descripcion,
+        empresa_id=empresa_id,
+        id_perfil_id=perfil_id,
+        usuario_creacion=usuario,
+    )
+    return asiento, detalles
+
+
+def crear_asiento(datos, usuario=None):
+    """
+    Crea el asiento y todas sus líneas en una transacción (ver preparar_asiento):
+    o se guarda completo o no se guarda nada. Retorna el Asiento.
+    """
+    asiento, detalles = preparar_asiento(datos, usuario)
+    with transaction.atomic():
+        asiento.save(force_insert=True)
+        for detalle in detalles:
+            detalle.asiento = asiento
+        AsientoDetalle.objects.bulk_create(detalles)
+    logger.info(f"Asiento {asiento.id} creado con {len(detalles)} líneas")
+    return asiento
+
+
+def crear_asientos_lote(lista, usuario=None, todo_o_nada=False, tamano_lote=TAMANO_LOTE):
+    """
+    Crea muchos asientos con sus líneas. Valida todos en memoria (las cuentas,
+    perfiles y empresas se leen en tres consultas) y los inserta con bulk_create
+    de encabezados y de líneas, `tamano_lote` asientos por transacción.
+
+    Retorna un resultado por asiento, en el orden recibido: {'indice', 'success',
+    'asiento_id'} o {'indice', 'success': False, 'errores'}. Los inválidos se
+    omiten; con `todo_o_nada`, si alguno es inválido no se guarda ninguno.
+    """
+    referencias = cargar_referencias(lista)
+    resultados, validos = [], []
+    for indice, datos in enumerate(lista):
+        try:
+            asiento, detalles = preparar_asiento(datos, usuario, referencias)
+        except ValidationError as e:
+            resultados.append({'indice': indice, 'success': False, 'errores': e.messages})
+            continue
+        # bulk_create no pasa por Asiento.save: asignar aquí el ULID
+        asiento.id = generar_id_asiento()
+        resultados.append({'indice': indice, 'success': True, 'asiento_id': asiento.id})
+        validos.append((indice, asiento, detalles))
+
+    if todo_o_nada and len(validos) != len(lista):
+        for resultado in resultados:
+            if resultado['success']:
+                resultado.update(success=False, errores=["No se guardó: el lote contiene asientos inválidos"])
+                del resultado['asiento_id']
+        return resultados
+
+    creados = 0
+    with transaction.atomic() if todo_o_nada else nullcontext():
+        for inicio in range(0, len(validos), tamano_lote):
+            bloque = validos[inicio:inicio + tamano_lote]
+            try:
+                with transaction.atomic():
+                    Asiento.objects.bulk_create([asiento for _, asiento, _ in bloque])
+                    lineas = []
+                    for _, asiento, detalles in bloque:
+                        for detalle in detalles:
+                            detalle.asiento = asiento
+                        lineas.extend(detalles)
+                    AsientoDetalle.objects.bulk_create(lineas, batch_size=tamano_lote * 4)
+            except DatabaseError as e:
+                if todo_o_nada:
+                    raise
+                logger.error(f"Error guardando el bloque de asientos {inicio}-{inicio + len(bloque) - 1}: {e}")
+                for indice, _, _ in bloque:
+                    resultados[indice].update(success=False, errores=[f"Error de base de datos: {e}"])
+                    del resultados[indice]['asiento_id']
+                continue
+
+            creados += len(bloque)
+            # bulk_create no dispara señales: contador del dashboard e índice de búsqueda
+            from asientos_contables.estadisticas import incrementar
+            incrementar('asientos', len(bloque))
+            indexar_asientos([asiento.id for _, asiento, _ in bloque])
+
+    if creados:
+        from asientos_contables.estadisticas import invalidar_recientes
+        invalidar_recientes()
+        invalidar_reportes(fechas=[asiento.fecha for _, asiento, _ in validos])
+    logger.info(f"Lote de asientos: {creados} creados, {len(lista) - creados} rechazados")
+    return resultados
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from asientos_detalle.models import AsientoDetalle
+
+from . import historico
+from .busqueda import programar_indexacion
+from .models import Asiento
+from .reportes import invalidar_reportes
+
+
+@receiver(pre_save, sender=Asiento)
+def asiento_por_guardar(sender, instance, raw=False, **kwargs):
+    """
+    Recordar la fecha guardada: un asiento que sale de un período del histórico
+    (por ejemplo, cambiando la fecha en el admin) también debe descartarlo
+    """
+    instance._fecha_anterior = None
+    if raw or instance._state.adding or not historico.directorio().is_dir():
+        return
+    instance._fecha_anterior = Asiento.objects.filter(pk=instance.pk).values_list('fecha', flat=True).first()
+
+
+@receiver(post_save, sender=Asiento)
+@receiver(post_delete, sender=Asiento)
+def asiento_changed(sender, instance, raw=False, **kwargs):
+    """Reindexar el asiento para la búsqueda de texto completo y descartar los reportes cacheados"""
+    if raw:
+        return
+    programar_indexacion(instance.pk)
+    invalidar_reportes(fechas=[instance.fecha, getattr(instance, '_fecha_anterior', None)])
+
+
+@receiver(post_save, sender=AsientoDetalle)
+@receiver(post_delete, sender=AsientoDetalle)
+def asiento_detalle_changed(sender, instance, raw=False, **kwargs):
+    """La causa y la referencia de los detalles forman parte del texto del asiento"""
+    if raw:
+        return
+    programar_indexacion(instance.asiento_id)
+    # La fecha del asiento solo importa si hay históricos en disco que descartar
+    fecha = None
+    if historico.directorio().is_dir():
+        fecha = Asiento.objects.filter(pk=instance.asiento_id).values_list('fecha', flat=True).first()
+    invalidar_reportes(fechas=[fecha])
@@ -0,0 +1,293 @@
+"""
+Datos sintéticos reproducibles para pruebas de rendimiento.
+
+`generar` crea empresas con un plan de cuentas profundo (cinco grupos raíz y
+`ramas` hijas por cuenta hasta `profundidad` niveles), perfiles con una parte
+de las cuentas hoja configurada, y asientos balanceados con una distribución
+realista: la mayoría de dos líneas y unos pocos de hasta veinte, montos
+log-normales, más movimiento en días hábiles y al cierre de cada mes, y pocas
+cuentas que concentran la mayoría de las líneas. Todo sale de un generador con
+semilla y el prefijo (uno por empresa, así agregar empresas no cambia las
+anteriores), de modo que la misma semilla produce los mismos datos, incluidos
+los IDs de asientos y perfiles. Los asientos se insertan con bulk_create en
+transacciones de `tamano_lote`, sin tener más de un lote en memoria.
+"""
+import calendar
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.db import transaction
+
+from asientos_contables.ids import generar_ulid
+from asientos_detalle.models import AsientoDetalle
+from empresas.models import Empresa
+from perfiles.models import Perfil, PerfilPlanCuenta
+from plan_cuentas.instantaneas import invalidar_perfil
+from plan_cuentas.models import Cuenta, PlanCuenta
+from plan_cuentas.services import cargar_cuentas
+
+from .models import Asiento
+from .reportes import invalidar_reportes
+
+logger = logging.getLogger(__name__)
+
+GRUPOS = ((1, 'Activos'), (2, 'Pasivos'), (3, 'Patrimonio'), (4, 'Ingresos'), (5, 'Gastos'))
+# Naturaleza de cada grupo para las polaridades configuradas en los perfiles
+POLARIDAD_GRUPO = {1: '+', 2: '-', 3: '-', 4: '-', 5: '+'}
+# Líneas por asiento -> peso relativo
+LINEAS_POR_ASIENTO = {2: 60, 3: 14, 4: 10, 5: 5, 6: 4, 8: 3, 12: 2, 20: 1}
+CONCEPTOS = (
+    'Venta', 'Compra', 'Nómina', 'Arriendo', 'Servicios públicos', 'Recaudo de cartera',
+    'Pago a proveedor', 'Depreciación', 'Ajuste', 'Impuestos', 'Anticipo', 'Comisiones',
+)
+PROFUNDIDAD_MAX = (Cuenta._meta.get_field('cuenta').max_length - 1) // 2 + 1
+TAMANO_LOTE = 2000
+# Los nombres de perfil (máx. 64) son «<prefijo> NNN - Perfil N»
+PREFIJO_MAX = 40
+
+
+@dataclass
+class Parametros:
+    semilla: int = 42
+    empresas: int = 3
+    asientos: int = 10_000          # por empresa
+    profundidad: int = 5
+    ramas: int = 4
+    perfiles: int = 4               # por empresa
+    desde: date = None
+    hasta: date = None
+    prefijo: str = 'SINTETICA'
+    tamano_lote: int = TAMANO_LOTE
+
+    def validar(self):
+        if not 2 <= self.profundidad <= PROFUNDIDAD_MAX:
+            raise ValueError(f"La profundidad debe estar entre 2 y {PROFUNDIDAD_MAX}")
+        if self.ramas < 1 or self.empresas < 1 or self.perfiles < 1 or self.asientos < 0:
+            raise ValueError("Las ramas, empresas y perfiles deben ser al menos 1 y los asientos no negativos")
+        if not self.prefijo or len(self.prefijo) > PREFIJO_MAX:
+            raise ValueError(f"El prefijo es obligatorio y no puede exceder {PREFIJO_MAX} caracteres")
+        hoy = date.today()
+        self.desde = self.desde or date(hoy.year - 2, 1, 1)
+        self.hasta = self.hasta or date(hoy.year - 1, 12, 31)
+        if self.desde > self.hasta:
+            raise ValueError("La fecha inicial es posterior a la final")
+
+
+def filas_plan(profundidad, ramas):
+    """Filas para cargar_cuentas: cinco raíces con grupo y `ramas` hijas de dos dígitos por nivel"""
+    filas = []
+    nivel = []
+    for grupo, nombre in GRUPOS:
+        filas.append({'cuenta': str(grupo), 'descripcion': nombre, 'cuenta_madre': '', 'grupo': str(grupo)})
+        nivel.append((str(grupo), nombre))
+    for _ in range(profundidad - 1):
+        siguiente = []
+        for madre, nombre in nivel:
+            for rama in range(1, ramas + 1):
+                codigo = f"{madre}{rama:02d}"
+                filas.append({'cuenta': codigo, 'descripcion': f"{nombre} {codigo}", 'cuenta_madre': madre, 'grupo': ''})
+                siguiente.append((codigo, nombre))
+        nivel = siguiente
+    return filas
+
+
+def pesos_fechas(desde, hasta):
+    """
+    (fechas, pesos acumulados): los días hábiles pesan más que los fines de
+    semana, los tres últimos días del mes concentran el cierre y diciembre
+    tiene más movimiento
+    """
+    fechas, pesos = [], []
+    dia = desde
+    while dia <= hasta:
+        peso = (1.0, 1.0, 1.0, 1.0, 1.0, 0.3, 0.05)[dia.weekday()]
+        if dia.day > calendar.monthrange(dia.year, dia.month)[1] - 3:
+            peso *= 3
+        if dia.month == 12:
+            peso *= 1.3
+        fechas.append(dia)
+        pesos.append(peso)
+        dia += timedelta(days=1)
+    return fechas, list(accumulate(pesos))
+
+
+def repartir(centavos, partes, rng):
+    """`centavos` en `partes` montos positivos que suman exactamente el total"""
+    if partes == 1:
+        return [centavos]
+    pesos = [rng.random() + 0.1 for _ in range(partes)]
+    total = sum(pesos)
+    libres = centavos - partes
+    montos = [1 + int(libres * peso / total) for peso in pesos[:-1]]
+    montos.append(centavos - sum(montos))
+    return montos
+
+
+def _crear_empresa(indice, parametros):
+    """
+    Empresa, perfiles, plan y configuraciones. Retorna (empresa, [(perfil,
+    cuentas del perfil, pesos acumulados)], número de cuentas hoja)
+    """
+    rng = random.Random(f"{parametros.semilla}:{parametros.prefijo}:empresa:{indice}")
+    empresa = Empresa.objects.create(
+        nombre=f"{parametros.prefijo} {indice:03d}",
+        descripcion=f"Datos sintéticos (semilla {parametros.semilla})",
+    )
+    base_ms = calendar.timegm(parametros.desde.timetuple()) * 1000
+    perfiles = [
+        Perfil(id=generar_ulid(base_ms, rng.getrandbits(80)), nombre=f"{empresa.nombre} - Perfil {numero}")
+        for numero in range(1, parametros.perfiles + 1)
+    ]
+    Perfil.objects.bulk_create(perfiles)
+    plan = PlanCuenta.objects.create(empresa=empresa, descripcion="Plan sintético", perfil=perfiles[0])
+    cargar_cuentas(plan, filas_plan(parametros.profundidad, parametros.ramas), batch_size=1000)
+
+    hojas = list(
+        Cuenta.objects.filter(plan_cuentas=plan, nivel=parametros.profundidad)
+        .order_by('cuenta').values_list('id', 'cuenta')
+    )
+    configuraciones, por_perfil = [], []
+    for perfil in perfiles:
+        # Cada perfil usa la mitad de las hojas; las primeras de su orden concentran las líneas
+        cuentas = rng.sample(hojas, max(2, len(hojas) // 2))
+        acumulados = list(accumulate(1 / (posicion + 1) ** 0.8 for posicion in range(len(cuentas))))
+        por_perfil.append((perfil, [cuenta_id for cuenta_id, _ in cuentas], acumulados))
+        configuraciones.extend(
+            PerfilPlanCuenta(
+                empresa=str(empresa.pk), cuentas_id_id=cuenta_id, perfil_id=perfil, polaridad=POLARIDAD_GRUPO[int(codigo[0])]
+            )
+            for cuenta_id, codigo in cuentas
+        )
+    PerfilPlanCuenta.objects.bulk_create(configuraciones, batch_size=1000)
+    # bulk_create no dispara señales: contador del dashboard y versiones de los perfiles
+    from asientos_contables.estadisticas import incrementar
+    incrementar('perfiles', len(perfiles))
+    for perfil in perfiles:
+        invalidar_perfil(perfil.pk)
+    return empresa, por_perfil, len(hojas)
+
+
+def _asientos(indice, empresa, por_perfil, parametros, fechas, acumulados_fechas):
+    """Genera (asiento, detalles) balanceados de la empresa, uno a la vez"""
+    rng = random.Random(f"{parametros.semilla}:{parametros.prefijo}:asientos:{indice}")
+    opciones_lineas = list(LINEAS_POR_ASIENTO)
+    acumulados_lineas = list(accumulate(LINEAS_POR_ASIENTO.values()))
+    for numero in range(1, parametros.asientos + 1):
+        fecha = rng.choices(fechas, cum_weights=acumulados_fechas)[0]
+        perfil, cuentas, acumulados = por_perfil[rng.randrange(len(por_perfil))]
+        lineas = rng.choices(opciones_lineas, cum_weights=acumulados_lineas)[0]
+        debitos = 1 if lineas == 2 else rng.randint(1, lineas - 1)
+        centavos = max(lineas * 100, round(rng.lognormvariate(12, 1.4) * 100))
+        concepto = rng.choice(CONCEPTOS)
+        momento_ms = calendar.timegm(fecha.timetuple()) * 1000 + rng.randrange(86_400_000)
+
+        asiento = Asiento(
+            id=generar_ulid(momento_ms, rng.getrandbits(80)),
+            fecha=fecha,
+            descripcion=f"{concepto} {numero}",
+            empresa=empresa,
+            id_perfil=perfil,
+        )
+        montos = (
+            [('+', monto) for monto in repartir(centavos, debitos, rng)]
+            + [('-', monto) for monto in repartir(centavos, lineas - debitos, rng)]
+        )
+        detalles = [
+            AsientoDetalle(
+                cuenta_id=cuenta_id,
+                polaridad=polaridad,
+                tipo_cuenta='DEBE' if polaridad == '+' else 'HABER',
+                valor=monto / 100,
+                DetalleDeCausa=concepto,
+                Referencia=f"SINT-{indice:03d}-{numero:09d}",
+                empresa_id_id=empresa.pk,
+            )
+            for (polaridad, monto), cuenta_id in zip(montos, rng.choices(cuentas, cum_weights=acumulados, k=lineas))
+        ]
+        yield asiento, detalles
+
+
+def _insertar(lote):
+    with transaction.atomic():
+        Asiento.objects.bulk_create([asiento for asiento, _ in lote])
+        lineas = []
+        for asiento, detalles in lote:
+            for detalle in detalles:
+                detalle.asiento = asiento
+            lineas.extend(detalles)
+        AsientoDetalle.objects.bulk_create(lineas, batch_size=5000)
+    return len(lineas)
+
+
+def generar(parametros, progreso=None):
+    """
+    Crea los datos de `parametros` (ver Parametros). Lanza ValueError si los
+    parámetros son inválidos o ya existen empresas con el prefijo. `progreso`
+    recibe un texto por cada empresa terminada. Retorna un resumen con los
+    totales y el tiempo
+    """
+    parametros.validar()
+    nombres = [f"{parametros.prefijo} {indice:03d}" for indice in range(1, parametros.empresas + 1)]
+    if Empresa.objects.filter(nombre__in=nombres).exists():
+        raise ValueError(f"Ya existen empresas con el prefijo {parametros.prefijo}: use otro prefijo")
+
+    inicio = time.perf_counter()
+    fechas, acumulados_fechas = pesos_fechas(parametros.desde, parametros.hasta)
+    resumen = {'empresas': 0, 'cuentas': 0, 'perfiles': 0, 'asientos': 0, 'lineas': 0}
+    for indice in range(1, parametros.empresas + 1):
+        empresa, por_perfil, hojas = _crear_empresa(indice, parametros)
+        lote, asientos, lineas = [], 0, 0
+        for asiento, detalles in _asientos(indice, empresa, por_perfil, parametros, fechas, acumulados_fechas):
+            lote.append((asiento, detalles))
+            if len(lote) >= parametros.tamano_lote:
+                lineas += _insertar(lote)
+                asientos += len(lote)
+                lote = []
+        if lote:
+            lineas += _insertar(lote)
+            asientos += len(lote)
+
+        resumen['empresas'] += 1
+        resumen['cuentas'] += Cuenta.objects.filter(plan_cuentas__empresa=empresa).count()
+        resumen['perfiles'] += len(por_perfil)
+        resumen['asientos'] += asientos
+        resumen['lineas'] += lineas
+        if progreso:
+            progreso(f"{empresa.nombre}: {asientos} asientos, {lineas} líneas ({hojas} cuentas hoja)")
+
+    # bulk_create no dispara señales: contador del dashboard y reportes cacheados
+    from asientos_contables.estadisticas import incrementar, invalidar_recientes
+    incrementar('asientos', resumen['asientos'])
+    invalidar_recientes()
+    invalidar_reportes(fechas=[parametros.desde])
+    resumen['segundos'] = round(time.perf_counter() - inicio, 2)
+    logger.info(f"Datos sintéticos (semilla {parametros.semilla}): {resumen}")
+    return resumen
+
+
+def eliminar(prefijo=Parametros.prefijo):
+    """
+    Borra las empresas con `prefijo` con sus asientos, planes y perfiles (con
+    señales, así que contadores e índice de búsqueda quedan al día). Retorna el
+    número de empresas borradas
+    """
+    if not prefijo:
+        raise ValueError("El prefijo es obligatorio")
+    empresas = list(Empresa.objects.filter(nombre__startswith=f"{prefijo} ").values_list('pk', flat=True))
+    if not empresas:
+        return 0
+    perfiles = set(PlanCuenta.objects.filter(empresa_id__in=empresas).values_list('perfil_id', flat=True))
+    perfiles.update(
+        PerfilPlanCuenta.objects.filter(empresa__in=[str(pk) for pk in empresas]).values_list('perfil_id', flat=True)
+    )
+    perfiles.discard(None)
+    with transaction.atomic():
+        Asiento.objects.filter(empresa_id__in=empresas).delete()
+        Empresa.objects.filter(pk__in=empresas).delete()
+        Perfil.objects.filter(pk__in=perfiles).delete()
+    logger.info(f"Datos sintéticos con prefijo {prefijo} eliminados: {len(empresas)} empresas")
+    return len(empresas)
@@ -0,0 +1,15 @@
+"""
+Tareas en segundo plano de la app asientos (ver tareas.registry)
+"""
+from tareas.registry import registrar
+from .models import Asiento
+from .services import guardar_detalles_bulk as _guardar_detalles_bulk
+
+
+@registrar('asientos.guardar_detalles_bulk')
+def guardar_detalles_bulk(tarea, asiento_id, detalles):
+    """Versión encolada de add_detalles_bulk para importaciones grandes"""
+    asiento = Asiento.objects.get(pk=asiento_id)
+    tarea.actualizar_progreso(10, f'Guardando {len(detalles)} detalles')
+    total = _guardar_detalles_bulk(asiento, detalles)
+    return {'asiento_id': asiento.id, 'detalles_guardados': total}
@@ -1,3 +1,887 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from asientos.models import Asiento
+from asientos_detalle.models import AsientoDetalle
+from empresas.models import Empresa
+from perfiles.models import Perfil
+from plan_cuentas.models import PlanCuenta, Cuenta
+from tareas.models import Tarea
+from tareas.worker import procesar_pendientes
+
+User = get_user_model()
+
+
+class AsientoFixtureMixin:
+    def setUp(self):
+        self.user = User.objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.empresa = Empresa.objects.create(nombre="DEFAULT")
+        self.perfil = Perfil.objects.create(nombre="General")
+        self.plan = PlanCuenta.objects.create(empresa=self.empresa, descripcion="Plan 2025", perfil=self.perfil)
+        self.caja = Cuenta.objects.create(cuenta="1105", descripcion="Caja", plan_cuentas=self.plan, grupo=1)
+        self.ventas = Cuenta.objects.create(cuenta="4135", descripcion="Ventas", plan_cuentas=self.plan, grupo=4)
+        self.client.force_login(self.user)
+
+    def detalles_balanceados(self, monto=100):
+        return [
+            {'perfil_id': self.perfil.id, 'cuenta': '1105', 'polaridad': '+', 'monto': monto},
+            {'perfil_id': self.perfil.id, 'cuenta': '4135', 'polaridad': '-', 'monto': monto},
+        ]
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class AddDetallesBulkTests(AsientoFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.asiento = Asiento.objects.create(fecha=date(2025, 1, 15), usuario_creacion=self.user)
+
+    def test_guardado_sincrono(self):
+        response = self.client.post(reverse('asientos:add_detalles_bulk'), {
+            'asiento_id': self.asiento.id,
+            'detalles': json.dumps(self.detalles_balanceados()),
+        })
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(AsientoDetalle.objects.filter(asiento=self.asiento).count(), 2)
+
+    def test_guardado_encolado(self):
+        response = self.client.post(reverse('asientos:add_detalles_bulk'), {
+            'asiento_id': self.asiento.id,
+            'detalles': json.dumps(self.detalles_balanceados()),
+            'async': '1',
+        })
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.json()['queued'])
+        self.assertFalse(AsientoDetalle.objects.filter(asiento=self.asiento).exists())
+
+        procesar_pendientes()
+        tarea = Tarea.objects.get(pk=response.json()['tarea_id'])
+        self.assertEqual(tarea.estado, Tarea.COMPLETADA)
+        self.assertEqual(tarea.resultado['detalles_guardados'], 2)
+        self.assertEqual(AsientoDetalle.objects.filter(asiento=self.asiento).count(), 2)
+
+    def test_ignora_filas_con_monto_cero(self):
+        detalles = self.detalles_balanceados() + [{'perfil_id': self.perfil.id, 'cuenta': '1105', 'polaridad': '+', 'monto': 0}]
+        response = self.client.post(reverse('asientos:add_detalles_bulk'), {
+            'asiento_id': self.asiento.id,
+            'detalles': json.dumps(detalles),
+        })
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(AsientoDetalle.objects.filter(asiento=self.asiento).count(), 2)
+
+
+class AsientoIdTests(TestCase):
+    def test_ids_compactos_y_monotonos(self):
+        from asientos.models import generar_id_asiento
+        ids = [generar_id_asiento() for _ in range(1000)]
+        self.assertTrue(all(len(i) == 26 for i in ids))
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class CompactarIdsTests(AsientoFixtureMixin, TestCase):
+    def test_compactar_conserva_detalles_y_enlaces_antiguos(self):
+        from django.core.management import call_command
+        from io import StringIO
+
+        legacy_id = 'a' * 64
+        asiento = Asiento.objects.create(id=legacy_id, fecha=date(2024, 5, 1), descripcion='Histórico')
+        AsientoDetalle.objects.create(asiento=asiento, cuenta=self.caja, valor=10, polaridad='+')
+        fecha_creacion = Asiento.objects.get(pk=legacy_id).fecha_creacion
+
+        call_command('compactar_ids_asientos', stdout=StringIO())
+
+        migrado = Asiento.objects.get(id_legacy=legacy_id)
+        self.assertEqual(len(migrado.id), 26)
+        self.assertEqual(migrado.fecha_creacion, fecha_creacion)
+        self.assertEqual(migrado.detalles.count(), 1)
+        self.assertFalse(Asiento.objects.filter(pk=legacy_id).exists())
+
+        response = self.client.get(reverse('asientos:asiento_detail', args=[legacy_id]))
+        self.assertRedirects(response, reverse('asientos:asiento_detail', args=[migrado.id]), fetch_redirect_response=False)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class BusquedaAsientosTests(AsientoFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sucursal = Empresa.objects.create(nombre="SUCURSAL")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alquiler = Asiento.objects.create(
+                fecha=date(2025, 2, 1), descripcion='Pago de alquiler oficina', id_perfil=self.perfil
+            )
+            AsientoDetalle.objects.create(
+                asiento=self.alquiler, cuenta=self.caja, valor=500, polaridad='-',
+                DetalleDeCausa='Arrendamiento febrero', Referencia='FAC-0192',
+            )
+            self.venta = Asiento.objects.create(fecha=date(2025, 3, 10), descripcion='Venta de mercadería', empresa=self.sucursal)
+            AsientoDetalle.objects.create(
+                asiento=self.venta, cuenta=self.ventas, valor=800, polaridad='-', DetalleDeCausa='Venta contado',
+            )
+
+    def ids(self, texto, **filtros):
+        from asientos.busqueda import buscar_asientos
+        return [asiento.id for asiento in buscar_asientos(texto, **filtros)[:50]]
+
+    def test_busca_en_descripcion_causa_y_referencia(self):
+        self.assertEqual(self.ids('alquiler'), [self.alquiler.id])
+        self.assertEqual(self.ids('arrendamiento'), [self.alquiler.id])
+        self.assertEqual(self.ids('FAC 0192'), [self.alquiler.id])
+        self.assertEqual(self.ids('mercaderia'), [self.venta.id])
+        self.assertEqual(self.ids('vent'), [self.venta.id])
+        self.assertEqual(self.ids('venta alquiler'), [])
+
+    def test_filtros(self):
+        self.assertEqual(self.ids('de', fecha_desde=date(2025, 3, 1)), [self.venta.id])
+        self.assertEqual(self.ids('de', fecha_hasta=date(2025, 2, 28)), [self.alquiler.id])
+        self.assertEqual(self.ids('de', empresa_id=self.sucursal.id), [self.venta.id])
+        self.assertEqual(self.ids('de', cuenta_id=self.caja.id), [self.alquiler.id])
+        self.assertEqual(self.ids('de', perfil_id=self.perfil.id), [self.alquiler.id])
+
+    def test_relevancia_y_paginacion(self):
+        from asientos.busqueda import buscar_asientos
+        with self.captureOnCommitCallbacks(execute=True):
+            repetido = Asiento.objects.create(fecha=date(2024, 1, 1), descripcion='Venta venta venta')
+        self.assertEqual(self.ids('venta')[0], repetido.id)
+
+        resultados = buscar_asientos('venta')
+        self.assertEqual(resultados.count(), 2)
+        self.assertEqual([a.id for a in resultados[1:2]], self.ids('venta')[1:])
+
+    def test_indice_se_actualiza_al_editar_y_eliminar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.venta.descripcion = 'Devolución de cliente'
+            self.venta.save()
+        self.assertEqual(self.ids('mercaderia'), [])
+        self.assertEqual(self.ids('devolucion'), [self.venta.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alquiler.delete()
+        self.assertEqual(self.ids('alquiler'), [])
+
+    def test_un_solo_reindexado_por_transaccion(self):
+        from unittest import mock
+        with mock.patch('asientos.busqueda.indexar_asientos') as indexar:
+            with self.captureOnCommitCallbacks(execute=True):
+                asiento = Asiento.objects.create(fecha=date(2025, 4, 1), descripcion='Compra')
+                for _ in range(5):
+                    AsientoDetalle.objects.create(asiento=asiento, cuenta=self.caja, valor=1, polaridad='+')
+        indexar.assert_called_once()
+        self.assertEqual(set(indexar.call_args[0][0]), {asiento.id})
+
+    def test_api_y_lista(self):
+        response = self.client.get(reverse('asientos:api_buscar_asientos'), {'q': 'alquiler'})
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(datos['total'], 1)
+        self.assertEqual(datos['resultados'][0]['id'], self.alquiler.id)
+
+        self.assertEqual(self.client.get(reverse('asientos:api_buscar_asientos')).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse('asientos:api_buscar_asientos'), {'q': 'x', 'fecha_desde': 'ayer'}).status_code, 400
+        )
+
+        response = self.client.get(reverse('asientos:asiento_list'), {'search': 'venta'})
+        self.assertEqual([a.id for a in response.context['asientos']], [self.venta.id])
+
+    def test_reindexar_comando(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from asientos.models import AsientoBusqueda
+
+        AsientoBusqueda.objects.all().delete()
+        call_command('reindexar_busqueda', stdout=StringIO())
+        self.assertEqual(AsientoBusqueda.objects.count(), 2)
+        self.assertEqual(self.ids('arrendamiento'), [self.alquiler.id])
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class CrearAsientoApiTests(AsientoFixtureMixin, TestCase):
+    def payload(self, monto=100, **extra):
+        return {
+            'fecha': '2025-05-02',
+            'descripcion': 'Venta de contado',
+            'id_perfil': self.perfil.id,
+            'lineas': [
+                {'cuenta_id': self.caja.id, 'polaridad': '+', 'monto': monto, 'referencia': 'R-1'},
+                {'cuenta_id': self.ventas.id, 'polaridad': 'haber', 'monto': monto},
+            ],
+            **extra,
+        }
+
+    def post(self, datos, **headers):
+        return self.client.post(
+            reverse('asientos:api_crear_asiento'), json.dumps(datos), content_type='application/json', **headers
+        )
+
+    def test_crea_encabezado_y_lineas(self):
+        response = self.post(self.payload())
+        self.assertEqual(response.status_code, 201)
+        asiento = Asiento.objects.get(pk=response.json()['asiento_id'])
+        self.assertEqual(asiento.usuario_creacion, self.user)
+        self.assertEqual(asiento.detalles.count(), 2)
+        self.assertEqual(asiento.detalles.get(cuenta=self.caja).Referencia, 'R-1')
+
+    def test_asiento_invalido_no_guarda_nada(self):
+        datos = self.payload()
+        datos['lineas'][1]['monto'] = 90
+        response = self.post(datos)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('balanceado', response.json()['errores'][0])
+        self.assertFalse(Asiento.objects.exists())
+
+        datos = self.payload()
+        datos['lineas'][0]['cuenta_id'] = 999999
+        self.assertEqual(self.post(datos).status_code, 400)
+        self.assertFalse(AsientoDetalle.objects.exists())
+
+    def test_reintento_con_clave_no_duplica(self):
+        primera = self.post(self.payload(), HTTP_IDEMPOTENCY_KEY='pedido-42')
+        self.assertEqual(primera.status_code, 201)
+        # sesión, usuario y la clave: el reintento no escribe nada
+        with self.assertNumQueries(3):
+            segunda = self.post(self.payload(), HTTP_IDEMPOTENCY_KEY='pedido-42')
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.json()['asiento_id'], primera.json()['asiento_id'])
+        self.assertEqual(Asiento.objects.count(), 1)
+
+    def test_clave_reutilizada_con_otro_contenido(self):
+        self.post(self.payload(), HTTP_IDEMPOTENCY_KEY='pedido-43')
+        response = self.post(self.payload(monto=200), HTTP_IDEMPOTENCY_KEY='pedido-43')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Asiento.objects.count(), 1)
+
+    def test_clave_vencida_y_fallida_se_pueden_reutilizar(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from asientos.models import ClaveIdempotencia
+
+        datos = self.payload()
+        datos['lineas'][1]['monto'] = 1
+        self.assertEqual(self.post(datos, HTTP_IDEMPOTENCY_KEY='k').status_code, 400)
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+
+        self.assertEqual(self.post(self.payload(), HTTP_IDEMPOTENCY_KEY='k').status_code, 201)
+        ClaveIdempotencia.objects.update(expira=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.post(self.payload(), HTTP_IDEMPOTENCY_KEY='k').status_code, 201)
+        self.assertEqual(Asiento.objects.count(), 2)
+
+    def test_formulario_usa_id_provisional_como_clave(self):
+        otro = Asiento.objects.create(fecha=date(2025, 1, 1), descripcion='Existente')
+        datos = {'fecha': '2025-05-02', 'descripcion': 'Desde el formulario', 'asiento_id_provisional': otro.id}
+        primera = self.client.post(reverse('asientos:asiento_create_old'), datos).json()
+        segunda = self.client.post(reverse('asientos:asiento_create_old'), datos).json()
+        self.assertTrue(primera['success'], primera)
+        self.assertEqual(primera['asiento_id'], segunda['asiento_id'])
+        self.assertNotEqual(primera['asiento_id'], otro.id)
+        self.assertEqual(Asiento.objects.get(pk=otro.id).descripcion, 'Existente')
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class CrearAsientosLoteTests(AsientoFixtureMixin, TestCase):
+    def asiento(self, monto=100, cuenta_id=None):
+        return {
+            'fecha': '2025-06-30',
+            'descripcion': 'Nómina junio',
+            'lineas': [
+                {'cuenta_id': cuenta_id or self.caja.id, 'polaridad': '+', 'monto': monto},
+                {'cuenta_id': self.ventas.id, 'polaridad': '-', 'monto': monto},
+            ],
+        }
+
+    def post(self, asientos, **extra):
+        return self.client.post(
+            reverse('asientos:api_crear_asientos_lote'),
+            json.dumps({'asientos': asientos, **extra}),
+            content_type='application/json',
+        )
+
+    def test_crea_todos_con_consultas_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from asientos.services import crear_asientos_lote
+
+        with CaptureQueriesContext(connection) as pocos:
+            crear_asientos_lote([self.asiento() for _ in range(3)], tamano_lote=1000)
+        with CaptureQueriesContext(connection) as muchos:
+            resultados = crear_asientos_lote([self.asiento(monto=i + 1) for i in range(300)], tamano_lote=1000)
+
+        self.assertTrue(all(resultado['success'] for resultado in resultados))
+        self.assertEqual(Asiento.objects.count(), 303)
+        self.assertEqual(AsientoDetalle.objects.count(), 606)
+        # Las consultas no crecen con el número de asientos (SQLite parte los INSERT por límite de parámetros)
+        self.assertLess(len(muchos.captured_queries), len(pocos.captured_queries) + 10)
+
+    def test_resultados_por_asiento(self):
+        response = self.post([self.asiento(), self.asiento(cuenta_id=999999), self.asiento()])
+        self.assertEqual(response.status_code, 207)
+        datos = response.json()
+        self.assertEqual((datos['creados'], datos['rechazados']), (2, 1))
+        self.assertFalse(datos['resultados'][1]['success'])
+        self.assertIn('999999', datos['resultados'][1]['errores'][0])
+        for resultado in (datos['resultados'][0], datos['resultados'][2]):
+            self.assertEqual(Asiento.objects.get(pk=resultado['asiento_id']).detalles.count(), 2)
+
+    def test_todo_o_nada(self):
+        response = self.post([self.asiento(), self.asiento(monto=0)], todo_o_nada=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Asiento.objects.exists())
+
+    def test_actualiza_contador_y_busqueda(self):
+        from asientos.busqueda import buscar_asientos
+        from asientos_contables.estadisticas import recalcular
+        from asientos_contables.models import ContadorEstadistica
+
+        recalcular('asientos')
+        self.post([self.asiento(), self.asiento()])
+        self.assertEqual(ContadorEstadistica.objects.get(nombre='asientos').valor, 2)
+        self.assertEqual(buscar_asientos('nomina').count(), 2)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class SincronizarDetallesTests(AsientoFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.banco = Cuenta.objects.create(cuenta="1110", descripcion="Bancos", plan_cuentas=self.plan, grupo=1)
+        self.asiento = Asiento.objects.create(fecha=date(2025, 7, 1), descripcion='Cobro', empresa=self.empresa)
+        self.debe = AsientoDetalle.objects.create(
+            asiento=self.asiento, cuenta=self.caja, valor=100, polaridad='+', tipo_cuenta='DEBE', DetalleDeCausa='Cobro'
+        )
+        self.haber = AsientoDetalle.objects.create(
+            asiento=self.asiento, cuenta=self.ventas, valor=100, polaridad='-', tipo_cuenta='HABER'
+        )
+
+    def lineas(self, monto=100, cuenta_debe=None):
+        return [
+            {'cuenta_id': (cuenta_debe or self.caja).id, 'polaridad': '+', 'monto': monto, 'causa': 'Cobro'},
+            {'cuenta_id': self.ventas.id, 'polaridad': '-', 'monto': monto},
+        ]
+
+    def test_sin_cambios_no_escribe(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from asientos.services import sincronizar_detalles
+
+        with CaptureQueriesContext(connection) as consultas:
+            resumen = sincronizar_detalles(self.asiento, self.lineas())
+        self.assertEqual(resumen, {'insertados': 0, 'actualizados': 0, 'eliminados': 0, 'sin_cambios': 2})
+        escrituras = [q for q in consultas.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(escrituras, [])
+
+    def test_modifica_en_su_lugar_conservando_ids(self):
+        from asientos.services import sincronizar_detalles
+
+        resumen = sincronizar_detalles(self.asiento, self.lineas(monto=250, cuenta_debe=self.banco))
+        self.assertEqual(resumen['actualizados'], 2)
+        self.assertEqual((resumen['insertados'], resumen['eliminados']), (0, 0))
+        self.assertEqual(
+            set(AsientoDetalle.objects.filter(asiento=self.asiento).values_list('id', flat=True)),
+            {self.debe.id, self.haber.id},
+        )
+        self.debe.refresh_from_db()
+        self.assertEqual((self.debe.cuenta_id, self.debe.valor), (self.banco.id, 250))
+
+    def test_inserta_y_elimina_solo_la_diferencia(self):
+        from asientos.services import sincronizar_detalles
+
+        lineas = self.lineas(monto=60) + [{'cuenta_id': self.banco.id, 'polaridad': '+', 'monto': 40}]
+        lineas[1]['monto'] = 100
+        resumen = sincronizar_detalles(self.asiento, lineas)
+        self.assertEqual(resumen, {'insertados': 1, 'actualizados': 1, 'eliminados': 0, 'sin_cambios': 1})
+
+        resumen = sincronizar_detalles(self.asiento, self.lineas())
+        self.assertEqual(resumen['eliminados'], 1)
+        self.assertEqual(AsientoDetalle.objects.filter(asiento=self.asiento).count(), 2)
+
+    def test_desbalanceado_no_modifica(self):
+        from django.core.exceptions import ValidationError
+        from asientos.services import sincronizar_detalles
+
+        lineas = self.lineas()
+        lineas[0]['monto'] = 90
+        with self.assertRaises(ValidationError):
+            sincronizar_detalles(self.asiento, lineas)
+        self.debe.refresh_from_db()
+        self.assertEqual(self.debe.valor, 100)
+
+    def test_vista_editar_usa_ids_de_detalle(self):
+        response = self.client.post(reverse('asientos:asiento_edit', args=[self.asiento.id]), {
+            'fecha': '2025-07-02',
+            'descripcion': 'Cobro corregido',
+            'version': self.asiento.version,
+            'total_detalles': 2,
+            'detalle_0_id': self.debe.id, 'detalle_0_cuenta_id': self.caja.id, 'detalle_0_tipo': 'debe',
+            'detalle_0_monto': '150', 'detalle_0_causa': 'Cobro',
+            'detalle_1_id': self.haber.id, 'detalle_1_cuenta_id': self.ventas.id, 'detalle_1_tipo': 'haber',
+            'detalle_1_monto': '150',
+        })
+        self.assertRedirects(response, reverse('asientos:asiento_detail', args=[self.asiento.id]), fetch_redirect_response=False)
+        self.debe.refresh_from_db()
+        self.assertEqual((self.debe.valor, self.debe.DetalleDeCausa), (150, 'Cobro'))
+        self.assertEqual(AsientoDetalle.objects.filter(asiento=self.asiento).count(), 2)
+
+    def test_vista_editar_ignora_filas_vacias(self):
+        response = self.client.post(reverse('asientos:asiento_edit', args=[self.asiento.id]), {
+            'fecha': '2025-07-01',
+            'descripcion': 'Cobro',
+            'version': self.asiento.version,
+            'total_detalles': 4,
+            'detalle_0_id': self.debe.id, 'detalle_0_cuenta_id': self.caja.id, 'detalle_0_tipo': 'debe',
+            'detalle_0_monto': '100', 'detalle_0_causa': 'Cobro',
+            'detalle_1_id': self.haber.id, 'detalle_1_cuenta_id': self.ventas.id, 'detalle_1_tipo': 'haber',
+            'detalle_1_monto': '100',
+            'detalle_2_cuenta_id': '', 'detalle_2_tipo': 'debe', 'detalle_2_monto': '',
+            'detalle_3_cuenta_id': self.banco.id, 'detalle_3_tipo': 'haber', 'detalle_3_monto': '0',
+        })
+        self.assertRedirects(response, reverse('asientos:asiento_detail', args=[self.asiento.id]), fetch_redirect_response=False)
+        self.assertEqual(AsientoDetalle.objects.filter(asiento=self.asiento).count(), 2)
+
+    def test_api_rechaza_lineas_vacias(self):
+        from asientos.services import sincronizar_detalles
+
+        with self.assertRaises(ValidationError):
+            sincronizar_detalles(self.asiento, self.lineas() + [{'cuenta_id': '', 'polaridad': '+', 'monto': 0}])
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class VersionAsientoTests(AsientoFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.asiento = Asiento.objects.create(fecha=date(2025, 8, 1), descripcion='Original')
+        self.debe = AsientoDetalle.objects.create(asiento=self.asiento, cuenta=self.caja, valor=10, polaridad='+')
+        self.haber = AsientoDetalle.objects.create(asiento=self.asiento, cuenta=self.ventas, valor=10, polaridad='-')
+
+    def editar(self, version, descripcion, monto=10):
+        return self.client.post(
+            reverse('asientos:api_actualizar_asiento', args=[self.asiento.id]),
+            json.dumps({
+                'version': version,
+                'descripcion': descripcion,
+                'lineas': [
+                    {'id': self.debe.id, 'cuenta_id': self.caja.id, 'polaridad': '+', 'monto': monto},
+                    {'id': self.haber.id, 'cuenta_id': self.ventas.id, 'polaridad': '-', 'monto': monto},
+                ],
+            }),
+            content_type='application/json',
+        )
+
+    def test_segunda_edicion_con_version_vieja_recibe_conflicto(self):
+        primera = self.editar(1, 'Editado por A', monto=20)
+        self.assertEqual(primera.status_code, 200)
+        self.assertEqual(primera.json()['version'], 2)
+
+        segunda = self.editar(1, 'Editado por B', monto=30)
+        self.assertEqual(segunda.status_code, 409)
+        self.assertEqual(segunda.json()['version_actual'], 2)
+
+        self.asiento.refresh_from_db()
+        self.assertEqual((self.asiento.descripcion, self.asiento.version), ('Editado por A', 2))
+        self.debe.refresh_from_db()
+        self.assertEqual(self.debe.valor, 20)
+
+    def test_edicion_invalida_no_consume_version(self):
+        response = self.client.post(
+            reverse('asientos:api_actualizar_asiento', args=[self.asiento.id]),
+            json.dumps({'version': 1, 'lineas': [{'cuenta_id': self.caja.id, 'polaridad': '+', 'monto': 5}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.asiento.refresh_from_db()
+        self.assertEqual(self.asiento.version, 1)
+
+    def test_formulario_con_version_vieja(self):
+        self.editar(1, 'Editado por A')
+        response = self.client.post(reverse('asientos:asiento_edit', args=[self.asiento.id]), {
+            'fecha': '2025-08-01', 'descripcion': 'Editado por B', 'version': 1, 'total_detalles': 2,
+            'detalle_0_cuenta_id': self.caja.id, 'detalle_0_tipo': 'debe', 'detalle_0_monto': '10',
+            'detalle_1_cuenta_id': self.ventas.id, 'detalle_1_tipo': 'haber', 'detalle_1_monto': '10',
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'name="version" value="2"', status_code=409)
+        self.asiento.refresh_from_db()
+        self.assertEqual(self.asiento.descripcion, 'Editado por A')
+
+    def test_formulario_invalido_y_reenvio_corregido(self):
+        datos = {
+            'fecha': '2025-08-01', 'descripcion': 'Editado', 'version': 1, 'total_detalles': 2,
+            'detalle_0_id': self.debe.id, 'detalle_0_cuenta_id': self.caja.id, 'detalle_0_tipo': 'debe',
+            'detalle_0_monto': '10',
+            'detalle_1_id': self.haber.id, 'detalle_1_cuenta_id': self.ventas.id, 'detalle_1_tipo': 'haber',
+            'detalle_1_monto': '7',
+        }
+        url = reverse('asientos:asiento_edit', args=[self.asiento.id])
+        response = self.client.post(url, datos)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="version" value="1"')
+        self.asiento.refresh_from_db()
+        self.assertEqual((self.asiento.descripcion, self.asiento.version), ('Original', 1))
+
+        response = self.client.post(url, {**datos, 'detalle_1_monto': '10'})
+        self.assertEqual(response.status_code, 302)
+        self.asiento.refresh_from_db()
+        self.assertEqual((self.asiento.descripcion, self.asiento.version), ('Editado', 2))
+
+    def test_guardado_masivo_de_detalles_incrementa_version(self):
+        from asientos.services import guardar_detalles_bulk
+        guardar_detalles_bulk(self.asiento, self.detalles_balanceados(monto=50))
+        self.asiento.refresh_from_db()
+        self.assertEqual(self.asiento.version, 2)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class ReportesFinancierosTests(AsientoFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.bancos = Cuenta.objects.create(cuenta="110505", descripcion="Bancos", plan_cuentas=self.plan, cuenta_madre=self.caja)
+        self.proveedores = Cuenta.objects.create(cuenta="2205", descripcion="Proveedores", plan_cuentas=self.plan, grupo=2)
+        self.capital = Cuenta.objects.create(cuenta="3105", descripcion="Capital", plan_cuentas=self.plan, grupo=3)
+        self.arriendos = Cuenta.objects.create(cuenta="5120", descripcion="Arriendos", plan_cuentas=self.plan, grupo=5)
+        self.registrar(date(2025, 5, 2), [(self.bancos, '+', 1000), (self.capital, '-', 1000)])
+        self.registrar(date(2025, 5, 20), [(self.caja, '+', 300), (self.ventas, '-', 300)])
+        self.registrar(date(2025, 6, 10), [(self.arriendos, '+', 120), (self.proveedores, '-', 120)])
+
+    def registrar(self, fecha, lineas):
+        asiento = Asiento.objects.create(fecha=fecha)
+        for cuenta, polaridad, valor in lineas:
+            AsientoDetalle.objects.create(asiento=asiento, cuenta=cuenta, polaridad=polaridad, valor=valor)
+        return asiento
+
+    def periodos(self, *textos):
+        from asientos.reportes import parse_periodo
+        return [parse_periodo(texto) for texto in textos]
+
+    def test_balance_acumula_hacia_la_madre_y_cuadra(self):
+        from asientos.reportes import balance_general
+        reporte = balance_general(self.empresa, self.periodos('2025-05', '2025-06'))
+        activos = reporte['secciones'][0]
+        saldos = {cuenta['cuenta']: cuenta['saldos'] for cuenta in activos['cuentas']}
+        self.assertEqual(saldos['1105'], [1300, 1300])
+        self.assertEqual(saldos['110505'], [1000, 1000])
+        self.assertEqual(activos['totales'], [1300, 1300])
+        self.assertEqual(reporte['totales']['pasivos'], [0, 120])
+        self.assertEqual(reporte['totales']['resultados_no_cerrados'], [300, 180])
+        self.assertEqual(reporte['totales']['cuadra'], [True, True])
+
+    def test_estado_de_resultados_por_periodo(self):
+        from asientos.reportes import estado_resultados
+        reporte = estado_resultados(self.empresa, self.periodos('2025-05', '2025-06', '2025'))
+        self.assertEqual(reporte['totales']['ingresos'], [300, 0, 300])
+        self.assertEqual(reporte['totales']['gastos'], [0, 120, 120])
+        self.assertEqual(reporte['totales']['utilidad'], [300, -120, 180])
+
+    def test_reporte_cacheado_se_invalida_con_un_asiento_nuevo(self):
+        from asientos.reportes import estado_resultados
+        periodos = self.periodos('2025-06')
+        estado_resultados(self.empresa, periodos)
+        with self.assertNumQueries(2):
+            # Solo la versión de los planes de la empresa y la del diario
+            estado_resultados(self.empresa, periodos)
+
+        self.registrar(date(2025, 6, 30), [(self.caja, '+', 50), (self.ventas, '-', 50)])
+        self.assertEqual(estado_resultados(self.empresa, periodos)['totales']['ingresos'], [50])
+
+    def test_escritura_en_otro_proceso_invalida_el_reporte(self):
+        from django.core.cache.backends.locmem import LocMemCache
+        from unittest import mock
+        from asientos import reportes
+        periodos = self.periodos('2025-06')
+        self.assertEqual(reportes.estado_resultados(self.empresa, periodos)['totales']['ingresos'], [0])
+
+        # Otro proceso (worker) con su propia caché local registra y confirma un asiento
+        with mock.patch.object(reportes, 'cache', LocMemCache('otro-proceso', {})):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.registrar(date(2025, 6, 30), [(self.caja, '+', 50), (self.ventas, '-', 50)])
+        self.assertEqual(reportes.estado_resultados(self.empresa, periodos)['totales']['ingresos'], [50])
+
+    def test_vista_json_y_periodo_invalido(self):
+        url = reverse('asientos:reporte_financiero', args=['balance', self.empresa.id])
+        response = self.client.get(url, {'periodos': '2025-05,2025-06', 'formato': 'json', 'nivel': 1})
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual([p['nombre'] for p in datos['periodos']], ['2025-05', '2025-06'])
+        self.assertNotIn('110505', [c['cuenta'] for c in datos['secciones'][0]['cuentas']])
+
+        response = self.client.get(url, {'periodos': '2025-13', 'formato': 'json'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(url, {'periodos': '2025-05'})
+        self.assertContains(response, 'Balance General')
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class TendenciaMensualTests(AsientoFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for fecha, monto in ((date(2025, 5, 2), 100), (date(2025, 5, 20), 40), (date(2025, 7, 1), 10)):
+            asiento = Asiento.objects.create(fecha=fecha, id_perfil=self.perfil, empresa=self.empresa)
+            AsientoDetalle.objects.create(asiento=asiento, cuenta=self.caja, polaridad='+', valor=monto)
+            AsientoDetalle.objects.create(asiento=asiento, cuenta=self.ventas, polaridad='-', valor=monto)
+
+    def test_pivote_por_cuenta_en_bloques(self):
+        from asientos.analitica import cargar_movimientos, tendencia_mensual
+        movimientos = cargar_movimientos(self.empresa, tamano_bloque=4)
+        self.assertEqual(len(movimientos), 6)
+        self.assertEqual(float(movimientos.valores.sum()), 0.0)
+
+        tendencia = tendencia_mensual(movimientos=movimientos)
+        self.assertEqual(tendencia['meses'], ['2025-05', '2025-07'])
+        filas = {fila['id']: fila for fila in tendencia['filas']}
+        self.assertEqual(filas[self.caja.id]['valores'], [140, 10])
+        self.assertEqual(filas[self.ventas.id]['total'], -150)
+        self.assertEqual(filas[self.caja.id]['nombre'], "1105 - Caja")
+
+    def test_vista_por_perfil(self):
+        url = reverse('asientos:api_tendencia_mensual')
+        datos = self.client.get(url, {'empresa': self.empresa.id, 'periodo': '2025-05', 'por': 'perfil'}).json()
+        self.assertEqual(datos['meses'], ['2025-05'])
+        self.assertEqual([(fila['nombre'], fila['valores']) for fila in datos['filas']], [("General", [0])])
+
+        self.assertEqual(self.client.get(url, {'por': 'empresa'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'empresa': 0}).status_code, 400)
+
+
+class HistoricoTests(AsientoFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(ASIENTOS_HISTORICO_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        for fecha, monto in ((date(2024, 3, 1), 100), (date(2024, 12, 31), 40), (date(2025, 2, 1), 7)):
+            asiento = Asiento.objects.create(fecha=fecha, empresa=self.empresa)
+            AsientoDetalle.objects.create(asiento=asiento, cuenta=self.caja, polaridad='+', valor=monto)
+            AsientoDetalle.objects.create(asiento=asiento, cuenta=self.ventas, polaridad='-', valor=monto)
+
+    def saldos(self):
+        from asientos.reportes import saldos_por_cuenta
+        return saldos_por_cuenta(self.empresa, [(None, date(2024, 6, 30)), (date(2024, 7, 1), date(2025, 12, 31))])
+
+    def test_saldos_combinan_historico_y_base_de_datos(self):
+        from asientos import historico
+        esperados = self.saldos()
+        self.assertEqual(historico.generar(self.empresa, date(2024, 12, 31)), 4)
+        guardado = historico.abrir(self.empresa.pk)
+        self.assertEqual(len(guardado), 4)
+        self.assertEqual(guardado.saldos([(None, date(2024, 6, 30))]), {self.caja.id: [100.0], self.ventas.id: [-100.0]})
+        self.assertEqual(self.saldos(), esperados)
+        self.assertEqual(esperados[self.caja.id], [100.0, 47.0])
+
+    def test_escritura_en_periodo_guardado_lo_descarta(self):
+        from asientos import historico
+        historico.generar(self.empresa, date(2024, 12, 31))
+        # Posterior al corte: el histórico sigue vigente
+        Asiento.objects.create(fecha=date(2025, 3, 1), empresa=self.empresa)
+        self.assertIsNotNone(historico.abrir(self.empresa.pk))
+
+        AsientoDetalle.objects.create(asiento=Asiento.objects.filter(fecha=date(2024, 3, 1)).get(), cuenta=self.caja, polaridad='+', valor=1)
+        self.assertIsNone(historico.abrir(self.empresa.pk))
+        self.assertEqual(self.saldos()[self.caja.id], [101.0, 47.0])
+
+        with self.assertRaises(ValueError):
+            historico.generar(self.empresa, date.today())
+
+    def test_cambiar_la_fecha_fuera_del_periodo_guardado_lo_descarta(self):
+        from asientos import historico
+        historico.generar(self.empresa, date(2024, 12, 31))
+        asiento = Asiento.objects.get(fecha=date(2024, 3, 1))
+        asiento.fecha = date.today()
+        asiento.save()
+        self.assertIsNone(historico.abrir(self.empresa.pk))
+        self.assertEqual(self.saldos()[self.caja.id], [0.0, 47.0])
+
+
+class DatosSinteticosTests(TestCase):
+    def generar(self, **opciones):
+        from asientos.sinteticos import Parametros, generar
+
+        parametros = Parametros(
+            semilla=7, empresas=2, asientos=30, profundidad=3, ramas=2, perfiles=2,
+            desde=date(2024, 1, 1), hasta=date(2024, 12, 31), tamano_lote=8, **opciones,
+        )
+        with transaction.atomic():
+            resumen = generar(parametros)
+            asientos = list(Asiento.objects.order_by('id').values_list('id', 'fecha', 'id_perfil_id'))
+            balances = set(
+                AsientoDetalle.objects.values('asiento_id').annotate(
+                    debe=Sum('valor', filter=Q(polaridad='+')), haber=Sum('valor', filter=Q(polaridad='-'))
+                ).values_list('debe', 'haber')
+            )
+            transaction.set_rollback(True)
+        return resumen, asientos, balances
+
+    def test_misma_semilla_mismos_datos_y_balanceados(self):
+        resumen, asientos, balances = self.generar()
+        self.assertEqual(resumen['asientos'], 60)
+        self.assertEqual(resumen['cuentas'], 2 * (5 + 10 + 20))
+        self.assertGreaterEqual(resumen['lineas'], 120)
+        self.assertTrue(all(abs(debe - haber) < 0.005 for debe, haber in balances))
+        self.assertEqual(self.generar()[1], asientos)
+        self.assertTrue(all(date(2024, 1, 1) <= fecha <= date(2024, 12, 31) for _, fecha, _ in asientos))
+
+    def test_prefijo_existente(self):
+        from asientos.sinteticos import Parametros, generar
+        Empresa.objects.create(nombre="SINTETICA 001")
+        with self.assertRaises(ValueError):
+            generar(Parametros(empresas=1, asientos=0))
+
+
+class RendimientoTests(TestCase):
+    def test_mide_escenarios_y_borra_los_datos(self):
+        from asientos.rendimiento import PREFIJO, USUARIO, comparar, ejecutar
+
+        escenarios = ['crear_asiento', 'detalles_bulk', 'lista_asientos', 'detalle_asiento', 'matriz_cargar', 'balance']
+        resultado = ejecutar(tamanos=[10], escenarios=escenarios, repeticiones=2, empresas=1, base_de_pruebas=True)
+        json.dumps(resultado)
+        self.assertEqual(resultado['base_de_datos']['motor'], connection.vendor)
+        medicion = resultado['tamanos'][0]
+        self.assertEqual(medicion['datos']['asientos'], 10)
+        self.assertEqual(list(medicion['escenarios']), escenarios)
+        for estadisticas in medicion['escenarios'].values():
+            self.assertEqual(estadisticas['n'], 2)
+            self.assertLessEqual(estadisticas['min_ms'], estadisticas['max_ms'])
+            self.assertGreater(estadisticas['consultas'], 0)
+        self.assertFalse(Empresa.objects.filter(nombre__startswith=PREFIJO).exists())
+        self.assertFalse(get_user_model().objects.filter(username=USUARIO).exists())
+        self.assertEqual(len(comparar(resultado, resultado)), len(escenarios))
+
+    def test_escenario_desconocido(self):
+        from asientos.rendimiento import ejecutar
+        with self.assertRaises(ValueError):
+            ejecutar(tamanos=[10], escenarios=['no_existe'], base_de_pruebas=True)
+
+    @override_settings(DEBUG=True)
+    def test_exige_confirmar_la_base_de_pruebas(self):
+        from asientos.rendimiento import PREFIJO, ejecutar
+        with self.assertRaises(ValueError):
+            ejecutar(tamanos=[10], escenarios=['balance'], repeticiones=1, empresas=1)
+        self.assertFalse(Empresa.objects.filter(nombre__startswith=PREFIJO).exists())
+
+    def test_no_toca_empresas_que_no_creo(self):
+        from asientos.rendimiento import PREFIJO, ejecutar
+        existente = Empresa.objects.create(nombre=f"{PREFIJO} Real")
+        with self.assertRaises(ValueError):
+            ejecutar(tamanos=[10], escenarios=['balance'], repeticiones=1, empresas=1, base_de_pruebas=True)
+        self.assertTrue(Empresa.objects.filter(pk=existente.pk).exists())
+
+    def test_conserva_un_usuario_existente(self):
+        from asientos.rendimiento import USUARIO, ejecutar
+        existente = get_user_model().objects.create_user(USUARIO, 'persona@example.com', 'Clave-1234')
+        ejecutar(tamanos=[10], escenarios=['balance'], repeticiones=1, empresas=1, base_de_pruebas=True)
+        self.assertTrue(get_user_model().objects.filter(pk=existente.pk).exists())
+
+
+class ConsolidacionFixtureMixin:
+    def setUp(self):
+        super().setUp()
+        perfil = Perfil.objects.create(nombre="Consolidación")
+        self.grupo = Empresa.objects.create(nombre="HOLDING")
+        self.plan_grupo = PlanCuenta.objects.create(empresa=self.grupo, descripcion="Consolidación", perfil=perfil)
+        for codigo, grupo in (('11', 1), ('31', 3), ('41', 4), ('51', 5)):
+            Cuenta.objects.create(cuenta=codigo, descripcion=f"Cuenta {codigo}", plan_cuentas=self.plan_grupo, grupo=grupo)
+
+        self.empresas = []
+        for nombre, monto in (('NORTE', 100), ('SUR', 250)):
+            empresa = Empresa.objects.create(nombre=nombre)
+            plan = PlanCuenta.objects.create(empresa=empresa, descripcion=f"Plan {nombre}", perfil=perfil)
+            caja = Cuenta.objects.create(cuenta="110505", descripcion="Caja", plan_cuentas=plan, grupo=1)
+            ventas = Cuenta.objects.create(cuenta="413505", descripcion="Ventas", plan_cuentas=plan, grupo=4)
+            asiento = Asiento.objects.create(fecha=date(2025, 7, 15))
+            AsientoDetalle.objects.create(asiento=asiento, cuenta=caja, polaridad='+', valor=monto)
+            AsientoDetalle.objects.create(asiento=asiento, cuenta=ventas, polaridad='-', valor=monto)
+            self.empresas.append(empresa)
+
+    def consolidar(self, tipo='balance', **kwargs):
+        from asientos.consolidacion import consolidar
+        from asientos.reportes import parse_periodo
+        return consolidar(tipo, self.empresas, self.plan_grupo, [parse_periodo('2025-07')], **kwargs)
+
+
+class ConsolidacionTests(ConsolidacionFixtureMixin, TestCase):
+    def test_suma_las_empresas_en_el_plan_de_consolidacion(self):
+        reporte = self.consolidar()
+        self.assertEqual(reporte['secciones'][0]['cuentas'][0]['cuenta'], '11')
+        self.assertEqual(reporte['totales']['activos'], [350])
+        self.assertEqual(reporte['totales']['resultados_no_cerrados'], [350])
+        self.assertEqual(reporte['totales']['cuadra'], [True])
+        self.assertEqual([e['nombre'] for e in reporte['empresas']], ['NORTE', 'SUR'])
+
+    def test_cuentas_sin_mapeo_y_mapeo_explicito(self):
+        Cuenta.objects.filter(cuenta='413505').update(cuenta='990505')
+        reporte = self.consolidar('resultados')
+        self.assertEqual(reporte['totales']['ingresos'], [0])
+        self.assertEqual(len(reporte['sin_mapear']), 2)
+
+        reporte = self.consolidar('resultados', mapeo={'990505': '41'})
+        self.assertEqual(reporte['totales']['ingresos'], [350])
+        self.assertEqual(reporte['sin_mapear'], [])
+
+
+class ConsolidacionParalelaTests(ConsolidacionFixtureMixin, TransactionTestCase):
+    def test_hilos_dan_el_mismo_resultado(self):
+        paralelo = self.consolidar('resultados', max_hilos=2)
+        from django.core.cache import cache
+        cache.clear()
+        serial = self.consolidar('resultados', max_hilos=1)
+        self.assertEqual(paralelo['totales'], serial['totales'])
+        self.assertEqual(paralelo['totales']['utilidad'], [350])
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class EmpresaAsientoTests(AsientoFixtureMixin, TestCase):
+    def crear(self, **extra):
+        from asientos.services import crear_asiento
+        return crear_asiento({
+            'fecha': '2025-04-01',
+            'lineas': [
+                {'cuenta_id': self.caja.id, 'polaridad': '+', 'monto': 10},
+                {'cuenta_id': self.ventas.id, 'polaridad': '-', 'monto': 10},
+            ],
+            **extra,
+        }, self.user)
+
+    def test_empresa_del_plan_de_las_cuentas_o_indicada(self):
+        asiento = self.crear()
+        self.assertEqual(asiento.empresa, self.empresa)
+        self.assertEqual(set(asiento.detalles.values_list('empresa_id', flat=True)), {self.empresa.id})
+
+        otra = Empresa.objects.create(nombre="OTRA")
+        self.assertEqual(self.crear(empresa='OTRA').empresa, otra)
+        self.assertEqual(self.crear(empresa=otra.id).empresa, otra)
+        with self.assertRaisesMessage(ValidationError, 'La empresa INEXISTENTE no existe'):
+            self.crear(empresa='INEXISTENTE')
+
+    def test_detalles_toman_la_empresa_del_asiento_sin_consultarla(self):
+        from asientos.services import sincronizar_detalles
+        asiento = Asiento.objects.create(fecha=date(2025, 4, 2))
+        lineas = [
+            {'cuenta_id': self.caja.id, 'polaridad': '+', 'monto': 5},
+            {'cuenta_id': self.ventas.id, 'polaridad': '-', 'monto': 5},
+        ]
+        # Un asiento sin empresa toma la del plan de sus cuentas
+        sincronizar_detalles(asiento, lineas)
+        asiento.refresh_from_db()
+        self.assertEqual(asiento.empresa_id, self.empresa.id)
+
+        lineas[0]['monto'] = lineas[1]['monto'] = 7
+        with CaptureQueriesContext(connection) as consultas:
+            sincronizar_detalles(asiento, lineas)
+        self.assertFalse([q for q in consultas.captured_queries if 'empresas_empresa' in q['sql']])
+        self.assertEqual(set(asiento.detalles.values_list('empresa_id', flat=True)), {self.empresa.id})
+
+    def test_listado_filtra_por_empresa(self):
+        propio = self.crear()
+        otra = Empresa.objects.create(nombre="OTRA")
+        Asiento.objects.create(fecha=date(2025, 4, 3), empresa=otra)
+        response = self.client.get(reverse('asientos:asiento_list'), {'empresa': self.empresa.id})
+        self.assertEqual([asiento.id for asiento in response.context['asientos']], [propio.id])
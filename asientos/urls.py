@@ -15,6 +15,7 @@ urlpatterns = [
     path('<str:asiento_id>/detalle/<int:detalle_id>/eliminar/', views.delete_detalle, name='delete_detalle'),
     path('agregar-bulk-detalles/', views.add_detalles_bulk, name='add_detalles_bulk'),
     path('perfil/<str:perfil_id>/cuentas/', views.get_cuentas_for_perfil, name='get_cuentas_for_perfil'),
+    path('reportes/<str:tipo>/<int:empresa_id>/', views.reporte_financiero, name='reporte_financiero'),
     path('secure/', views.secure_data_view, name='secure_data'),
     path('secure/dashboard/', views.secure_dashboard_view, name='secure_dashboard'),
 ]
@@ -22,5 +23,11 @@ urlpatterns = [
 # API endpoints
 urlpatterns += [
     path('api/perfil/<str:perfil_id>/cuentas/', views.api_perfil_cuentas, name='api_perfil_cuentas'),
+    path('api/asiento/<str:asiento_id>/', views.api_actualizar_asiento, name='api_actualizar_asiento'),
     path('api/asiento/<str:asiento_id>/detalles/', views.get_asiento_detalles, name='get_asiento_detalles'),
+    path('api/asientos/', views.api_crear_asiento, name='api_crear_asiento'),
+    path('api/asientos/lote/', views.api_crear_asientos_lote, name='api_crear_asientos_lote'),
+    path('api/reportes/consolidado/<str:tipo>/', views.api_reporte_consolidado, name='api_reporte_consolidado'),
+    path('api/analitica/tendencia/', views.api_tendencia_mensual, name='api_tendencia_mensual'),
+    path('api/asientos/buscar/', views.api_buscar_asientos, name='api_buscar_asientos'),
 ]
\ No newline at end of file
@@ -2,29 +2,122 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.urls import reverse
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 import json
 import logging
-from .models import Asiento
+from .analitica import tendencia_mensual
+from .busqueda import buscar_asientos
+from .consolidacion import consolidar
+from .idempotencia import ClaveEnConflicto, ejecutar as ejecutar_idempotente
+from .models import Asiento, generar_id_asiento
+from .reportes import GENERADORES, MAX_PERIODOS, parse_periodo
 from .forms import AsientoForm
+from .services import (
+    ConflictoVersion, actualizar_asiento, crear_asiento, crear_asientos_lote, descartar_lineas_vacias,
+    empresa_de_cuentas, guardar_detalles_bulk,
+)
+from asientos_contables.identidad import precargar
 from asientos_detalle.models import AsientoDetalle
 from asientos_detalle.forms import AsientoDetalleForm
 from plan_cuentas.models import PlanCuenta, Cuenta
 from perfiles.models import Perfil, PerfilPlanCuenta
+from empresas.models import Empresa
+from tareas.registry import encolar
 
 # Configurar logger para debugging
 logger = logging.getLogger(__name__)
 
+def get_asiento_or_404(id):
+    """Busca el asiento por su ID actual o por el ID SHA-256 anterior a la compactación"""
+    asiento = Asiento.objects.filter(pk=id).first() or Asiento.objects.filter(id_legacy=id).first()
+    if asiento is None:
+        raise Http404("No existe el asiento solicitado")
+    return asiento
+
+ASIENTOS_POR_PAGINA = 25
+MAX_POR_PAGINA_BUSQUEDA = 100
+MAX_ASIENTOS_LOTE = getattr(settings, 'ASIENTOS_LOTE_MAX', 5000)
+
+
+def _empresa_parametro(request):
+    """ID de la empresa del parámetro GET `empresa` (ID o nombre), o None"""
+    valor = request.GET.get('empresa', '').strip()
+    if not valor:
+        return None
+    if valor.isdigit():
+        return int(valor)
+    empresa_id = Empresa.objects.filter(nombre=valor).order_by('pk').values_list('pk', flat=True).first()
+    if empresa_id is None:
+        raise ValueError(f"La empresa {valor} no existe")
+    return empresa_id
+
+
+def _fecha_parametro(request, nombre):
+    """Fecha ISO de un parámetro GET; ValueError si viene y no es válida"""
+    valor = request.GET.get(nombre)
+    if not valor:
+        return None
+    fecha = parse_date(valor)
+    if fecha is None:
+        raise ValueError(f"Fecha inválida en {nombre}: {valor}")
+    return fecha
+
+
 @login_required
 def asiento_list(request):
-    asientos = Asiento.objects.select_related('id_perfil').prefetch_related('detalles__cuenta').order_by('-fecha')
-    return render(request, 'asientos/asiento_list.html', {'asientos': asientos})
+    search = request.GET.get('search', '').strip()
+    perfil_id = request.GET.get('perfil', '')
+    try:
+        fecha_desde = _fecha_parametro(request, 'fecha_desde')
+    except ValueError:
+        fecha_desde = None
+    try:
+        empresa_id = _empresa_parametro(request)
+    except ValueError:
+        empresa_id = None
+
+    if search:
+        # Búsqueda de texto completo: resultados por relevancia, una página a la vez
+        asientos = buscar_asientos(search, fecha_desde=fecha_desde, empresa_id=empresa_id, perfil_id=perfil_id or None)
+    else:
+        asientos = (
+            Asiento.objects.select_related('id_perfil', 'empresa')
+            .prefetch_related('detalles__cuenta')
+            .order_by('-fecha', '-id')
+        )
+        if empresa_id:
+            asientos = asientos.filter(empresa_id=empresa_id)
+        if fecha_desde:
+            asientos = asientos.filter(fecha__gte=fecha_desde)
+        if perfil_id:
+            asientos = asientos.filter(id_perfil_id=perfil_id)
+
+    paginator = Paginator(asientos, ASIENTOS_POR_PAGINA)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    filtros = request.GET.copy()
+    filtros.pop('page', None)
+    return render(request, 'asientos/asiento_list.html', {
+        'asientos': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+        'total_asientos': paginator.count,
+        'search': search,
+        'perfiles': Perfil.objects.only('id', 'nombre').order_by('nombre'),
+        'filtros': filtros.urlencode(),
+    })
 
 @login_required
 def asiento_detail(request, id):
-    asiento = get_object_or_404(Asiento, pk=id)
+    asiento = get_asiento_or_404(id)
+    if asiento.id != id:
+        # Enlace con el ID anterior: redirigir a la URL canónica
+        return redirect('asientos:asiento_detail', id=asiento.id)
     detalles = AsientoDetalle.objects.filter(asiento=asiento)
     
     monto_total = 0
@@ -46,19 +139,24 @@ def asiento_create(request):
     if request.method == 'POST':
         form = AsientoForm(request.POST, user=request.user)
         if form.is_valid():
+            def guardar():
+                # id_perfil is now handled by the form, no need to set it manually
+                asiento = form.save(commit=False)
+                asiento.save()
+                return asiento, {'success': True, 'asiento_id': asiento.id}
+
             try:
-                with transaction.atomic():
-                    asiento_id_provisional = request.POST.get('asiento_id_provisional')
-                    asiento = form.save(commit=False)
-                    if asiento_id_provisional:
-                        asiento.id = asiento_id_provisional
-                    # id_perfil is now handled by the form, no need to set it manually
-                    asiento.save()
-                    return JsonResponse({
-                        'success': True,
-                        'asiento_id': asiento.id
-                    })
-            except ValidationError as e:
+                # El ID provisional del formulario es una clave de idempotencia, no la
+                # clave primaria: un doble envío devuelve el asiento ya creado
+                asiento_id_provisional = request.POST.get('asiento_id_provisional')
+                if asiento_id_provisional:
+                    datos = {k: v for k, v in request.POST.items() if k not in ('csrfmiddlewaretoken', 'asiento_id_provisional')}
+                    respuesta, _ = ejecutar_idempotente(request.user, asiento_id_provisional, datos, guardar)
+                else:
+                    with transaction.atomic():
+                        _, respuesta = guardar()
+                return JsonResponse(respuesta)
+            except (ValidationError, ClaveEnConflicto, ValueError) as e:
                 return JsonResponse({
                     'success': False,
                     'error': "; ".join(e.messages) if hasattr(e, 'messages') else str(e)
@@ -80,10 +178,7 @@ def asiento_create(request):
     perfiles_list = Perfil.objects.all()
     plan_cuentas = PlanCuenta.objects.none()
 
-    import datetime
-    import hashlib
-    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
-    asiento_id_provisional = hashlib.sha256(f"TEMP-{timestamp}".encode()).hexdigest()
+    asiento_id_provisional = generar_id_asiento()
     
     context = {
         'form': form,
@@ -97,74 +192,48 @@ def asiento_create(request):
 
 @login_required
 def asiento_edit(request, id):
-    asiento = get_object_or_404(Asiento, pk=id)
+    asiento = get_asiento_or_404(id)
     
+    status = 200
     if request.method == 'POST':
         try:
-            with transaction.atomic():
-                # Actualizar información básica del asiento
-                asiento.fecha = request.POST.get('fecha')
-                if request.POST.get('id_perfil'):
-                    asiento.id_perfil_id = request.POST.get('id_perfil')
-                asiento.descripcion = request.POST.get('descripcion', '')
-                asiento.usuario_modificacion = request.user
-                
-                # Procesar los detalles
-                total_detalles = int(request.POST.get('total_detalles', 0))
-                total_debe = 0
-                total_haber = 0
-                
-                # Eliminar detalles existentes
-                AsientoDetalle.objects.filter(asiento=asiento).delete()
-                
-                # Crear nuevos detalles
-                for i in range(total_detalles):
-                    cuenta_id = request.POST.get(f'detalle_{i}_cuenta_id')
-                    tipo = request.POST.get(f'detalle_{i}_tipo')
-                    monto = float(request.POST.get(f'detalle_{i}_monto', 0))
-                    
-                    if cuenta_id and monto > 0:
-                        # Obtener la cuenta
-                        cuenta = Cuenta.objects.get(id=cuenta_id)
-                        
-                        # Determinar la polaridad basada en el tipo
-                        if tipo == 'debe':
-                            polaridad = '+'
-                            total_debe += monto
-                        else:
-                            polaridad = '-'
-                            total_haber += monto
-                        
-                        # Crear el detalle
-                        # Obtener la empresa como objeto si existe
-                        try:
-                            from empresas.models import Empresa
-                            empresa_obj = Empresa.objects.filter(nombre=asiento.empresa).first()
-                        except:
-                            empresa_obj = None
-                        
-                        AsientoDetalle.objects.create(
-                            asiento=asiento,
-                            cuenta=cuenta,
-                            valor=monto,
-                            polaridad=polaridad,
-                            tipo_cuenta='DEBE' if tipo == 'debe' else 'HABER',
-                            empresa_id=empresa_obj
-                        )
-                
-                # Validar balance
-                if abs(total_debe - total_haber) >= 0.01:
-                    raise ValidationError('El asiento debe estar balanceado')
-                
-                # Guardar el asiento
-                asiento.save()
-                
-                messages.success(request, 'Asiento contable actualizado exitosamente')
-                return redirect('asientos:asiento_detail', id=asiento.id)
-                
+            encabezado = {
+                'fecha': request.POST.get('fecha'),
+                'descripcion': request.POST.get('descripcion', ''),
+            }
+            if request.POST.get('id_perfil'):
+                encabezado['id_perfil_id'] = request.POST.get('id_perfil')
+            
+            # Solo se escriben las líneas que cambiaron (ver services.sincronizar_detalles)
+            total_detalles = int(request.POST.get('total_detalles', 0))
+            lineas = descartar_lineas_vacias([
+                {
+                    'id': request.POST.get(f'detalle_{i}_id'),
+                    'cuenta_id': request.POST.get(f'detalle_{i}_cuenta_id'),
+                    'tipo': request.POST.get(f'detalle_{i}_tipo'),
+                    'monto': request.POST.get(f'detalle_{i}_monto', 0),
+                    'causa': request.POST.get(f'detalle_{i}_causa', ''),
+                    'referencia': request.POST.get(f'detalle_{i}_referencia', ''),
+                }
+                for i in range(total_detalles)
+            ])
+            # La versión con la que se cargó el formulario: si otro usuario guardó
+            # antes, el UPDATE condicional no encuentra la fila y no se pisa su edición
+            actualizar_asiento(asiento, request.POST.get('version'), lineas, usuario=request.user, **encabezado)
+            
+            messages.success(request, 'Asiento contable actualizado exitosamente')
+            return redirect('asientos:asiento_detail', id=asiento.id)
+        
+        except ConflictoVersion as e:
+            logger.warning(str(e))
+            messages.error(request, str(e))
+            asiento.refresh_from_db()
+            status = 409
         except Exception as e:
             logger.error(f"Error actualizando asiento: {str(e)}")
             messages.error(request, f'Error al actualizar el asiento: {str(e)}')
+            # El formulario se vuelve a mostrar con la versión que quedó en la base de datos
+            asiento.refresh_from_db()
     
     # GET request - mostrar formulario de edición
     form = AsientoForm(instance=asiento, user=request.user)
@@ -179,7 +248,7 @@ def asiento_edit(request, id):
         'is_edit_mode': True,
         'asiento': asiento
     }
-    return render(request, 'asientos/asiento_create.html', context)
+    return render(request, 'asientos/asiento_create.html', context, status=status)
 
 @login_required
 def get_asiento_detalles(request, asiento_id):
@@ -187,7 +256,7 @@ def get_asiento_detalles(request, asiento_id):
     Endpoint para obtener los detalles de un asiento existente en formato JSON
     """
     try:
-        asiento = get_object_or_404(Asiento, pk=asiento_id)
+        asiento = get_asiento_or_404(asiento_id)
         detalles = AsientoDetalle.objects.filter(asiento=asiento).select_related('cuenta')
         
         detalles_data = []
@@ -210,6 +279,7 @@ def get_asiento_detalles(request, asiento_id):
             'asiento': {
                 'id': asiento.id,
                 'numero': asiento.id,  # Usar el id como número de asiento
+                'version': asiento.version,
                 'fecha': asiento.fecha.strftime('%Y-%m-%d'),
                 'descripcion': asiento.descripcion,
                 'perfil_id': asiento.id_perfil.id if asiento.id_perfil else ''
@@ -223,7 +293,7 @@ def get_asiento_detalles(request, asiento_id):
 
 @login_required
 def asiento_delete(request, id):
-    asiento = get_object_or_404(Asiento, pk=id)
+    asiento = get_asiento_or_404(id)
     if request.method == 'POST':
         asiento.delete()
         return redirect('asientos:asiento_list')
@@ -231,7 +301,7 @@ def asiento_delete(request, id):
 
 @login_required
 def add_detalle(request, asiento_id):
-    asiento = get_object_or_404(Asiento, pk=asiento_id)
+    asiento = get_asiento_or_404(asiento_id)
     
     logger.debug(f"DEPURACIÓN ADD_DETALLE: Asiento ID: {asiento_id}, Método: {request.method}")
     
@@ -277,7 +347,7 @@ def add_detalle(request, asiento_id):
 
 @login_required
 def edit_detalle(request, asiento_id, detalle_id):
-    asiento = get_object_or_404(Asiento, pk=asiento_id)
+    asiento = get_asiento_or_404(asiento_id)
     detalle = get_object_or_404(AsientoDetalle, pk=detalle_id, asiento=asiento)
     
     logger.debug(f"DEPURACIÓN: Editando detalle - ID: {detalle_id}, Tipo: {detalle.tipo_cuenta}")
@@ -306,7 +376,7 @@ def edit_detalle(request, asiento_id, detalle_id):
 
 @login_required
 def delete_detalle(request, asiento_id, detalle_id):
-    asiento = get_object_or_404(Asiento, pk=asiento_id)
+    asiento = get_asiento_or_404(asiento_id)
     detalle = get_object_or_404(AsientoDetalle, pk=detalle_id, asiento=asiento)
     if request.method == 'POST':
         detalle.delete()
@@ -328,94 +398,30 @@ def add_detalles_bulk(request):
         if not asiento_id or not detalles_json:
             return JsonResponse({'success': False, 'error': 'Faltan datos requeridos'})
         
-        asiento = get_object_or_404(Asiento, pk=asiento_id)
+        asiento = get_asiento_or_404(asiento_id)
         detalles_nuevos_data = json.loads(detalles_json)
-        
-        with transaction.atomic():
-            AsientoDetalle.objects.filter(asiento=asiento).delete()
-            
-            for detalle_data in detalles_nuevos_data:
-                polaridad_configurada = detalle_data.get('polaridad')
-                tipo_cuenta = ''
-                if polaridad_configurada == '+':
-                    tipo_cuenta = 'DEBE'
-                elif polaridad_configurada == '-':
-                    tipo_cuenta = 'HABER'
-                else:
-                    raise ValidationError(f"Polaridad inválida o no especificada: {polaridad_configurada} para cuenta {detalle_data.get('cuenta')}")
-
-                perfil_id = detalle_data.get('perfil_id')
-                if not perfil_id:
-                    raise ValidationError("Falta el ID del perfil para el detalle.")
-                
-                try:
-                    perfil_obj = Perfil.objects.get(id=perfil_id)
-                except Perfil.DoesNotExist:
-                    raise ValidationError(f"El perfil con ID {perfil_id} no existe.")
 
-                cuenta_codigo = detalle_data.get('cuenta', '')
-                try:
-                    # Buscar la cuenta por código usando el campo 'cuenta'
-                    cuenta_obj = Cuenta.objects.get(cuenta=cuenta_codigo)
-                except Cuenta.DoesNotExist:
-                    raise ValidationError(f"La cuenta {cuenta_codigo} no existe en el plan de cuentas (Perfil: {perfil_obj.nombre}).")
+        # Importaciones grandes (o solicitadas explícitamente) se encolan y el request retorna de inmediato
+        encolar_en_segundo_plano = (
+            request.POST.get('async') in ('1', 'true')
+            or len(detalles_nuevos_data) >= settings.TAREAS_UMBRAL_DETALLES_BULK
+        )
+        if encolar_en_segundo_plano:
+            tarea = encolar(
+                'asientos.guardar_detalles_bulk',
+                parametros={'asiento_id': asiento.id, 'detalles': detalles_nuevos_data},
+                usuario=request.user,
+            )
+            return JsonResponse({
+                'success': True,
+                'queued': True,
+                'asiento_id': asiento.id,
+                'tarea_id': str(tarea.id),
+                'estado_url': reverse('tareas:tarea_estado', args=[tarea.id]),
+            }, status=202)
 
-                # Obtener la empresa como objeto si existe
-                try:
-                    from empresas.models import Empresa
-                    empresa_obj = Empresa.objects.filter(nombre=asiento.empresa).first()
-                except:
-                    empresa_obj = None
-
-                AsientoDetalle.objects.create(
-                    asiento=asiento,
-                    tipo_cuenta=tipo_cuenta, 
-                    cuenta=cuenta_obj,
-                    DetalleDeCausa=detalle_data.get('causa', ''),
-                    Referencia=detalle_data.get('Referencia', ''),
-                    valor=float(detalle_data.get('monto', 0)),
-                    polaridad=polaridad_configurada,
-                    empresa_id=empresa_obj
-                )
+        guardar_detalles_bulk(asiento, detalles_nuevos_data)
 
-            # Calcular el total después de crear todos los detalles
-            total_movimientos = 0
-            detalles_guardados = AsientoDetalle.objects.filter(asiento=asiento)
-            
-            # Logging detallado para cada detalle
-            logger.info(f"=== DEPURACIÓN BALANCE ASIENTO {asiento.id} ===")
-            logger.info(f"Número de detalles encontrados: {detalles_guardados.count()}")
-            
-            for i, detalle_obj in enumerate(detalles_guardados, 1):
-                if detalle_obj.valor is not None:
-                    monto_actual = float(detalle_obj.valor)
-                    polaridad_actual = detalle_obj.polaridad
-                    
-                    logger.info(f"Detalle {i}: Monto={monto_actual}, Polaridad='{polaridad_actual}', Tipo={detalle_obj.tipo_cuenta}")
-                    
-                    if polaridad_actual == '+':
-                        total_movimientos += monto_actual
-                        logger.info(f"  Sumando {monto_actual} (total parcial: {total_movimientos})")
-                    elif polaridad_actual == '-':
-                        total_movimientos -= monto_actual
-                        logger.info(f"  Restando {monto_actual} (total parcial: {total_movimientos})")
-                    else:
-                        logger.warning(f"  Polaridad desconocida: '{polaridad_actual}'")
-                else:
-                    logger.warning(f"Detalle {i}: Monto es None")
-            
-            logger.info(f"TOTAL FINAL CALCULADO: {total_movimientos}")
-            logger.info(f"TOTAL REDONDEADO: {round(total_movimientos, 2)}")
-            logger.info(f"¿ES IGUAL A CERO?: {round(total_movimientos, 2) == 0}")
-            logger.info("=== FIN DEPURACIÓN BALANCE ===")
-            
-            if round(total_movimientos, 2) != 0:
-                error_msg = f"La suma de los movimientos (debe y haber) debe ser igual a cero. Total: {total_movimientos:.2f}"
-                logger.error(f"BALANCE NO EQUILIBRADO: {error_msg}")
-                raise ValidationError(error_msg)
-            else:
-                logger.info("BALANCE EQUILIBRADO: El asiento está balanceado correctamente")
-        
         return JsonResponse({'success': True, 'asiento_id': asiento.id})
     
     except ValidationError as e:
@@ -592,12 +598,19 @@ def asiento_create_new(request):
                         'is_edit_mode': False
                     })
                 
+                # Cuentas de todas las líneas en una consulta; la empresa del asiento es la de su plan
+                cuentas = precargar(Cuenta, [
+                    int(request.POST[f'detalle_{i}_cuenta_id'])
+                    for i in range(total_detalles)
+                    if str(request.POST.get(f'detalle_{i}_cuenta_id', '')).isdigit()
+                ], select_related=('plan_cuentas',))
+                
                 # Crear el asiento principal
                 asiento = Asiento.objects.create(
                     fecha=request.POST.get('fecha'),
                     id_perfil_id=request.POST.get('id_perfil'),
                     descripcion=request.POST.get('descripcion', ''),
-                    empresa='DEFAULT',
+                    empresa_id=empresa_de_cuentas(cuentas.values()),
                     usuario_creacion=request.user
                 )
                 
@@ -619,10 +632,8 @@ def asiento_create_new(request):
                         monto = 0
                     
                     if cuenta_id and monto > 0:
-                        # Obtener la cuenta
-                        try:
-                            cuenta = Cuenta.objects.get(id=cuenta_id)
-                        except Cuenta.DoesNotExist:
+                        cuenta = cuentas.get(int(cuenta_id)) if str(cuenta_id).isdigit() else None
+                        if cuenta is None:
                             logger.error(f"Cuenta con ID {cuenta_id} no existe")
                             continue
                         
@@ -634,13 +645,6 @@ def asiento_create_new(request):
                             polaridad = '-'
                             total_haber += monto
                         
-                        # Obtener la empresa como objeto si existe
-                        try:
-                            from empresas.models import Empresa
-                            empresa_obj = Empresa.objects.filter(nombre='DEFAULT').first()
-                        except Exception:
-                            empresa_obj = None
-                        
                         # Crear el detalle
                         AsientoDetalle.objects.create(
                             asiento=asiento,
@@ -648,7 +652,7 @@ def asiento_create_new(request):
                             valor=monto,
                             polaridad=polaridad,
                             tipo_cuenta='DEBE' if tipo == 'debe' else 'HABER',
-                            empresa_id=empresa_obj
+                            empresa_id_id=asiento.empresa_id
                         )
                         
                         logger.debug(f"Detalle creado: Cuenta={cuenta.cuenta}, Monto={monto}, Polaridad={polaridad}")
@@ -714,3 +718,241 @@ def api_perfil_cuentas(request, perfil_id):
             'success': False,
             'error': str(e)
         })
+
+@login_required
+def api_buscar_asientos(request):
+    """
+    Búsqueda de texto completo en descripción, causa y referencia de los asientos.
+    Parámetros GET: q, fecha_desde, fecha_hasta (AAAA-MM-DD), empresa (ID o
+    nombre), cuenta (ID), perfil, page y por_pagina (máx. 100). Resultados
+    ordenados por relevancia.
+    """
+    texto = request.GET.get('q', '').strip()
+    if not texto:
+        return JsonResponse({'success': False, 'error': 'El parámetro q es obligatorio'}, status=400)
+    try:
+        fecha_desde = _fecha_parametro(request, 'fecha_desde')
+        fecha_hasta = _fecha_parametro(request, 'fecha_hasta')
+        empresa_id = _empresa_parametro(request)
+        cuenta_id = int(request.GET['cuenta']) if request.GET.get('cuenta') else None
+        por_pagina = max(1, min(int(request.GET.get('por_pagina', ASIENTOS_POR_PAGINA)), MAX_POR_PAGINA_BUSQUEDA))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Parámetros inválidos: {e}'}, status=400)
+
+    resultados = buscar_asientos(
+        texto,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        empresa_id=empresa_id,
+        cuenta_id=cuenta_id,
+        perfil_id=request.GET.get('perfil') or None,
+    )
+    page_obj = Paginator(resultados, por_pagina).get_page(request.GET.get('page'))
+    return JsonResponse({
+        'success': True,
+        'total': page_obj.paginator.count,
+        'pagina': page_obj.number,
+        'paginas': page_obj.paginator.num_pages,
+        'resultados': [
+            {
+                'id': asiento.id,
+                'fecha': asiento.fecha.isoformat(),
+                'empresa_id': asiento.empresa_id,
+                'empresa': asiento.empresa.nombre if asiento.empresa else None,
+                'descripcion': asiento.descripcion or '',
+                'perfil': asiento.id_perfil.nombre if asiento.id_perfil else None,
+                'puntaje': asiento.puntaje,
+            }
+            for asiento in page_obj
+        ],
+    })
+
+
+@login_required
+def api_crear_asiento(request):
+    """
+    Crea un asiento con todas sus líneas en una sola petición JSON (ver
+    services.preparar_asiento). Con el encabezado Idempotency-Key (o el campo
+    clave_idempotencia) los reintentos reciben la respuesta original sin crear
+    otro asiento.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'success': False, 'error': 'El asiento debe ser un objeto JSON'}, status=400)
+
+    clave = payload.pop('clave_idempotencia', None)
+    clave = request.headers.get('Idempotency-Key') or clave
+
+    def crear():
+        asiento = crear_asiento(payload, request.user)
+        return asiento, {'success': True, 'asiento_id': asiento.id, 'lineas': len(payload['lineas'])}
+
+    try:
+        if clave:
+            respuesta, repetida = ejecutar_idempotente(request.user, clave, payload, crear)
+        else:
+            (_, respuesta), repetida = crear(), False
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'errores': e.messages}, status=400)
+    except ClaveEnConflicto as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    response = JsonResponse({**respuesta, 'repetida': repetida}, status=200 if repetida else 201)
+    if repetida:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+@login_required
+def api_crear_asientos_lote(request):
+    """
+    Crea muchos asientos en una petición JSON {"asientos": [...], "todo_o_nada":
+    false}, cada uno con el formato de api_crear_asiento. Retorna el resultado de
+    cada asiento: 201 si se crearon todos, 207 si solo algunos, 400 si ninguno.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    lista = payload.get('asientos') if isinstance(payload, dict) else None
+    if not isinstance(lista, list) or not lista:
+        return JsonResponse({'success': False, 'error': 'Debe enviar una lista de asientos'}, status=400)
+    if len(lista) > MAX_ASIENTOS_LOTE:
+        return JsonResponse(
+            {'success': False, 'error': f'El lote excede el máximo de {MAX_ASIENTOS_LOTE} asientos'}, status=400
+        )
+
+    try:
+        resultados = crear_asientos_lote(lista, request.user, todo_o_nada=bool(payload.get('todo_o_nada')))
+    except Exception as e:
+        logger.error(f"Error creando lote de asientos: {e}", exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+    creados = sum(1 for resultado in resultados if resultado['success'])
+    status = 201 if creados == len(resultados) else 207 if creados else 400
+    return JsonResponse({
+        'success': creados == len(resultados),
+        'creados': creados,
+        'rechazados': len(resultados) - creados,
+        'resultados': resultados,
+    }, status=status)
+
+
+@login_required
+def api_actualizar_asiento(request, asiento_id):
+    """
+    Edita un asiento vía JSON {version, fecha, descripcion, id_perfil, lineas}
+    (líneas con el formato de api_crear_asiento más el `id` del detalle que
+    modifican). Responde 409 con la versión actual si otro usuario lo modificó
+    desde que se leyó `version`.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    asiento = get_asiento_or_404(asiento_id)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    if not isinstance(payload, dict) or not isinstance(payload.get('lineas'), list):
+        return JsonResponse({'success': False, 'error': 'Debe enviar la versión y las líneas del asiento'}, status=400)
+
+    encabezado = {campo: payload[campo] for campo in ('fecha', 'descripcion') if campo in payload}
+    if 'id_perfil' in payload:
+        encabezado['id_perfil_id'] = payload['id_perfil'] or None
+    try:
+        resumen = actualizar_asiento(asiento, payload.get('version'), payload['lineas'], usuario=request.user, **encabezado)
+    except ConflictoVersion as e:
+        return JsonResponse({'success': False, 'error': str(e), 'version_actual': e.version_actual}, status=409)
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'errores': e.messages}, status=400)
+
+    return JsonResponse({'success': True, 'asiento_id': asiento.id, 'version': asiento.version, **resumen})
+
+
+@login_required
+def reporte_financiero(request, tipo, empresa_id):
+    """
+    Balance general (tipo=balance) o estado de resultados (tipo=resultados) de
+    una empresa. Parámetros GET: periodos (AAAA, AAAA-MM o desde:hasta separados
+    por coma; por defecto el mes actual), nivel (profundidad máxima de cuentas),
+    vacias=1 para incluir cuentas sin saldo y formato=json.
+    """
+    generador = GENERADORES.get(tipo)
+    if generador is None:
+        raise Http404("Reporte desconocido")
+    empresa = get_object_or_404(Empresa, pk=empresa_id)
+    textos = [t for valor in request.GET.getlist('periodos') for t in valor.split(',') if t.strip()]
+    try:
+        periodos = [parse_periodo(t) for t in textos] or [parse_periodo(timezone.localdate().strftime('%Y-%m'))]
+        nivel = int(request.GET['nivel']) if request.GET.get('nivel') else None
+        reporte = generador(empresa, periodos, nivel_max=nivel, incluir_vacias=request.GET.get('vacias') == '1')
+    except ValueError as e:
+        if request.GET.get('formato') == 'json':
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        messages.error(request, str(e))
+        return redirect('empresas:empresa_detail', empresa_id=empresa.pk)
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({'success': True, **reporte})
+    return render(request, 'asientos/reporte_financiero.html', {
+        'reporte': reporte,
+        'empresa': empresa,
+        'periodos_texto': ','.join(periodo['nombre'] for periodo in reporte['periodos']),
+        'max_periodos': MAX_PERIODOS,
+    })
+
+
+@login_required
+def api_reporte_consolidado(request, tipo):
+    """
+    Balance general o estado de resultados consolidado. Parámetros GET: plan (ID
+    del plan de consolidación, obligatorio), empresas (IDs separados por coma;
+    por defecto todas las activas), periodos, nivel y vacias como en
+    reporte_financiero.
+    """
+    if tipo not in GENERADORES:
+        raise Http404("Reporte desconocido")
+    try:
+        plan = PlanCuenta.objects.filter(pk=int(request.GET.get('plan', ''))).first()
+        ids = [int(i) for valor in request.GET.getlist('empresas') for i in valor.split(',') if i.strip()]
+        textos = [t for valor in request.GET.getlist('periodos') for t in valor.split(',') if t.strip()]
+        periodos = [parse_periodo(t) for t in textos] or [parse_periodo(timezone.localdate().strftime('%Y-%m'))]
+        nivel = int(request.GET['nivel']) if request.GET.get('nivel') else None
+        if plan is None:
+            raise ValueError("El plan de consolidación no existe")
+        empresas = Empresa.objects.filter(pk__in=ids) if ids else Empresa.objects.filter(activa=True)
+        reporte = consolidar(
+            tipo, list(empresas), plan, periodos, nivel_max=nivel, incluir_vacias=request.GET.get('vacias') == '1',
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({'success': True, **reporte})
+
+
+@login_required
+def api_tendencia_mensual(request):
+    """
+    Movimiento neto mensual por cuenta o por perfil. Parámetros GET: empresa
+    (ID; por defecto todas), periodo (AAAA, AAAA-MM o AAAA-MM-DD:AAAA-MM-DD;
+    por defecto el año en curso) y por ('cuenta' o 'perfil').
+    """
+    try:
+        empresa = None
+        if request.GET.get('empresa'):
+            empresa = Empresa.objects.filter(pk=int(request.GET['empresa'])).first()
+            if empresa is None:
+                raise ValueError(f"La empresa {request.GET['empresa']} no existe")
+        periodo = parse_periodo(request.GET.get('periodo') or str(timezone.localdate().year))
+        tendencia = tendencia_mensual(empresa, periodo.desde, periodo.hasta, por=request.GET.get('por', 'cuenta'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'periodo': periodo.as_dict(), **tendencia})
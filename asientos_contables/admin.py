@@ -3,7 +3,7 @@ from django.contrib import messages
 from django.urls import path
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
-from .models import SMTPConfiguration
+from .models import SMTPConfiguration, CorreoSaliente
 
 
 @admin.register(SMTPConfiguration)
@@ -126,4 +126,25 @@ class SMTPConfigurationAdmin(admin.ModelAdmin):
         css = {
             'all': ('admin/css/smtp_config.css',)
         }
-        js = ('admin/js/smtp_config.js',)
\ No newline at end of file
+        js = ('admin/js/smtp_config.js',)
+
+
+@admin.register(CorreoSaliente)
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'from_email', 'estado', 'intentos', 'created_at', 'enviado_at')
+    list_filter = ('estado', 'created_at')
+    search_fields = ('subject', 'from_email')
+    readonly_fields = ('created_at', 'enviado_at', 'ultimo_error')
+    actions = ['reintentar_envio']
+
+    def reintentar_envio(self, request, queryset):
+        """Devuelve los correos seleccionados a la bandeja de salida"""
+        from django.utils import timezone
+        actualizados = queryset.exclude(estado=CorreoSaliente.ENVIADO).update(
+            estado=CorreoSaliente.PENDIENTE,
+            intentos=0,
+            programado_para=timezone.now(),
+        )
+        messages.success(request, f"{actualizados} correos devueltos a la bandeja de salida")
+
+    reintentar_envio.short_description = "Reintentar envío de los correos seleccionados"
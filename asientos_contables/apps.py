@@ -8,10 +8,9 @@ class AsientosContablesConfig(AppConfig):
     
     def ready(self):
         """Configuraciones que se ejecutan cuando la app está lista"""
-        # Aplicar configuración SMTP activa al iniciar
-        try:
-            from .models import SMTPConfiguration
-            SMTPConfiguration.apply_active_config()
-        except Exception:
-            # Ignorar errores durante migraciones o cuando no existe la tabla
-            pass
\ No newline at end of file
+        # La configuración SMTP activa ya no se copia a settings: la conexión de correo
+        # se construye bajo demanda (asientos_contables.mail.conexion_activa) y las
+        # señales la invalidan al guardar una configuración
+        from . import signals
+        signals.conectar_contadores()
+        signals.conectar_mapa_identidad()
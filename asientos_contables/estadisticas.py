@@ -0,0 +1,69 @@
+"""
+Estadísticas del dashboard en tiempo constante.
+
+Los totales se leen de filas ContadorEstadistica que las señales incrementan o
+decrementan al crear/eliminar registros; la lista de asientos recientes se guarda
+en cache con un TTL corto. Las operaciones masivas que no disparan señales
+(bulk_create, update) deben llamar a `incrementar` o `recalcular`.
+"""
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import ContadorEstadistica
+
+logger = logging.getLogger(__name__)
+
+# nombre del contador -> modelo contado
+CONTADORES = {
+    'asientos': 'asientos.Asiento',
+    'perfiles': 'perfiles.Perfil',
+    'planes_cuentas': 'plan_cuentas.PlanCuenta',
+}
+
+CACHE_KEY_RECIENTES = 'dashboard:asientos_recientes'
+TTL_RECIENTES = getattr(settings, 'DASHBOARD_RECIENTES_TTL', 30)
+
+
+def incrementar(nombre, delta=1):
+    """Suma `delta` al contador con un UPDATE atómico; lo inicializa si no existe"""
+    if not ContadorEstadistica.objects.filter(nombre=nombre).update(valor=F('valor') + delta):
+        recalcular(nombre)
+
+
+def recalcular(nombre=None):
+    """Recalcula desde la base de datos uno o todos los contadores. Retorna {nombre: valor}"""
+    nombres = [nombre] if nombre else list(CONTADORES)
+    valores = {}
+    for item in nombres:
+        modelo = apps.get_model(CONTADORES[item])
+        valor = modelo.objects.count()
+        ContadorEstadistica.objects.update_or_create(nombre=item, defaults={'valor': valor})
+        valores[item] = valor
+    return valores
+
+
+def obtener_contadores():
+    """Todos los contadores en una sola consulta por clave primaria única"""
+    valores = dict(ContadorEstadistica.objects.filter(nombre__in=CONTADORES).values_list('nombre', 'valor'))
+    faltantes = [nombre for nombre in CONTADORES if nombre not in valores]
+    for nombre in faltantes:
+        valores.update(recalcular(nombre))
+    return valores
+
+
+def asientos_recientes(limite=5):
+    """Últimos asientos para el dashboard, cacheados TTL_RECIENTES segundos"""
+    def cargar():
+        from asientos.models import Asiento
+        return list(
+            Asiento.objects.order_by('-fecha').values('id', 'fecha', 'descripcion', 'fecha_creacion')[:limite]
+        )
+    return cache.get_or_set(CACHE_KEY_RECIENTES, cargar, TTL_RECIENTES)
+
+
+def invalidar_recientes():
+    cache.delete(CACHE_KEY_RECIENTES)
@@ -0,0 +1,174 @@
+"""
+Mapa de identidad por petición para los datos de referencia (Empresa,
+PlanCuenta, Cuenta y Perfil).
+
+Durante una petición (ver MapaIdentidadMiddleware) cada instancia se lee una sola
+vez: obtener() y precargar() devuelven la misma instancia a quien la pida de
+nuevo, y relacionado() recorre claves foráneas (cuenta -> plan -> empresa) a
+través del mapa. Las instancias traídas con select_related también se
+registran. El mapa se descarta al terminar la petición y las señales de
+guardado y borrado retiran las instancias modificadas; los update() masivos no
+disparan señales, así que quien los haga dentro de una petición debe llamar a
+descartar(). Sin mapa activo (hilos de un pool, comandos) las funciones consultan
+la base de datos como siempre; `mapa_identidad()` abre uno explícitamente.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.apps import apps
+
+MODELOS = ('empresas.Empresa', 'plan_cuentas.PlanCuenta', 'plan_cuentas.Cuenta', 'perfiles.Perfil')
+
+_mapa = contextvars.ContextVar('mapa_identidad', default=None)
+_NO_EXISTE = object()
+
+
+class MapaIdentidad:
+    """Instancias por (modelo, pk); None registra que la fila no existe"""
+
+    def __init__(self):
+        self._instancias = {}
+
+    def __len__(self):
+        return len(self._instancias)
+
+    @staticmethod
+    def clave(modelo, pk):
+        return modelo._meta.label_lower, modelo._meta.pk.to_python(pk)
+
+    def get(self, modelo, pk):
+        return self._instancias.get(self.clave(modelo, pk), _NO_EXISTE)
+
+    def registrar(self, instancia):
+        """Registra `instancia` (y sus relaciones ya cargadas); retorna la instancia del mapa"""
+        clave = self.clave(type(instancia), instancia.pk)
+        actual = self._instancias.get(clave)
+        if actual is not None:
+            return actual
+        self._instancias[clave] = instancia
+        for campo in instancia._meta.concrete_fields:
+            if campo.is_relation and campo.is_cached(instancia) and campo.related_model._meta.label in MODELOS:
+                relacionada = campo.get_cached_value(instancia)
+                if relacionada is not None:
+                    # Una relación ya mapeada se reemplaza por la instancia del mapa
+                    campo.set_cached_value(instancia, self.registrar(relacionada))
+        return instancia
+
+    def ausente(self, modelo, pk):
+        self._instancias[self.clave(modelo, pk)] = None
+
+    def descartar(self, modelo, pk=None):
+        etiqueta = modelo._meta.label_lower
+        if pk is None:
+            for clave in [clave for clave in self._instancias if clave[0] == etiqueta]:
+                del self._instancias[clave]
+        else:
+            self._instancias.pop(self.clave(modelo, pk), None)
+
+
+def mapa_activo():
+    """Mapa de identidad de la petición en curso, o None"""
+    return _mapa.get()
+
+
+@contextmanager
+def mapa_identidad():
+    """Activa un mapa de identidad (o reutiliza el que ya está activo) mientras dure el bloque"""
+    if _mapa.get() is not None:
+        yield _mapa.get()
+        return
+    token = _mapa.set(MapaIdentidad())
+    try:
+        yield _mapa.get()
+    finally:
+        _mapa.reset(token)
+
+
+def obtener(modelo, pk, select_related=()):
+    """Instancia de `modelo` con clave `pk`, o None si no existe. Una consulta por instancia y petición"""
+    if pk is None:
+        return None
+    mapa = _mapa.get()
+    if mapa is not None:
+        instancia = mapa.get(modelo, pk)
+        if instancia is not _NO_EXISTE:
+            return instancia
+    instancia = modelo._default_manager.select_related(*select_related).filter(pk=pk).first()
+    if mapa is not None:
+        if instancia is None:
+            mapa.ausente(modelo, pk)
+        else:
+            instancia = mapa.registrar(instancia)
+    return instancia
+
+
+def precargar(modelo, pks, select_related=()):
+    """
+    {pk: instancia} de las `pks` que existen, leyendo en una consulta solo las
+    que aún no están en el mapa. `select_related` registra también las relaciones
+    """
+    pks = {modelo._meta.pk.to_python(pk) for pk in pks if pk is not None}
+    mapa = _mapa.get()
+    if mapa is None:
+        return modelo._default_manager.select_related(*select_related).in_bulk(pks) if pks else {}
+
+    encontradas, faltantes = {}, []
+    for pk in pks:
+        instancia = mapa.get(modelo, pk)
+        if instancia is _NO_EXISTE:
+            faltantes.append(pk)
+        elif instancia is not None:
+            encontradas[pk] = instancia
+    if faltantes:
+        leidas = modelo._default_manager.select_related(*select_related).in_bulk(faltantes)
+        for pk in faltantes:
+            if pk in leidas:
+                encontradas[pk] = mapa.registrar(leidas[pk])
+            else:
+                mapa.ausente(modelo, pk)
+    return encontradas
+
+
+def registrar(instancias):
+    """Registra instancias leídas por otra consulta; retorna las instancias del mapa"""
+    mapa = _mapa.get()
+    if mapa is None:
+        return list(instancias)
+    return [mapa.registrar(instancia) for instancia in instancias]
+
+
+def relacionado(instancia, campo):
+    """
+    Objeto de la clave foránea `campo` de `instancia`, a través del mapa: sin
+    consulta si ya se leyó en esta petición
+    """
+    if instancia is None:
+        return None
+    field = instancia._meta.get_field(campo)
+    if field.is_cached(instancia):
+        return field.get_cached_value(instancia)
+    objeto = obtener(field.related_model, getattr(instancia, field.attname))
+    field.set_cached_value(instancia, objeto)
+    return objeto
+
+
+def descartar(modelo, pk=None, **kwargs):
+    """Retira una instancia (o todas las del modelo) del mapa activo"""
+    mapa = _mapa.get()
+    if mapa is not None:
+        mapa.descartar(modelo, pk)
+
+
+def modelos():
+    return [apps.get_model(etiqueta) for etiqueta in MODELOS]
+
+
+class MapaIdentidadMiddleware:
+    """Un mapa de identidad por petición, descartado al terminar"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with mapa_identidad():
+            return self.get_response(request)
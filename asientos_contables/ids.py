@@ -0,0 +1,43 @@
+"""
+Generación de identificadores compactos ordenados por tiempo (ULID).
+
+Se generan en memoria sin consultar la base de datos: 48 bits de milisegundos +
+80 bits aleatorios, 26 caracteres Crockford base32. Los IDs del mismo milisegundo
+dentro del proceso se incrementan de forma monótona, por lo que no colisionan y
+los inserts quedan al final del índice de InnoDB.
+"""
+import os
+import threading
+import time
+
+# Alfabeto Crockford base32 (orden lexicográfico = orden numérico)
+_ULID_ALFABETO = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_ulid_lock = threading.Lock()
+_ulid_ultimo = {'ms': -1, 'aleatorio': 0}
+
+
+def generar_ulid(momento_ms=None, aleatorio=None):
+    """
+    ULID de 26 caracteres para `momento_ms` (por defecto, el instante actual).
+    Con `momento_ms` y `aleatorio` (entero de 80 bits, p. ej. de un generador con
+    semilla) el resultado es reproducible
+    """
+    ms = int(time.time() * 1000) if momento_ms is None else int(momento_ms)
+    if momento_ms is not None and aleatorio is not None:
+        aleatorio &= (1 << 80) - 1
+    else:
+        with _ulid_lock:
+            if momento_ms is None and ms <= _ulid_ultimo['ms']:
+                ms = _ulid_ultimo['ms']
+                aleatorio = (_ulid_ultimo['aleatorio'] + 1) & ((1 << 80) - 1)
+            else:
+                aleatorio = int.from_bytes(os.urandom(10), 'big')
+            if momento_ms is None:
+                _ulid_ultimo.update(ms=ms, aleatorio=aleatorio)
+
+    valor = (ms << 80) | aleatorio
+    caracteres = []
+    for _ in range(26):
+        caracteres.append(_ULID_ALFABETO[valor & 31])
+        valor >>= 5
+    return ''.join(reversed(caracteres))
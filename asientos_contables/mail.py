@@ -0,0 +1,280 @@
+"""
+Envío de correo no bloqueante.
+
+`QueuedEmailBackend` guarda cada mensaje en la bandeja de salida (CorreoSaliente)
+y retorna de inmediato; `send_mail` en las vistas ya no espera al servidor SMTP.
+El comando `enviar_correos` vacía la bandeja usando una única conexión del backend
+real (EMAIL_DELIVERY_BACKEND), con reintentos y espera exponencial.
+
+La conexión de entrega se construye con `conexion_activa()` a partir de la
+SMTPConfiguration activa y se cachea por proceso; las señales de SMTPConfiguration
+la invalidan. Nunca se modifican los EMAIL_* de django.conf.settings.
+"""
+import base64
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = getattr(settings, 'EMAIL_QUEUE_MAX_INTENTOS', 5)
+# Segundos antes del primer reintento; se duplica en cada intento
+ESPERA_REINTENTO = getattr(settings, 'EMAIL_QUEUE_ESPERA_REINTENTO', 30)
+# Segundos que otros procesos reutilizan la conexión antes de volver a leer la configuración activa
+TTL_CONEXION = getattr(settings, 'EMAIL_CONNECTION_CACHE_TTL', 60)
+
+_conexion_lock = threading.Lock()
+_conexion_cache = {'backend': None, 'remitente': None, 'expira': 0.0}
+
+
+def conexion_activa():
+    """
+    EmailBackend de entrega para la SMTPConfiguration activa (o para los EMAIL_*
+    de settings si no hay ninguna). Se construye una vez por proceso y se reutiliza
+    hasta que una señal lo invalida o vence EMAIL_CONNECTION_CACHE_TTL.
+    """
+    return _snapshot_conexion()['backend']
+
+
+def remitente_activo():
+    """DEFAULT_FROM_EMAIL efectivo: el de la configuración activa o el de settings"""
+    return _snapshot_conexion()['remitente']
+
+
+def resumen_conexion():
+    """
+    Servidor, puerto, remitente y backend con los que se entregan los correos
+    (los de conexion_activa, no los EMAIL_* de settings), sin credenciales
+    """
+    snapshot = _snapshot_conexion()
+    backend = snapshot['backend']
+    return {
+        'host': getattr(backend, 'host', None),
+        'port': getattr(backend, 'port', None),
+        'from_email': snapshot['remitente'],
+        'backend': settings.EMAIL_BACKEND,
+        'delivery_backend': f"{type(backend).__module__}.{type(backend).__name__}",
+    }
+
+
+def invalidar_conexion(**kwargs):
+    """Descarta la conexión cacheada (receptor de post_save/post_delete de SMTPConfiguration)"""
+    with _conexion_lock:
+        _conexion_cache.update(backend=None, remitente=None, expira=0.0)
+
+
+def _snapshot_conexion():
+    with _conexion_lock:
+        if _conexion_cache['backend'] is not None and time.monotonic() < _conexion_cache['expira']:
+            return dict(_conexion_cache)
+
+    from .models import SMTPConfiguration
+
+    config = SMTPConfiguration.get_active_config()
+    if config:
+        backend = config.get_connection()
+        remitente = config.default_from_email
+    else:
+        backend = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+        remitente = settings.DEFAULT_FROM_EMAIL
+
+    with _conexion_lock:
+        _conexion_cache.update(backend=backend, remitente=remitente, expira=time.monotonic() + TTL_CONEXION)
+        return dict(_conexion_cache)
+
+
+class ActiveConfigEmailBackend(BaseEmailBackend):
+    """
+    Backend de envío directo que delega en `conexion_activa()`. Útil como
+    EMAIL_BACKEND cuando no se quiere la bandeja de salida; el backend SMTP
+    de Django serializa send_messages con su propio lock.
+    """
+
+    def send_messages(self, email_messages):
+        try:
+            return conexion_activa().send_messages(email_messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Backend de correo que encola los mensajes en la base de datos"""
+
+    def send_messages(self, email_messages):
+        from .models import CorreoSaliente
+
+        if not email_messages:
+            return 0
+
+        encolados = 0
+        for message in email_messages:
+            try:
+                CorreoSaliente.objects.create(**serializar_mensaje(message))
+                encolados += 1
+            except Exception as e:
+                logger.error(f"Error encolando correo '{message.subject}': {str(e)}", exc_info=True)
+                if not self.fail_silently:
+                    raise
+        return encolados
+
+
+def serializar_mensaje(message):
+    """Convierte un EmailMessage en los campos de CorreoSaliente"""
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, tuple):
+            filename, content, mimetype = attachment
+            if isinstance(content, str):
+                content = content.encode()
+            attachments.append({
+                'filename': filename,
+                'content': base64.b64encode(content).decode(),
+                'mimetype': mimetype,
+            })
+        else:
+            # MIMEBase ya construido
+            attachments.append({
+                'filename': attachment.get_filename(),
+                'content': base64.b64encode(attachment.get_payload(decode=True) or b'').decode(),
+                'mimetype': attachment.get_content_type(),
+            })
+
+    return {
+        'subject': str(message.subject)[:255],
+        'body': message.body or '',
+        'from_email': message.from_email or settings.DEFAULT_FROM_EMAIL,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'alternatives': [list(alt) for alt in getattr(message, 'alternatives', [])],
+        'attachments': attachments,
+    }
+
+
+def construir_mensaje(correo, connection=None, remitente=None):
+    """
+    Reconstruye el EmailMessage a partir de una fila de la bandeja de salida.
+    Los correos encolados con el remitente por defecto de settings salen con
+    `remitente` (el de la configuración SMTP activa) si se indica.
+    """
+    from_email = correo.from_email
+    if remitente and from_email == settings.DEFAULT_FROM_EMAIL:
+        from_email = remitente
+
+    message = EmailMultiAlternatives(
+        subject=correo.subject,
+        body=correo.body,
+        from_email=from_email,
+        to=correo.to,
+        cc=correo.cc,
+        bcc=correo.bcc,
+        reply_to=correo.reply_to,
+        headers=correo.headers,
+        connection=connection,
+    )
+    for content, mimetype in correo.alternatives:
+        message.attach_alternative(content, mimetype)
+    for attachment in correo.attachments:
+        message.attach(
+            attachment['filename'],
+            base64.b64decode(attachment['content']),
+            attachment['mimetype'],
+        )
+    return message
+
+
+def reclamar_pendientes(lote):
+    """Marca como 'enviando' hasta `lote` correos listos y los retorna"""
+    from .models import CorreoSaliente
+
+    ahora = timezone.now()
+    candidatos = list(CorreoSaliente.objects.filter(
+        estado=CorreoSaliente.PENDIENTE,
+        programado_para__lte=ahora,
+    ).order_by('programado_para', 'id').values_list('pk', flat=True)[:lote])
+
+    reclamados = []
+    for pk in candidatos:
+        if CorreoSaliente.objects.filter(pk=pk, estado=CorreoSaliente.PENDIENTE).update(estado=CorreoSaliente.ENVIANDO):
+            reclamados.append(pk)
+    return list(CorreoSaliente.objects.filter(pk__in=reclamados).order_by('id'))
+
+
+def enviar_pendientes(lote=50, connection=None):
+    """
+    Envía un lote de correos pendientes reutilizando una sola conexión.
+    Retorna (enviados, fallidos).
+    """
+    from .models import CorreoSaliente
+
+    correos = reclamar_pendientes(lote)
+    if not correos:
+        return 0, 0
+
+    remitente = None
+    if connection is None:
+        connection = conexion_activa()
+        remitente = remitente_activo()
+
+    enviados = fallidos = 0
+    try:
+        connection.open()
+        for correo in correos:
+            try:
+                connection.send_messages([construir_mensaje(correo, connection, remitente)])
+            except Exception as e:
+                fallidos += 1
+                _registrar_fallo(correo, e)
+                # La conexión pudo quedar inutilizable; reabrir para el resto del lote
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception:
+                    pass
+                continue
+
+            CorreoSaliente.objects.filter(pk=correo.pk).update(
+                estado=CorreoSaliente.ENVIADO,
+                intentos=correo.intentos + 1,
+                ultimo_error='',
+                enviado_at=timezone.now(),
+            )
+            enviados += 1
+    except Exception as e:
+        # No se pudo abrir la conexión: devolver el lote a la cola
+        logger.error(f"No se pudo conectar al servidor de correo: {str(e)}")
+        for correo in correos[enviados + fallidos:]:
+            _registrar_fallo(correo, e)
+            fallidos += 1
+    finally:
+        connection.close()
+
+    return enviados, fallidos
+
+
+def _registrar_fallo(correo, error):
+    from .models import CorreoSaliente
+
+    intentos = correo.intentos + 1
+    logger.warning(f"Error enviando correo {correo.pk} (intento {intentos}): {str(error)}")
+    if intentos >= MAX_INTENTOS:
+        estado, programado_para = CorreoSaliente.FALLIDO, correo.programado_para
+    else:
+        estado = CorreoSaliente.PENDIENTE
+        programado_para = timezone.now() + timedelta(seconds=ESPERA_REINTENTO * (2 ** (intentos - 1)))
+    CorreoSaliente.objects.filter(pk=correo.pk).update(
+        estado=estado,
+        intentos=intentos,
+        ultimo_error=str(error),
+        programado_para=programado_para,
+    )
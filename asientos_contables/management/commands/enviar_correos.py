@@ -0,0 +1,50 @@
+"""
+Vacía la bandeja de salida de correos (CorreoSaliente).
+
+Uso:
+    python manage.py enviar_correos            # corre indefinidamente
+    python manage.py enviar_correos --once     # envía lo pendiente y termina
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from asientos_contables.mail import enviar_pendientes
+from asientos_contables.models import CorreoSaliente
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos encolados por QueuedEmailBackend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Envía lo pendiente y termina')
+        parser.add_argument('--lote', type=int, default=50, help='Correos por conexión SMTP (default: 50)')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Segundos de espera con la bandeja vacía (default: 1)')
+        parser.add_argument(
+            '--liberar-enviando',
+            action='store_true',
+            help="Devuelve a pendiente los correos que quedaron en 'enviando' (usar con un solo proceso de envío)",
+        )
+
+    def handle(self, *args, **options):
+        if options['liberar_enviando']:
+            liberados = CorreoSaliente.objects.filter(estado=CorreoSaliente.ENVIANDO).update(estado=CorreoSaliente.PENDIENTE)
+            self.stdout.write(f"{liberados} correos devueltos a la bandeja de salida")
+
+        try:
+            while True:
+                close_old_connections()
+                enviados, fallidos = enviar_pendientes(lote=options['lote'])
+                if enviados or fallidos:
+                    self.stdout.write(f"  ✓ {enviados} enviados, {fallidos} con error")
+
+                if options['once'] and not (enviados or fallidos):
+                    break
+                if not (enviados or fallidos):
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Envío de correos detenido')
+            return
+
+        self.stdout.write(self.style.SUCCESS('✅ Bandeja de salida procesada'))
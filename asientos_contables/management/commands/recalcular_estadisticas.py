@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from asientos_contables.estadisticas import invalidar_recientes, recalcular
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del dashboard desde la base de datos (tras cargas masivas o importaciones)'
+
+    def handle(self, *args, **options):
+        valores = recalcular()
+        invalidar_recientes()
+        for nombre, valor in valores.items():
+            self.stdout.write(f"  ✓ {nombre}: {valor}")
+        self.stdout.write(self.style.SUCCESS('✅ Contadores recalculados'))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-19 12:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asientos_contables', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Asunto')),
+                ('body', models.TextField(blank=True, verbose_name='Cuerpo')),
+                ('from_email', models.CharField(max_length=255, verbose_name='Remitente')),
+                ('to', models.JSONField(default=list, verbose_name='Destinatarios')),
+                ('cc', models.JSONField(blank=True, default=list, verbose_name='CC')),
+                ('bcc', models.JSONField(blank=True, default=list, verbose_name='CCO')),
+                ('reply_to', models.JSONField(blank=True, default=list, verbose_name='Responder a')),
+                ('headers', models.JSONField(blank=True, default=dict, verbose_name='Cabeceras')),
+                ('alternatives', models.JSONField(blank=True, default=list, verbose_name='Alternativas (HTML)')),
+                ('attachments', models.JSONField(blank=True, default=list, verbose_name='Adjuntos (base64)')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='Último Error')),
+                ('programado_para', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Programado Para')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('enviado_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado')),
+            ],
+            options={
+                'verbose_name': 'Correo Saliente',
+                'verbose_name_plural': 'Bandeja de Salida',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='correosaliente',
+            index=models.Index(fields=['estado', 'programado_para'], name='correo_estado_prog_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asientos_contables', '0002_correosaliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorEstadistica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True, verbose_name='Nombre')),
+                ('valor', models.BigIntegerField(default=0, verbose_name='Valor')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contador de Estadística',
+                'verbose_name_plural': 'Contadores de Estadísticas',
+                'ordering': ['nombre'],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 class SMTPConfiguration(models.Model):
@@ -59,23 +60,32 @@ class SMTPConfiguration(models.Model):
             SMTPConfiguration.objects.filter(is_active=True).update(is_active=False)
         
         super().save(*args, **kwargs)
-        
-        # Aplicar configuración si está activa
-        if self.is_active:
-            self.apply_to_settings()
+        # La conexión cacheada se invalida con la señal post_save (ver signals.py)
 
-    def apply_to_settings(self):
-        """Aplica esta configuración a Django settings"""
+    def connection_kwargs(self):
+        """Parámetros de conexión para construir el EmailBackend de esta configuración"""
+        return {
+            'host': self.email_host,
+            'port': self.email_port,
+            'username': self.email_host_user,
+            'password': self.email_host_password,
+            'use_tls': self.email_use_tls,
+            'use_ssl': self.email_use_ssl,
+        }
+
+    def get_connection(self, fail_silently=False):
+        """
+        EmailBackend de entrega configurado con esta configuración, sin modificar
+        django.conf.settings (seguro con varios hilos enviando a la vez)
+        """
+        from django.core.mail import get_connection
         from django.conf import settings
-        
-        settings.EMAIL_HOST = self.email_host
-        settings.EMAIL_PORT = self.email_port
-        settings.EMAIL_USE_TLS = self.email_use_tls
-        settings.EMAIL_USE_SSL = self.email_use_ssl
-        settings.EMAIL_HOST_USER = self.email_host_user
-        settings.EMAIL_HOST_PASSWORD = self.email_host_password
-        settings.DEFAULT_FROM_EMAIL = self.default_from_email
-        settings.SERVER_EMAIL = self.default_from_email
+
+        return get_connection(
+            settings.EMAIL_DELIVERY_BACKEND,
+            fail_silently=fail_silently,
+            **self.connection_kwargs()
+        )
 
     def send_test_email(self):
         """Envía un email de prueba para verificar la configuración"""
@@ -83,17 +93,8 @@ class SMTPConfiguration(models.Model):
             raise ValueError("Debe especificar un email para pruebas")
         
         from django.core.mail import send_mail
-        from django.conf import settings
-        
-        # Aplicar temporalmente esta configuración
-        original_settings = {}
-        for setting in ['EMAIL_HOST', 'EMAIL_PORT', 'EMAIL_USE_TLS', 'EMAIL_USE_SSL', 
-                       'EMAIL_HOST_USER', 'EMAIL_HOST_PASSWORD', 'DEFAULT_FROM_EMAIL']:
-            original_settings[setting] = getattr(settings, setting, None)
         
         try:
-            self.apply_to_settings()
-            
             send_mail(
                 subject=f'Prueba de configuración SMTP - {self.name}',
                 message=f'Este es un email de prueba enviado desde la configuración SMTP "{self.name}".\n\n'
@@ -105,17 +106,13 @@ class SMTPConfiguration(models.Model):
                 from_email=self.default_from_email,
                 recipient_list=[self.test_email],
                 fail_silently=False,
+                # Envío directo (sin bandeja de salida) para reportar el resultado real del servidor
+                connection=self.get_connection(),
             )
             return True, "Email de prueba enviado exitosamente"
         
         except Exception as e:
             return False, f"Error enviando email de prueba: {str(e)}"
-        
-        finally:
-            # Restaurar configuraciones originales
-            for setting, value in original_settings.items():
-                if value is not None:
-                    setattr(settings, setting, value)
 
     def __str__(self):
         active_indicator = " (ACTIVA)" if self.is_active else ""
@@ -126,11 +123,66 @@ class SMTPConfiguration(models.Model):
         """Obtiene la configuración SMTP activa"""
         return cls.objects.filter(is_active=True).first()
 
-    @classmethod
-    def apply_active_config(cls):
-        """Aplica la configuración SMTP activa a Django settings"""
-        active_config = cls.get_active_config()
-        if active_config:
-            active_config.apply_to_settings()
-            return active_config
-        return None
\ No newline at end of file
+
+class CorreoSaliente(models.Model):
+    """
+    Bandeja de salida - Correos escritos por QueuedEmailBackend y enviados
+    por el comando `enviar_correos` fuera del ciclo request/response
+    """
+    PENDIENTE = 'pendiente'
+    ENVIANDO = 'enviando'
+    ENVIADO = 'enviado'
+    FALLIDO = 'fallido'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (ENVIANDO, 'Enviando'),
+        (ENVIADO, 'Enviado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name="Asunto")
+    body = models.TextField(blank=True, verbose_name="Cuerpo")
+    from_email = models.CharField(max_length=255, verbose_name="Remitente")
+    to = models.JSONField(default=list, verbose_name="Destinatarios")
+    cc = models.JSONField(default=list, blank=True, verbose_name="CC")
+    bcc = models.JSONField(default=list, blank=True, verbose_name="CCO")
+    reply_to = models.JSONField(default=list, blank=True, verbose_name="Responder a")
+    headers = models.JSONField(default=dict, blank=True, verbose_name="Cabeceras")
+    alternatives = models.JSONField(default=list, blank=True, verbose_name="Alternativas (HTML)")
+    attachments = models.JSONField(default=list, blank=True, verbose_name="Adjuntos (base64)")
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE, verbose_name="Estado")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    ultimo_error = models.TextField(blank=True, default='', verbose_name="Último Error")
+    programado_para = models.DateTimeField(default=timezone.now, verbose_name="Programado Para")
+    created_at = models.DateTimeField(auto_now_add=True)
+    enviado_at = models.DateTimeField(null=True, blank=True, verbose_name="Enviado")
+
+    class Meta:
+        verbose_name = "Correo Saliente"
+        verbose_name_plural = "Bandeja de Salida"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['estado', 'programado_para'], name='correo_estado_prog_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.get_estado_display()})"
+
+
+class ContadorEstadistica(models.Model):
+    """
+    Contadores del dashboard mantenidos por señales (ver estadisticas.py),
+    para no ejecutar COUNT(*) sobre tablas grandes en cada visita
+    """
+    nombre = models.CharField(max_length=50, unique=True, verbose_name="Nombre")
+    valor = models.BigIntegerField(default=0, verbose_name="Valor")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Contador de Estadística"
+        verbose_name_plural = "Contadores de Estadísticas"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return f"{self.nombre}: {self.valor}"
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'django_otp.plugins.otp_totp',  # Para generar tokens TOTP (como Google Authenticator)
     'two_factor_auth',
     'secure_data',  # Módulo ultra-seguro
+    'tareas',  # Tareas en segundo plano (worker: manage.py procesar_tareas)
 ]
 
 MIDDLEWARE = [
@@ -43,11 +44,11 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'asientos_contables.identidad.MapaIdentidadMiddleware',  # Datos de referencia leídos una vez por petición
     'django_otp.middleware.OTPMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'two_factor_auth.middleware.TwoFactorMiddleware',
     'secure_data.middleware.SecureSessionMiddleware',  # Middleware del módulo seguro
-    'asientos_contables.middleware.SMTPConfigurationMiddleware',  # Middleware SMTP
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -141,7 +142,17 @@ TWILIO_AUTH_TOKEN = 'tu_auth_token'
 TWILIO_CALLER_ID = '+1234567890'
 
 # Configuración de correo electrónico
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Los correos se encolan en la bandeja de salida (CorreoSaliente) y los envía
+# `python manage.py enviar_correos` con EMAIL_DELIVERY_BACKEND. Para desarrollo
+# puede usarse 'django.core.mail.backends.console.EmailBackend' o el backend
+# 'filebased' (con EMAIL_FILE_PATH) como EMAIL_DELIVERY_BACKEND.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'asientos_contables.mail.QueuedEmailBackend')
+EMAIL_DELIVERY_BACKEND = os.getenv('EMAIL_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'logs', 'emails'))
+EMAIL_QUEUE_MAX_INTENTOS = int(os.getenv('EMAIL_QUEUE_MAX_INTENTOS', 5))
+EMAIL_QUEUE_ESPERA_REINTENTO = int(os.getenv('EMAIL_QUEUE_ESPERA_REINTENTO', 30))
+# Segundos que cada proceso reutiliza la conexión SMTP de la configuración activa (SMTPConfiguration)
+EMAIL_CONNECTION_CACHE_TTL = int(os.getenv('EMAIL_CONNECTION_CACHE_TTL', 60))
 
 # Configuración de django-otp para 2FA con tolerancia mejorada
 OTP_TOTP_TOLERANCE = 20  # Permitir 20 tokens antes/después (total ~600 segundos)
@@ -173,6 +184,21 @@ SITE_BASE_URL = os.getenv('SITE_BASE_URL', 'http://localhost:8002')
 # Temporary 2FA bypass flag (for troubleshooting)
 TWO_FACTOR_BYPASS = os.getenv('TWO_FACTOR_BYPASS', '0').lower() in ('1', 'true', 'yes')
 
+# Tareas en segundo plano
+# Número de detalles a partir del cual add_detalles_bulk se encola en vez de ejecutarse en el request
+TAREAS_UMBRAL_DETALLES_BULK = int(os.getenv('TAREAS_UMBRAL_DETALLES_BULK', 500))
+# Segundos de espera antes del primer reintento de una tarea fallida (se duplica en cada intento)
+TAREAS_ESPERA_REINTENTO = int(os.getenv('TAREAS_ESPERA_REINTENTO', 30))
+# Segundos entre latidos de una tarea en ejecución; el worker libera las que llevan --timeout minutos sin latir
+TAREAS_INTERVALO_LATIDO = int(os.getenv('TAREAS_INTERVALO_LATIDO', 30))
+
+# Segundos que el dashboard reutiliza la lista de asientos recientes
+DASHBOARD_RECIENTES_TTL = int(os.getenv('DASHBOARD_RECIENTES_TTL', 30))
+
+# Segundos que se cachea cada nivel y búsqueda del árbol de un plan de cuentas
+# (las claves incluyen la versión del plan, así que los cambios se ven de inmediato)
+PLAN_CUENTAS_ARBOL_TTL = int(os.getenv('PLAN_CUENTAS_ARBOL_TTL', 300))
+
 # Cache configuration for 2FA codes
 CACHES = {
     'default': {
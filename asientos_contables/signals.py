@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .mail import invalidar_conexion
+from .models import SMTPConfiguration
+
+
+@receiver(post_save, sender=SMTPConfiguration)
+@receiver(post_delete, sender=SMTPConfiguration)
+def smtp_configuration_changed(sender, **kwargs):
+    """Invalidar la conexión de correo cacheada al cambiar cualquier configuración SMTP"""
+    invalidar_conexion()
+
+
+
+def _receptores_contador(nombre):
+    from .estadisticas import incrementar, invalidar_recientes
+
+    def al_guardar(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        if created:
+            incrementar(nombre, 1)
+        if nombre == 'asientos':
+            invalidar_recientes()
+
+    def al_eliminar(sender, instance, **kwargs):
+        incrementar(nombre, -1)
+        if nombre == 'asientos':
+            invalidar_recientes()
+
+    return al_guardar, al_eliminar
+
+
+def conectar_contadores():
+    """Conectar los contadores del dashboard a los modelos que cuentan (llamado desde ready)"""
+    from django.apps import apps
+    from .estadisticas import CONTADORES
+
+    for nombre, etiqueta in CONTADORES.items():
+        modelo = apps.get_model(etiqueta)
+        al_guardar, al_eliminar = _receptores_contador(nombre)
+        post_save.connect(al_guardar, sender=modelo, weak=False, dispatch_uid=f'contador_{nombre}_save')
+        post_delete.connect(al_eliminar, sender=modelo, weak=False, dispatch_uid=f'contador_{nombre}_delete')
+
+
+def _descartar_de_mapa(sender, instance, raw=False, **kwargs):
+    from .identidad import descartar
+    descartar(sender, instance.pk)
+
+
+def conectar_mapa_identidad():
+    """Retirar del mapa de identidad de la petición los datos de referencia modificados (llamado desde ready)"""
+    from .identidad import modelos
+
+    for modelo in modelos():
+        etiqueta = modelo._meta.label_lower
+        post_save.connect(_descartar_de_mapa, sender=modelo, dispatch_uid=f'mapa_identidad_{etiqueta}_save')
+        post_delete.connect(_descartar_de_mapa, sender=modelo, dispatch_uid=f'mapa_identidad_{etiqueta}_delete')
@@ -0,0 +1,238 @@
+from django.conf import settings
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from asientos_contables.mail import (
+    conexion_activa, enviar_pendientes, invalidar_conexion, remitente_activo, resumen_conexion,
+)
+from asientos_contables.models import CorreoSaliente, SMTPConfiguration
+
+
+@override_settings(
+    EMAIL_BACKEND='asientos_contables.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class QueuedEmailBackendTests(TestCase):
+    def test_send_mail_encola_sin_enviar(self):
+        enviados = mail.send_mail('Asunto', 'Cuerpo', 'from@example.com', ['to@example.com'])
+        self.assertEqual(enviados, 1)
+        self.assertEqual(len(mail.outbox), 0)
+        correo = CorreoSaliente.objects.get()
+        self.assertEqual(correo.estado, CorreoSaliente.PENDIENTE)
+        self.assertEqual(correo.to, ['to@example.com'])
+
+    def test_enviar_pendientes_entrega_y_marca_enviado(self):
+        message = mail.EmailMultiAlternatives('Reporte', 'Texto', 'from@example.com', ['to@example.com'])
+        message.attach_alternative('<p>Texto</p>', 'text/html')
+        message.attach('reporte.csv', 'a,b\n1,2\n', 'text/csv')
+        message.send()
+
+        self.assertEqual(enviar_pendientes(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        entregado = mail.outbox[0]
+        self.assertEqual(entregado.subject, 'Reporte')
+        self.assertEqual(entregado.alternatives[0][1], 'text/html')
+        self.assertEqual(entregado.attachments[0][0], 'reporte.csv')
+        self.assertEqual(CorreoSaliente.objects.get().estado, CorreoSaliente.ENVIADO)
+
+    def test_fallo_programa_reintento(self):
+        mail.send_mail('Asunto', 'Cuerpo', 'from@example.com', ['to@example.com'])
+
+        class ConexionRota:
+            def open(self):
+                pass
+
+            def close(self):
+                pass
+
+            def send_messages(self, messages):
+                raise ConnectionError('SMTP caído')
+
+        self.assertEqual(enviar_pendientes(connection=ConexionRota()), (0, 1))
+        correo = CorreoSaliente.objects.get()
+        self.assertEqual(correo.estado, CorreoSaliente.PENDIENTE)
+        self.assertEqual(correo.intentos, 1)
+        self.assertGreater(correo.programado_para, correo.created_at)
+        self.assertIn('SMTP caído', correo.ultimo_error)
+
+
+@override_settings(EMAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend')
+class ConexionActivaTests(TestCase):
+    def setUp(self):
+        invalidar_conexion()
+        self.addCleanup(invalidar_conexion)
+
+    def crear_config(self, name, host, activa=True):
+        return SMTPConfiguration.objects.create(
+            name=name,
+            email_host=host,
+            email_port=587,
+            email_host_user='usuario',
+            email_host_password='clave',
+            default_from_email=f'noreply@{host}',
+            is_active=activa,
+        )
+
+    def test_conexion_cacheada_sin_consultas(self):
+        self.crear_config('Principal', 'smtp.uno.com')
+        backend = conexion_activa()
+        self.assertEqual(backend.host, 'smtp.uno.com')
+        with self.assertNumQueries(0):
+            self.assertIs(conexion_activa(), backend)
+
+    def test_guardar_configuracion_invalida_cache(self):
+        config = self.crear_config('Principal', 'smtp.uno.com')
+        self.assertEqual(conexion_activa().host, 'smtp.uno.com')
+        config.email_host = 'smtp.dos.com'
+        config.save()
+        self.assertEqual(conexion_activa().host, 'smtp.dos.com')
+        self.assertEqual(remitente_activo(), 'noreply@smtp.uno.com')
+
+    @override_settings(EMAIL_BACKEND='asientos_contables.mail.QueuedEmailBackend')
+    def test_endpoint_de_prueba_muestra_la_configuracion_activa(self):
+        self.crear_config('Principal', 'smtp.uno.com')
+        configuracion = self.client.get(reverse('test_email')).json()['email_config']
+        self.assertEqual(configuracion, resumen_conexion())
+        self.assertEqual(
+            (configuracion['host'], configuracion['port'], configuracion['from_email']),
+            ('smtp.uno.com', 587, 'noreply@smtp.uno.com'),
+        )
+
+        self.assertTrue(self.client.post(reverse('test_email'), {'to_email': 'to@example.com'}).json()['success'])
+        self.assertEqual(CorreoSaliente.objects.get().from_email, 'noreply@smtp.uno.com')
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_send_test_email_no_modifica_settings(self):
+        host_original = settings.EMAIL_HOST
+        config = self.crear_config('Principal', 'smtp.uno.com')
+        config.test_email = 'pruebas@example.com'
+
+        exito, _ = config.send_test_email()
+        self.assertTrue(exito)
+        self.assertEqual(mail.outbox[0].from_email, 'noreply@smtp.uno.com')
+        self.assertEqual(settings.EMAIL_HOST, host_original)
+
+
+class EstadisticasDashboardTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_contadores_siguen_creaciones_y_eliminaciones(self):
+        from datetime import date
+        from asientos.models import Asiento
+        from perfiles.models import Perfil
+        from asientos_contables import estadisticas
+
+        self.assertEqual(estadisticas.obtener_contadores()['asientos'], 0)
+        perfil = Perfil.objects.create(nombre="General")
+        asiento = Asiento.objects.create(fecha=date(2025, 1, 1), id_perfil=perfil)
+        Asiento.objects.create(fecha=date(2025, 1, 2), id_perfil=perfil)
+
+        with self.assertNumQueries(1):
+            contadores = estadisticas.obtener_contadores()
+        self.assertEqual(contadores['asientos'], 2)
+        self.assertEqual(contadores['perfiles'], 1)
+
+        asiento.delete()
+        self.assertEqual(estadisticas.obtener_contadores()['asientos'], 1)
+
+    def test_asientos_recientes_cacheados_e_invalidados(self):
+        from datetime import date
+        from asientos.models import Asiento
+        from asientos_contables import estadisticas
+
+        Asiento.objects.create(fecha=date(2025, 1, 1))
+        self.assertEqual(len(estadisticas.asientos_recientes()), 1)
+        with self.assertNumQueries(0):
+            estadisticas.asientos_recientes()
+
+        Asiento.objects.create(fecha=date(2025, 1, 2))
+        self.assertEqual(len(estadisticas.asientos_recientes()), 2)
+
+    @override_settings(TWO_FACTOR_BYPASS=True)
+    def test_home_view_usa_contadores(self):
+        from datetime import date
+        from django.contrib.auth import get_user_model
+        from asientos.models import Asiento
+
+        Asiento.objects.create(fecha=date(2025, 1, 1), descripcion='Apertura')
+        user = get_user_model().objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.client.force_login(user)
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_asientos'], 1)
+        self.assertContains(response, 'Apertura')
+
+
+class MapaIdentidadTests(TestCase):
+    def setUp(self):
+        from empresas.models import Empresa
+        from perfiles.models import Perfil
+        from plan_cuentas.models import Cuenta, PlanCuenta
+
+        self.Cuenta = Cuenta
+        self.empresa = Empresa.objects.create(nombre="DEFAULT")
+        self.perfil = Perfil.objects.create(nombre="General")
+        self.plan = PlanCuenta.objects.create(empresa=self.empresa, descripcion="Plan", perfil=self.perfil)
+        self.caja = Cuenta.objects.create(cuenta="1105", descripcion="Caja", plan_cuentas=self.plan)
+        self.bancos = Cuenta.objects.create(cuenta="1110", descripcion="Bancos", plan_cuentas=self.plan)
+
+    def test_lecturas_repetidas_no_consultan(self):
+        from asientos_contables.identidad import mapa_identidad, obtener, precargar, relacionado
+
+        with mapa_identidad():
+            with self.assertNumQueries(1):
+                cuentas = precargar(self.Cuenta, [self.caja.id, self.bancos.id, 999999], select_related=('plan_cuentas',))
+            with self.assertNumQueries(0):
+                self.assertIs(obtener(self.Cuenta, self.caja.id), cuentas[self.caja.id])
+                self.assertIs(obtener(self.Cuenta, str(self.bancos.id)), cuentas[self.bancos.id])
+                self.assertIsNone(obtener(self.Cuenta, 999999))
+                # Las dos cuentas comparten la instancia del plan
+                self.assertIs(relacionado(cuentas[self.caja.id], 'plan_cuentas'), relacionado(cuentas[self.bancos.id], 'plan_cuentas'))
+            with self.assertNumQueries(1):
+                relacionado(relacionado(cuentas[self.caja.id], 'plan_cuentas'), 'empresa')
+                relacionado(relacionado(cuentas[self.bancos.id], 'plan_cuentas'), 'empresa')
+
+        # Sin mapa activo cada lectura consulta
+        with self.assertNumQueries(2):
+            obtener(self.Cuenta, self.caja.id)
+            obtener(self.Cuenta, self.caja.id)
+
+    def test_guardar_descarta_la_instancia(self):
+        from asientos_contables.identidad import mapa_identidad, obtener
+
+        with mapa_identidad():
+            obtener(self.Cuenta, self.caja.id).descripcion
+            self.Cuenta.objects.get(pk=self.caja.id).save()
+            with self.assertNumQueries(1):
+                obtener(self.Cuenta, self.caja.id)
+
+    def test_middleware_abre_y_descarta_el_mapa(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from asientos_contables.identidad import MapaIdentidadMiddleware, mapa_activo, obtener
+
+        vistos = []
+
+        def vista(request):
+            obtener(self.Cuenta, self.caja.id)
+            vistos.append(len(mapa_activo()))
+            return HttpResponse()
+
+        MapaIdentidadMiddleware(vista)(RequestFactory().get('/'))
+        self.assertGreaterEqual(vistos[0], 1)
+        self.assertIsNone(mapa_activo())
+
+    def test_configuracion_de_perfil_valida_sin_releer_el_plan(self):
+        from asientos_contables.identidad import mapa_identidad, precargar
+        from perfiles.models import PerfilPlanCuenta
+
+        with mapa_identidad():
+            precargar(self.Cuenta, [self.caja.id, self.bancos.id], select_related=('plan_cuentas',))
+            with self.assertNumQueries(0):
+                for cuenta in (self.caja, self.bancos):
+                    PerfilPlanCuenta(
+                        empresa=str(self.empresa.pk), cuentas_id_id=cuenta.id, perfil_id=self.perfil, polaridad='+'
+                    ).clean()
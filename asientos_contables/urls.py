@@ -16,6 +16,7 @@ urlpatterns = [
     path('plan_cuentas/', include('plan_cuentas.urls')),
     path('logout/', auth_views.LogoutView.as_view(next_page='home'), name='logout'),
     path('two_factor/', include('two_factor_auth.urls')),
+    path('tareas/', include('tareas.urls')),
     # Ruta que genera URL segura y envía email
     path('secure/', views.secure_access_handler, name='secure_access_handler'),
     # Rutas ultra-secretas con códigos dinámicos
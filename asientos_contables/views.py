@@ -5,11 +5,8 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count
 from datetime import date
-from asientos.models import Asiento
-from perfiles.models import Perfil
-from plan_cuentas.models import PlanCuenta
-from empresas.models import Empresa
-from users.models import User
+from . import estadisticas
+from .mail import remitente_activo, resumen_conexion
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.http import JsonResponse
@@ -30,18 +27,16 @@ def home_view(request):
     Vista principal del dashboard con estadísticas del sistema
     """
     try:
-        # Obtener estadísticas generales
-        total_asientos = Asiento.objects.count()
-        total_perfiles = Perfil.objects.all().count()
-        total_cuentas = PlanCuenta.objects.count()
+        # Estadísticas generales desde los contadores mantenidos por señales (sin COUNT(*))
+        contadores = estadisticas.obtener_contadores()
         
-        # Asientos recientes (últimos 5)
-        recent_asientos = Asiento.objects.select_related('id_perfil').order_by('-fecha')[:5]
+        # Asientos recientes (últimos 5), cacheados con TTL corto
+        recent_asientos = estadisticas.asientos_recientes(5)
         
         context = {
-            'total_asientos': total_asientos,
-            'total_perfiles': total_perfiles,
-            'total_cuentas': total_cuentas,
+            'total_asientos': contadores['asientos'],
+            'total_perfiles': contadores['perfiles'],
+            'total_cuentas': contadores['planes_cuentas'],
             'recent_asientos': recent_asientos,
         }
         
@@ -83,45 +78,36 @@ def test_email_endpoint(request):
             send_mail(
                 subject=subject,
                 message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
+                from_email=remitente_activo(),
                 recipient_list=[to_email],
                 fail_silently=False,
             )
             
-            logger.info(f"✅ Correo enviado exitosamente a {to_email}")
+            logger.info(f"✅ Correo encolado para {to_email}")
             
             return JsonResponse({
                 'success': True,
-                'message': f'Correo enviado exitosamente a {to_email}',
-                'email_config': {
-                    'host': settings.EMAIL_HOST,
-                    'port': settings.EMAIL_PORT,
-                    'from_email': settings.DEFAULT_FROM_EMAIL,
-                }
+                'message': f'Correo encolado para envío a {to_email}',
+                'email_config': resumen_conexion(),
             })
             
         except Exception as e:
             logger.error(f"❌ Error al enviar correo: {str(e)}")
+            try:
+                email_config = resumen_conexion()
+            except Exception:
+                email_config = 'No disponible'
             return JsonResponse({
                 'success': False,
                 'message': f'Error al enviar correo: {str(e)}',
-                'email_config': {
-                    'host': getattr(settings, 'EMAIL_HOST', 'No configurado'),
-                    'port': getattr(settings, 'EMAIL_PORT', 'No configurado'),
-                    'from_email': getattr(settings, 'DEFAULT_FROM_EMAIL', 'No configurado'),
-                }
+                'email_config': email_config,
             }, status=500)
     
     elif request.method == 'GET':
-        # Información de configuración de correo
+        # Configuración con la que se entregan los correos: la SMTPConfiguration activa o los EMAIL_* de settings
         return JsonResponse({
             'message': 'Endpoint de prueba de correos - Usar POST para enviar',
-            'email_config': {
-                'host': getattr(settings, 'EMAIL_HOST', 'No configurado'),
-                'port': getattr(settings, 'EMAIL_PORT', 'No configurado'),
-                'from_email': getattr(settings, 'DEFAULT_FROM_EMAIL', 'No configurado'),
-                'backend': getattr(settings, 'EMAIL_BACKEND', 'No configurado'),
-            },
+            'email_config': resumen_conexion(),
             'usage': {
                 'method': 'POST',
                 'content_type': 'application/json',
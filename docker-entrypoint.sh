@@ -29,13 +29,23 @@ main() {
         wait_for_db
     fi
     
-    # Crear migraciones si no existen
-    echo "Creando migraciones..."
-    python manage.py makemigrations --noinput || true
-    
-    # Ejecutar migraciones básicas
-    echo "Aplicando migraciones..."
-    python manage.py migrate --noinput || true
+    if [ "$OMITIR_MIGRACIONES" = "1" ]; then
+        # Procesos auxiliares (worker, mailer): solo el servicio web migra;
+        # aquí se espera a que termine para no correr contra un esquema viejo
+        echo "Esperando a que se apliquen las migraciones..."
+        until python manage.py migrate --check >/dev/null 2>&1; do
+            echo "Migraciones pendientes, esperando..."
+            sleep 5
+        done
+    else
+        # Crear migraciones si no existen
+        echo "Creando migraciones..."
+        python manage.py makemigrations --noinput || true
+        
+        # Ejecutar migraciones básicas
+        echo "Aplicando migraciones..."
+        python manage.py migrate --noinput || true
+    fi
     
     # Ejecutar el comando pasado como argumentos o runserver por defecto
     if [ "$#" -eq 0 ]; then
@@ -0,0 +1,33 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from empresas.models import Empresa
+from empresas.services import clonar_plan_cuentas
+from plan_cuentas.models import Cuenta, PlanCuenta
+
+
+class Command(BaseCommand):
+    help = 'Clona un plan de cuentas (cuentas, jerarquía y configuraciones de perfil) en otra empresa'
+
+    def add_arguments(self, parser):
+        parser.add_argument('plan_id', type=int, help='ID del plan de cuentas a clonar')
+        parser.add_argument('empresa_id', type=int, help='ID de la empresa destino')
+        parser.add_argument('--descripcion', help='Descripción del nuevo plan (por defecto, la del original)')
+
+    def handle(self, *args, **options):
+        try:
+            plan_origen = PlanCuenta.objects.get(pk=options['plan_id'])
+        except PlanCuenta.DoesNotExist:
+            raise CommandError(f"No existe el plan de cuentas {options['plan_id']}")
+        try:
+            empresa = Empresa.objects.get(pk=options['empresa_id'])
+        except Empresa.DoesNotExist:
+            raise CommandError(f"No existe la empresa {options['empresa_id']}")
+
+        try:
+            plan = clonar_plan_cuentas(plan_origen, empresa, descripcion=options['descripcion'])
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        total = Cuenta.objects.filter(plan_cuentas=plan).count()
+        self.stdout.write(self.style.SUCCESS(f'✅ Plan "{plan}" creado (ID {plan.id}) con {total} cuentas'))
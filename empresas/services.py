@@ -0,0 +1,127 @@
+"""
+Clonación de planes de cuentas entre empresas.
+
+`clonar_plan_cuentas` copia un PlanCuenta completo (cuentas, jerarquía y
+polaridades de PerfilPlanCuenta) con unas pocas sentencias INSERT…SELECT. Los
+IDs nuevos se relacionan con los originales mediante tablas temporales, sin
+cargar las cuentas en Python ni guardarlas una a una.
+"""
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from perfiles.models import PerfilPlanCuenta
+from plan_cuentas.instantaneas import invalidar_perfil
+from plan_cuentas.models import Cuenta, PlanCuenta
+
+logger = logging.getLogger(__name__)
+
+TABLA_MAPA = 'tmp_clonar_mapa_cuentas'
+TABLA_MADRES = 'tmp_clonar_madres_cuentas'
+
+
+def _columnas(modelo, *campos):
+    """Nombres de columna citados de los campos de `modelo`"""
+    return [connection.ops.quote_name(modelo._meta.get_field(campo).column) for campo in campos]
+
+
+def _borrar_temporal(cursor, tabla):
+    # En MySQL, DROP TABLE sin TEMPORARY confirma la transacción en curso
+    temporal = 'TEMPORARY ' if connection.vendor == 'mysql' else ''
+    cursor.execute(f"DROP {temporal}TABLE IF EXISTS {tabla}")
+
+
+def clonar_plan_cuentas(plan_origen, empresa_destino, descripcion=None):
+    """
+    Crea en `empresa_destino` una copia de `plan_origen` con todas sus cuentas,
+    sus enlaces cuenta_madre y sus configuraciones de perfil. Retorna el plan
+    nuevo. Lanza ValidationError si la empresa ya tiene un plan con esa descripción.
+    """
+    descripcion = descripcion or plan_origen.descripcion
+    if PlanCuenta.objects.filter(empresa=empresa_destino, descripcion=descripcion).exists():
+        raise ValidationError(f'La empresa "{empresa_destino.nombre}" ya tiene un plan de cuentas "{descripcion}"')
+
+    q = connection.ops.quote_name
+    tabla_cuentas = q(Cuenta._meta.db_table)
+    tabla_perfiles = q(PerfilPlanCuenta._meta.db_table)
+    id_, cuenta, descripcion_col, madre, plan_col, grupo, perfil, ruta, nivel = _columnas(
+        Cuenta, 'id', 'cuenta', 'descripcion', 'cuenta_madre', 'plan_cuentas', 'grupo', 'perfil', 'ruta', 'nivel'
+    )
+    ppc_empresa, ppc_cuenta, ppc_perfil, ppc_polaridad = _columnas(
+        PerfilPlanCuenta, 'empresa', 'cuentas_id', 'perfil_id', 'polaridad'
+    )
+
+    with transaction.atomic():
+        plan = PlanCuenta.objects.create(
+            empresa=empresa_destino,
+            descripcion=descripcion,
+            perfil_id=plan_origen.perfil_id,
+        )
+
+        with connection.cursor() as cursor:
+            # 1. Cuentas, sin cuenta madre todavía (los IDs nuevos aún no existen)
+            cursor.execute(
+                f"INSERT INTO {tabla_cuentas} ({cuenta}, {descripcion_col}, {plan_col}, {grupo}, {perfil}, {ruta}, {nivel}) "
+                f"SELECT {cuenta}, {descripcion_col}, %s, {grupo}, {perfil}, {ruta}, {nivel} "
+                f"FROM {tabla_cuentas} WHERE {plan_col} = %s",
+                [plan.id, plan_origen.id],
+            )
+            cuentas_copiadas = cursor.rowcount
+
+            try:
+                _borrar_temporal(cursor, TABLA_MAPA)
+                _borrar_temporal(cursor, TABLA_MADRES)
+                # 2. Mapa id original -> id nuevo (el código es único por plan)
+                cursor.execute(f"CREATE TEMPORARY TABLE {TABLA_MAPA} (id_origen INTEGER PRIMARY KEY, id_destino INTEGER NOT NULL)")
+                cursor.execute(
+                    f"INSERT INTO {TABLA_MAPA} (id_origen, id_destino) "
+                    f"SELECT o.{id_}, n.{id_} FROM {tabla_cuentas} o "
+                    f"JOIN {tabla_cuentas} n ON n.{cuenta} = o.{cuenta} AND n.{plan_col} = %s "
+                    f"WHERE o.{plan_col} = %s",
+                    [plan.id, plan_origen.id],
+                )
+                # Cuenta nueva -> madre original. Tabla aparte porque MySQL no permite
+                # referenciar dos veces la misma tabla temporal en una consulta
+                cursor.execute(f"CREATE TEMPORARY TABLE {TABLA_MADRES} (id_destino INTEGER PRIMARY KEY, madre_origen INTEGER NOT NULL)")
+                cursor.execute(
+                    f"INSERT INTO {TABLA_MADRES} (id_destino, madre_origen) "
+                    f"SELECT n.{id_}, o.{madre} FROM {tabla_cuentas} o "
+                    f"JOIN {tabla_cuentas} n ON n.{cuenta} = o.{cuenta} AND n.{plan_col} = %s "
+                    f"WHERE o.{plan_col} = %s AND o.{madre} IS NOT NULL",
+                    [plan.id, plan_origen.id],
+                )
+
+                # 3. Enlaces cuenta_madre hacia las cuentas nuevas
+                cursor.execute(
+                    f"UPDATE {tabla_cuentas} SET {madre} = ("
+                    f"SELECT m.id_destino FROM {TABLA_MADRES} h "
+                    f"JOIN {TABLA_MAPA} m ON m.id_origen = h.madre_origen "
+                    f"WHERE h.id_destino = {tabla_cuentas}.{id_}"
+                    f") WHERE {plan_col} = %s",
+                    [plan.id],
+                )
+
+                # 4. Polaridades de los perfiles sobre las cuentas nuevas
+                cursor.execute(
+                    f"INSERT INTO {tabla_perfiles} ({ppc_empresa}, {ppc_cuenta}, {ppc_perfil}, {ppc_polaridad}) "
+                    f"SELECT %s, m.id_destino, p.{ppc_perfil}, p.{ppc_polaridad} "
+                    f"FROM {tabla_perfiles} p JOIN {TABLA_MAPA} m ON m.id_origen = p.{ppc_cuenta}",
+                    [str(empresa_destino.pk)],
+                )
+                configuraciones_copiadas = cursor.rowcount
+            finally:
+                _borrar_temporal(cursor, TABLA_MADRES)
+                _borrar_temporal(cursor, TABLA_MAPA)
+
+        # Los INSERT…SELECT no disparan señales: nueva versión de los perfiles con cuentas copiadas
+        for perfil_id in (
+            PerfilPlanCuenta.objects.filter(cuentas_id__plan_cuentas=plan).order_by().values_list('perfil_id', flat=True).distinct()
+        ):
+            invalidar_perfil(perfil_id)
+
+    logger.info(
+        f"Plan {plan_origen.id} clonado como {plan.id} en empresa {empresa_destino.pk}: "
+        f"{cuentas_copiadas} cuentas, {configuraciones_copiadas} configuraciones de perfil"
+    )
+    return plan
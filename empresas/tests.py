@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from empresas.models import Empresa
+from empresas.services import clonar_plan_cuentas
+from perfiles.models import Perfil, PerfilPlanCuenta
+from plan_cuentas.models import PlanCuenta, Cuenta
+
+User = get_user_model()
+
+
+class ClonarPlanFixtureMixin:
+    def setUp(self):
+        self.origen = Empresa.objects.create(nombre="Acme")
+        self.destino = Empresa.objects.create(nombre="Nueva")
+        self.perfil = Perfil.objects.create(nombre="General")
+        self.plan = PlanCuenta.objects.create(empresa=self.origen, descripcion="Plan 2025", perfil=self.perfil)
+        activo = Cuenta.objects.create(cuenta="1", descripcion="Activo", plan_cuentas=self.plan, grupo=1)
+        disponible = Cuenta.objects.create(cuenta="11", descripcion="Disponible", plan_cuentas=self.plan, cuenta_madre=activo, grupo=1)
+        caja = Cuenta.objects.create(cuenta="1105", descripcion="Caja", plan_cuentas=self.plan, cuenta_madre=disponible, grupo=1)
+        PerfilPlanCuenta.objects.create(
+            empresa=str(self.origen.pk), cuentas_id=caja, perfil_id=self.perfil, polaridad='+'
+        )
+
+
+class ClonarPlanTests(ClonarPlanFixtureMixin, TestCase):
+    def test_clona_jerarquia_y_perfiles(self):
+        plan = clonar_plan_cuentas(self.plan, self.destino)
+
+        self.assertEqual(plan.empresa, self.destino)
+        caja = Cuenta.objects.get(plan_cuentas=plan, cuenta="1105")
+        self.assertEqual(caja.cuenta_madre.cuenta, "11")
+        self.assertEqual(caja.cuenta_madre.plan_cuentas, plan)
+        self.assertEqual(caja.cuenta_madre.cuenta_madre.plan_cuentas, plan)
+        self.assertEqual(caja.ruta, "1/11/1105")
+
+        configuracion = PerfilPlanCuenta.objects.get(cuentas_id=caja)
+        self.assertEqual(configuracion.polaridad, '+')
+        self.assertEqual(configuracion.empresa, str(self.destino.pk))
+        # El plan original no cambia
+        self.assertEqual(Cuenta.objects.filter(plan_cuentas=self.plan).count(), 3)
+        self.assertEqual(PerfilPlanCuenta.objects.count(), 2)
+
+    def test_consultas_no_dependen_del_numero_de_cuentas(self):
+        with CaptureQueriesContext(connection) as pequeno:
+            clonar_plan_cuentas(self.plan, self.destino)
+        for i in range(20):
+            Cuenta.objects.create(cuenta=f"2{i:02d}", descripcion=f"Pasivo {i}", plan_cuentas=self.plan, grupo=2)
+        otra = Empresa.objects.create(nombre="Otra")
+        with CaptureQueriesContext(connection) as grande:
+            clonar_plan_cuentas(self.plan, otra)
+        self.assertEqual(len(grande), len(pequeno))
+
+    def test_comando(self):
+        out = StringIO()
+        call_command('clonar_plan_cuentas', self.plan.id, self.destino.id, '--descripcion', 'Plan Nueva', stdout=out)
+        self.assertIn('3 cuentas', out.getvalue())
+        self.assertTrue(PlanCuenta.objects.filter(empresa=self.destino, descripcion='Plan Nueva').exists())
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class ClonarPlanViewTests(ClonarPlanFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.client.force_login(self.user)
+
+    def test_clonar_desde_detalle(self):
+        response = self.client.get(reverse('empresas:empresa_detail', args=[self.destino.id]))
+        self.assertContains(response, 'Clonar Plan de Cuentas')
+
+        response = self.client.post(
+            reverse('empresas:empresa_clonar_plan', args=[self.destino.id]),
+            {'plan_id': self.plan.id},
+        )
+        plan = PlanCuenta.objects.get(empresa=self.destino)
+        self.assertRedirects(response, reverse('plan_cuentas:plan_cuenta_detail', args=[plan.id]), fetch_redirect_response=False)
+        self.assertEqual(Cuenta.objects.filter(plan_cuentas=plan).count(), 3)
+
+    def test_descripcion_repetida(self):
+        clonar_plan_cuentas(self.plan, self.destino)
+        response = self.client.post(
+            reverse('empresas:empresa_clonar_plan', args=[self.destino.id]),
+            {'plan_id': self.plan.id},
+        )
+        self.assertRedirects(response, reverse('empresas:empresa_detail', args=[self.destino.id]), fetch_redirect_response=False)
+        self.assertEqual(PlanCuenta.objects.filter(empresa=self.destino).count(), 1)
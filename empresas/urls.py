@@ -11,6 +11,7 @@ urlpatterns = [
     path('editar/<int:empresa_id>/', views.empresa_edit, name='empresa_edit'),
     path('eliminar/<int:empresa_id>/', views.empresa_delete, name='empresa_delete'),
     path('toggle-active/<int:empresa_id>/', views.empresa_toggle_active, name='empresa_toggle_active'),
+    path('clonar-plan/<int:empresa_id>/', views.empresa_clonar_plan, name='empresa_clonar_plan'),
     
     # URLs para AJAX
     path('ajax/list/', views.empresa_ajax_list, name='empresa_ajax_list'),
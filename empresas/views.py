@@ -6,6 +6,7 @@ from django.db import transaction, IntegrityError
 from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.http import JsonResponse
+from django.core.exceptions import ValidationError
 from .models import Empresa
 from .forms import EmpresaForm, EmpresaFilterForm
 import logging
@@ -158,13 +159,17 @@ def empresa_detail(request, empresa_id):
     
     stats = {
         'planes_cuentas': PlanCuenta.objects.filter(empresa=empresa.id).count(),
-        'cuentas': Cuenta.objects.filter(empresa=empresa.id).count(),
-        'asientos': Asiento.objects.filter(empresa=empresa.id).count(),
+        'cuentas': Cuenta.objects.filter(plan_cuentas__empresa=empresa.id).count(),
+        'asientos': Asiento.objects.filter(empresa=empresa).count(),
     }
     
+    # Planes de otras empresas que se pueden clonar en esta
+    planes_clonables = PlanCuenta.objects.exclude(empresa=empresa).select_related('empresa').order_by('empresa__nombre', 'descripcion')
+    
     context = {
         'empresa': empresa,
         'stats': stats,
+        'planes_clonables': planes_clonables,
     }
     
     return render(request, 'empresas/detail.html', context)
@@ -195,7 +200,7 @@ def empresa_delete(request, empresa_id):
                 )
                 return redirect('empresas:empresa_list')
             
-            if Asiento.objects.filter(empresa=empresa.id).exists():
+            if Asiento.objects.filter(empresa=empresa).exists():
                 messages.error(
                     request, 
                     f'No se puede eliminar la empresa "{empresa.nombre}" porque tiene asientos contables asociados'
@@ -241,6 +246,37 @@ def empresa_toggle_active(request, empresa_id):
     return redirect('empresas:empresa_list')
 
 
+@login_required
+def empresa_clonar_plan(request, empresa_id):
+    """Clonar un plan de cuentas de otra empresa (cuentas, jerarquía y perfiles)"""
+    empresa = get_object_or_404(Empresa, id=empresa_id)
+    
+    if request.method == 'POST':
+        from plan_cuentas.models import PlanCuenta
+        from .services import clonar_plan_cuentas
+        
+        plan_origen = get_object_or_404(PlanCuenta, id=request.POST.get('plan_id'))
+        try:
+            plan = clonar_plan_cuentas(
+                plan_origen,
+                empresa,
+                descripcion=request.POST.get('descripcion', '').strip() or None,
+            )
+            messages.success(
+                request,
+                f'Plan de cuentas "{plan.descripcion}" clonado exitosamente en "{empresa.nombre}"'
+            )
+            return redirect('plan_cuentas:plan_cuenta_detail', id=plan.id)
+        
+        except ValidationError as e:
+            messages.error(request, "; ".join(e.messages))
+        except Exception as e:
+            logger.error(f"Error al clonar plan de cuentas {plan_origen.id} en empresa {empresa.id}: {e}", exc_info=True)
+            messages.error(request, "Error interno al clonar el plan de cuentas")
+    
+    return redirect('empresas:empresa_detail', empresa_id=empresa.id)
+
+
 @login_required
 def empresa_ajax_list(request):
     """Lista de empresas para uso en AJAX"""
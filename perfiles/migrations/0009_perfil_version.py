@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0008_perfilplancuenta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Contador de cambios en las cuentas configuradas del perfil', verbose_name='Versión'),
+        ),
+    ]
@@ -1,15 +1,26 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
-import hashlib
 import logging
 
+from asientos_contables.identidad import relacionado
+from asientos_contables.ids import generar_ulid
+
 logger = logging.getLogger('perfiles')
 
 class Perfil(models.Model):
+    # IDs nuevos: ULID de 26 caracteres; los perfiles antiguos conservan su SHA-256 del nombre
     id = models.CharField(primary_key=True, max_length=64, editable=False)
     nombre = models.CharField(max_length=64, verbose_name="Nombre del Perfil")
     descripcion = models.CharField(max_length=255, blank=True, null=True, verbose_name="Descripción")
+    # Se incrementa con cada cambio en sus configuraciones de cuenta; los
+    # procesos comparan su instantánea de polaridades contra este número
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Versión",
+        help_text="Contador de cambios en las cuentas configuradas del perfil"
+    )
 
     class Meta:
         verbose_name = "Perfil Contable"
@@ -18,17 +29,14 @@ class Perfil(models.Model):
 
     def save(self, *args, **kwargs):
         logger.debug(f"Perfil.save llamado para: {self.nombre}, id actual: {self.id}")
-        # Si el ID no está establecido, generar uno basado en el nombre
+        # Si el ID no está establecido, asignar un ULID generado en memoria:
+        # no requiere consultas previas y es único aunque varios procesos
+        # creen perfiles con el mismo nombre a la vez
         if not self.id:
-            logger.debug("Generando nuevo ID para perfil")
-            base_id = hashlib.sha256(self.nombre.lower().strip().encode()).hexdigest()
-            self.id = base_id
-            counter = 0
-            while Perfil.objects.filter(id=self.id).exists():
-                logger.debug(f"ID {self.id} ya existe, incrementando contador")
-                counter += 1
-                self.id = f"{base_id}_{counter}"
-            logger.debug(f"ID final generado: {self.id}")
+            self.id = generar_ulid()
+            # ID recién generado: un solo INSERT, sin el UPDATE previo de save()
+            kwargs['force_insert'] = True
+            logger.debug(f"ID generado: {self.id}")
         
         try:
             logger.debug("Llamando a super().save()")
@@ -68,10 +76,14 @@ class PerfilPlanCuenta(models.Model):
     def clean(self):
         super().clean()
         # Validar que el perfil y la cuenta pertenezcan a la misma empresa
-        if self.perfil_id and self.cuentas_id:
-            if hasattr(self.cuentas_id, 'plan_cuentas'):
+        if self.perfil_id_id and self.cuentas_id_id:
+            # Cuenta y plan a través del mapa de identidad de la petición:
+            # validar muchas configuraciones no relee los mismos planes
+            cuenta = relacionado(self, 'cuentas_id')
+            plan = relacionado(cuenta, 'plan_cuentas')
+            if plan is not None:
                 # Comparar los IDs de empresa a través del plan de cuentas
-                cuenta_empresa = self.cuentas_id.plan_cuentas.empresa.pk if self.cuentas_id.plan_cuentas and self.cuentas_id.plan_cuentas.empresa else None
+                cuenta_empresa = plan.empresa_id
                 
                 if self.empresa != str(cuenta_empresa):
                     raise ValidationError(
@@ -0,0 +1,68 @@
+"""
+Creación masiva de perfiles contables (alta de empresas nuevas con decenas de perfiles)
+"""
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from asientos_contables.ids import generar_ulid
+from .models import Perfil
+
+logger = logging.getLogger('perfiles')
+
+NOMBRE_MAX = Perfil._meta.get_field('nombre').max_length
+DESCRIPCION_MAX = Perfil._meta.get_field('descripcion').max_length
+
+
+def crear_perfiles_bulk(perfiles_data, omitir_existentes=True):
+    """
+    Crea los perfiles de `perfiles_data` (lista de dicts con nombre y descripcion
+    opcional) con un único INSERT. Los IDs se asignan en memoria, sin consultas
+    previas. Los nombres repetidos en la entrada se crean una sola vez; los que ya
+    existen se omiten o, con omitir_existentes=False, lanzan ValidationError.
+    Retorna (creados, omitidos): lista de Perfil y lista de nombres.
+    """
+    errores = []
+    candidatos = {}
+    for i, data in enumerate(perfiles_data, 1):
+        nombre = (data.get('nombre') or '').strip()
+        descripcion = (data.get('descripcion') or '').strip()
+        if not nombre:
+            errores.append(f"Perfil {i}: el nombre del perfil es requerido")
+        elif len(nombre) > NOMBRE_MAX:
+            errores.append(f"Perfil {i}: el nombre no puede exceder {NOMBRE_MAX} caracteres")
+        elif len(descripcion) > DESCRIPCION_MAX:
+            errores.append(f"Perfil {i}: la descripción no puede exceder {DESCRIPCION_MAX} caracteres")
+        else:
+            candidatos.setdefault(nombre.lower(), (nombre, descripcion))
+    if errores:
+        raise ValidationError(errores)
+
+    existentes = set(
+        Perfil.objects.annotate(nombre_normalizado=Lower('nombre'))
+        .filter(nombre_normalizado__in=list(candidatos))
+        .values_list('nombre_normalizado', flat=True)
+    )
+    if existentes and not omitir_existentes:
+        raise ValidationError([
+            f"Ya existe un perfil con el nombre '{candidatos[clave][0]}'" for clave in sorted(existentes)
+        ])
+
+    nuevos = [
+        Perfil(id=generar_ulid(), nombre=nombre, descripcion=descripcion or None)
+        for clave, (nombre, descripcion) in candidatos.items()
+        if clave not in existentes
+    ]
+    omitidos = [candidatos[clave][0] for clave in candidatos if clave in existentes]
+
+    with transaction.atomic():
+        Perfil.objects.bulk_create(nuevos)
+        if nuevos:
+            # bulk_create no dispara post_save: actualizar el contador del dashboard
+            from asientos_contables.estadisticas import incrementar
+            incrementar('perfiles', len(nuevos))
+
+    logger.info(f"Creación masiva de perfiles: {len(nuevos)} creados, {len(omitidos)} omitidos")
+    return nuevos, omitidos
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from plan_cuentas.instantaneas import invalidar_perfil
+
+from .models import PerfilPlanCuenta
+
+
+@receiver(post_save, sender=PerfilPlanCuenta)
+@receiver(post_delete, sender=PerfilPlanCuenta)
+def configuracion_changed(sender, instance, raw=False, **kwargs):
+    """Nueva versión del perfil (instantánea de polaridades) al configurar, editar o quitar una cuenta"""
+    if raw:
+        return
+    invalidar_perfil(instance.perfil_id_id)
@@ -1,3 +1,72 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from asientos_contables.estadisticas import obtener_contadores
+from perfiles.models import Perfil
+from perfiles.services import crear_perfiles_bulk
+
+User = get_user_model()
+
+
+class PerfilIdTests(TestCase):
+    def test_nombres_iguales_no_colisionan(self):
+        with CaptureQueriesContext(connection) as consultas:
+            primero = Perfil.objects.create(nombre="Ventas")
+        sobre_perfiles = [q['sql'] for q in consultas.captured_queries if 'INTO "perfiles_perfil"' in q['sql'] or 'FROM "perfiles_perfil"' in q['sql'] and 'COUNT' not in q['sql']]
+        self.assertEqual(len(sobre_perfiles), 1)
+        self.assertTrue(sobre_perfiles[0].startswith('INSERT'))
+        segundo = Perfil.objects.create(nombre="ventas ")
+        self.assertNotEqual(primero.id, segundo.id)
+        self.assertEqual(len(primero.id), 26)
+
+
+class CrearPerfilesBulkTests(TestCase):
+    def test_crea_omitiendo_existentes_y_duplicados(self):
+        Perfil.objects.create(nombre="Compras")
+        creados, omitidos = crear_perfiles_bulk([
+            {'nombre': 'Ventas', 'descripcion': 'Facturación'},
+            {'nombre': 'compras'},
+            {'nombre': 'VENTAS'},
+            {'nombre': 'Nómina'},
+        ])
+        self.assertEqual([p.nombre for p in creados], ['Ventas', 'Nómina'])
+        self.assertEqual(omitidos, ['compras'])
+        self.assertEqual(Perfil.objects.count(), 3)
+        self.assertEqual(obtener_contadores()['perfiles'], 3)
+
+    def test_existentes_sin_omitir(self):
+        from django.core.exceptions import ValidationError
+        Perfil.objects.create(nombre="Compras")
+        with self.assertRaises(ValidationError):
+            crear_perfiles_bulk([{'nombre': 'Compras'}], omitir_existentes=False)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class PerfilBulkViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.client.force_login(self.user)
+
+    def test_creacion_masiva(self):
+        response = self.client.post(
+            reverse('perfiles:perfil_bulk_create'),
+            json.dumps({'perfiles': [{'nombre': f'Perfil {i}'} for i in range(30)]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['creados']), 30)
+        self.assertEqual(Perfil.objects.count(), 30)
+
+    def test_nombre_vacio(self):
+        response = self.client.post(
+            reverse('perfiles:perfil_bulk_create'),
+            json.dumps({'perfiles': [{'nombre': ''}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Perfil.objects.exists())
@@ -4,8 +4,11 @@ from django.contrib import messages
 from django.urls import reverse
 from django.db import transaction, IntegrityError
 from django.http import JsonResponse
+from django.core.exceptions import ValidationError
 from .models import Perfil
 from .forms import PerfilForm
+from .services import crear_perfiles_bulk
+import json
 import logging
 
 logger = logging.getLogger('perfiles')
@@ -156,3 +159,36 @@ def perfil_delete(request, id):
             return redirect('perfiles:perfil_list')
     
     return render(request, 'perfiles/confirm_delete.html', {'perfil': perfil})
+
+@login_required
+def perfil_bulk_create(request):
+    """
+    Crea varios perfiles en una sola operación. Recibe JSON
+    {"perfiles": [{"nombre": ..., "descripcion": ...}], "omitir_existentes": true}
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    try:
+        payload = json.loads(request.body or b'{}')
+        perfiles_data = payload.get('perfiles')
+        if not isinstance(perfiles_data, list) or not perfiles_data:
+            return JsonResponse({'success': False, 'error': 'Debe enviar una lista de perfiles'}, status=400)
+
+        creados, omitidos = crear_perfiles_bulk(
+            perfiles_data,
+            omitir_existentes=payload.get('omitir_existentes', True),
+        )
+        return JsonResponse({
+            'success': True,
+            'creados': [{'id': perfil.id, 'nombre': perfil.nombre} for perfil in creados],
+            'omitidos': omitidos,
+        }, status=201)
+
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'error': '; '.join(e.messages)}, status=400)
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Formato JSON inválido'}, status=400)
+    except Exception as e:
+        logger.error(f"Error en creación masiva de perfiles: {e}", exc_info=True)
+        return JsonResponse({'success': False, 'error': 'Error interno al crear los perfiles'}, status=500)
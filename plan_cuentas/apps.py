@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PlanCuentasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'plan_cuentas'
+
+    def ready(self):
+        from . import signals
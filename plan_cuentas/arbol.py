@@ -0,0 +1,103 @@
+"""
+Árbol del plan de cuentas cargado por niveles.
+
+El front end pide un nivel a la vez (las hijas de una cuenta, o las raíces) con
+el número de hijas de cada cuenta ya calculado, y busca por prefijo de código o
+descripción. Las respuestas se cachean por plan y versión: cualquier cambio en
+las cuentas incrementa PlanCuenta.version y las claves anteriores dejan de usarse.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+
+from .models import Cuenta, PlanCuenta
+
+logger = logging.getLogger(__name__)
+
+TTL_ARBOL = getattr(settings, 'PLAN_CUENTAS_ARBOL_TTL', 300)
+LIMITE_NIVEL = 200
+LIMITE_BUSQUEDA = 50
+CAMPOS = ('id', 'cuenta', 'descripcion', 'grupo', 'nivel', 'ruta', 'cuenta_madre_id')
+
+
+def invalidar_arbol(plan_id, **kwargs):
+    """Incrementa la versión del plan; las entradas cacheadas de versiones anteriores expiran solas"""
+    if plan_id:
+        PlanCuenta.objects.filter(pk=plan_id).update(version=F('version') + 1)
+
+
+def _clave(plan, *partes):
+    return ':'.join(['plan_cuentas', 'arbol', str(plan.pk), f"v{plan.version}", *map(str, partes)])
+
+
+def _serializar(cuenta):
+    return {
+        'id': cuenta['id'],
+        'cuenta': cuenta['cuenta'],
+        'descripcion': cuenta['descripcion'],
+        'grupo': cuenta['grupo'],
+        'nivel': cuenta['nivel'],
+        'ruta': cuenta['ruta'],
+        'cuenta_madre_id': cuenta['cuenta_madre_id'],
+        'hijas': cuenta.get('hijas', 0),
+    }
+
+
+def obtener_nivel(plan, madre_id=None, desplazamiento=0, limite=LIMITE_NIVEL):
+    """
+    Hijas directas de `madre_id` (raíces si es None) ordenadas por código, con el
+    número de hijas de cada una. Retorna {'total', 'cuentas'}; pagina con
+    desplazamiento/limite para niveles con muchas cuentas.
+    """
+    limite = max(1, min(int(limite), LIMITE_NIVEL))
+    desplazamiento = max(0, int(desplazamiento))
+    clave = _clave(plan, 'nivel', madre_id or 'raiz', desplazamiento, limite)
+    datos = cache.get(clave)
+    if datos is not None:
+        return datos
+
+    consulta = Cuenta.objects.filter(plan_cuentas=plan)
+    if madre_id:
+        consulta = consulta.filter(cuenta_madre_id=madre_id)
+    else:
+        consulta = consulta.filter(cuenta_madre__isnull=True)
+
+    total = consulta.count()
+    cuentas = (
+        consulta.order_by('cuenta')
+        .annotate(hijas=Count('cuentas_hijas'))
+        .values(*CAMPOS, 'hijas')[desplazamiento:desplazamiento + limite]
+    )
+    datos = {'total': total, 'cuentas': [_serializar(cuenta) for cuenta in cuentas]}
+    cache.set(clave, datos, TTL_ARBOL)
+    return datos
+
+
+def buscar(plan, texto, limite=LIMITE_BUSQUEDA):
+    """
+    Cuentas cuyo código o descripción empiezan por `texto` (índices de prefijo
+    plan+código y plan+descripción). Cada resultado incluye su ruta para que el
+    front end pueda expandir el árbol hasta él.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return []
+    limite = max(1, min(int(limite), LIMITE_BUSQUEDA))
+    clave = _clave(plan, 'buscar', limite, hashlib.md5(texto.lower().encode()).hexdigest())
+    resultados = cache.get(clave)
+    if resultados is not None:
+        return resultados
+
+    cuentas = (
+        Cuenta.objects.filter(plan_cuentas=plan)
+        .filter(Q(cuenta__startswith=texto) | Q(descripcion__istartswith=texto))
+        .order_by('cuenta')
+        .annotate(hijas=Count('cuentas_hijas'))
+        .values(*CAMPOS, 'hijas')[:limite]
+    )
+    resultados = [_serializar(cuenta) for cuenta in cuentas]
+    cache.set(clave, resultados, TTL_ARBOL)
+    return resultados
@@ -1,5 +1,6 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from .models import PlanCuenta, Cuenta
 from perfiles.models import Perfil
 from empresas.models import Empresa
@@ -35,7 +36,7 @@ class CuentaForm(forms.ModelForm):
             'cuenta': forms.TextInput(attrs={'placeholder':'Código','maxlength':'14'}),
             'descripcion': forms.TextInput(attrs={'placeholder':'Descripción','maxlength':'255'}),
             'plan_cuentas': forms.Select(),
-            'cuenta_madre': forms.Select(),
+            'cuenta_madre': forms.Select(attrs={'data-url': reverse_lazy('plan_cuentas:get_cuentas_madre_ajax')}),
             'grupo': forms.NumberInput(attrs={'placeholder':'Grupo (1-5)'}),
         }
         labels = {
@@ -49,17 +50,18 @@ class CuentaForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['plan_cuentas'].queryset = PlanCuenta.objects.all()
+        # El select solo lleva la cuenta madre elegida (basta para validarla); las
+        # demás se buscan por prefijo desde la página, sin listar el plan completo
         self.fields['cuenta_madre'].queryset = Cuenta.objects.none()
         if 'plan_cuentas' in self.data:
             try:
                 plan_id = int(self.data.get('plan_cuentas'))
-                self.fields['cuenta_madre'].queryset = Cuenta.objects.filter(plan_cuentas=plan_id).order_by('cuenta')
+                madre_id = int(self.data.get('cuenta_madre') or 0)
+                self.fields['cuenta_madre'].queryset = Cuenta.objects.filter(plan_cuentas=plan_id, pk=madre_id)
             except (ValueError, TypeError):
                 pass
-        elif self.instance.pk and self.instance.plan_cuentas:
-            self.fields['cuenta_madre'].queryset = Cuenta.objects.filter(
-                plan_cuentas=self.instance.plan_cuentas
-            ).exclude(pk=self.instance.pk).order_by('cuenta')
+        elif self.instance.pk and self.instance.cuenta_madre_id:
+            self.fields['cuenta_madre'].queryset = Cuenta.objects.filter(pk=self.instance.cuenta_madre_id)
         for field in ['cuenta', 'descripcion', 'plan_cuentas']:
             self.fields[field].required = True
         for field in ['cuenta_madre', 'grupo']:
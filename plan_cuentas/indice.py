@@ -0,0 +1,165 @@
+"""
+Índice de búsqueda en memoria por plan de cuentas (typeahead).
+
+Cada proceso construye bajo demanda, por PlanCuenta, un trie de prefijos sobre
+los códigos y listas de postings sobre los tokens normalizados de la descripción
+(minúsculas y sin tildes: "depreciacion" encuentra "Depreciación"). Las consultas
+no tocan la base de datos salvo para leer la versión del plan; las señales de
+Cuenta descartan el índice del proceso y la versión invalida el de los demás.
+"""
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from .models import Cuenta, PlanCuenta
+
+logger = logging.getLogger(__name__)
+
+# Resultados guardados en cada nodo del trie (el máximo que puede pedir el typeahead)
+MAX_RESULTADOS = 50
+_TOKEN = re.compile(r'\w+')
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def normalizar(texto):
+    """Minúsculas y sin marcas diacríticas (á -> a, ñ -> n, ü -> u)"""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+class IndiceCuentas:
+    """
+    Índice inmutable de las cuentas de un plan. Internamente cada cuenta se
+    identifica por su posición en orden de código, así que los postings y las
+    listas del trie ya están ordenados y el top-k es un recorte.
+    """
+
+    def __init__(self, cuentas, version=0):
+        self.version = version
+        self.cuentas = sorted(cuentas, key=lambda c: c['cuenta'])
+        self._trie = {}
+        self._postings = {}
+        self._descripciones = []
+
+        for posicion, cuenta in enumerate(self.cuentas):
+            nodo = self._trie
+            for caracter in normalizar(cuenta['cuenta']):
+                nodo = nodo.setdefault(caracter, {'': []})
+                if len(nodo['']) < MAX_RESULTADOS:
+                    nodo[''].append(posicion)
+
+            descripcion = normalizar(cuenta['descripcion'])
+            self._descripciones.append(descripcion)
+            for token in set(_TOKEN.findall(descripcion)):
+                self._postings.setdefault(token, []).append(posicion)
+
+        self._vocabulario = sorted(self._postings)
+
+    def __len__(self):
+        return len(self.cuentas)
+
+    def por_codigo(self, prefijo):
+        """Posiciones de las cuentas cuyo código empieza por `prefijo` (máximo MAX_RESULTADOS)"""
+        nodo = self._trie
+        for caracter in prefijo:
+            nodo = nodo.get(caracter)
+            if nodo is None:
+                return []
+        return nodo.get('', [])
+
+    def por_descripcion(self, tokens):
+        """
+        Posiciones de las cuentas cuya descripción contiene, para cada token de
+        la consulta, alguna palabra que empieza por él
+        """
+        conjuntos = []
+        for token in tokens:
+            inicio = bisect.bisect_left(self._vocabulario, token)
+            coincidencias = set()
+            for palabra in self._vocabulario[inicio:]:
+                if not palabra.startswith(token):
+                    break
+                coincidencias.update(self._postings[palabra])
+            if not coincidencias:
+                return []
+            conjuntos.append(coincidencias)
+
+        conjuntos.sort(key=len)
+        resultado = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            resultado = resultado & conjunto
+        return resultado
+
+    def buscar(self, texto, limite=10, permitidas=None):
+        """
+        Top-`limite` cuentas para `texto` (None = todas). Primero las que coinciden
+        por código, luego las que empiezan por la consulta y luego el resto de
+        coincidencias por palabras, cada grupo en orden de código. `permitidas`
+        restringe el resultado a un conjunto de IDs de cuenta.
+        """
+        consulta = normalizar(texto).strip()
+        if not consulta:
+            return []
+
+        puntajes = {}
+        if limite is not None and limite <= MAX_RESULTADOS and permitidas is None:
+            por_codigo = self.por_codigo(consulta)
+        else:
+            # El trie guarda solo los primeros MAX_RESULTADOS por prefijo
+            por_codigo = [p for p, c in enumerate(self.cuentas) if normalizar(c['cuenta']).startswith(consulta)]
+        for posicion in por_codigo:
+            puntajes[posicion] = 0
+        for posicion in self.por_descripcion(_TOKEN.findall(consulta)):
+            if posicion not in puntajes:
+                puntajes[posicion] = 1 if self._descripciones[posicion].startswith(consulta) else 2
+
+        if permitidas is not None:
+            puntajes = {p: s for p, s in puntajes.items() if self.cuentas[p]['id'] in permitidas}
+
+        claves = ((s, p) for p, s in puntajes.items())
+        ordenadas = sorted(claves) if limite is None else heapq.nsmallest(limite, claves)
+        return [self.cuentas[p] for _, p in ordenadas]
+
+
+def construir(plan):
+    """Lee las cuentas del plan en una consulta y construye su índice"""
+    inicio = time.perf_counter()
+    cuentas = list(
+        Cuenta.objects.filter(plan_cuentas=plan)
+        .values('id', 'cuenta', 'descripcion', 'grupo', 'nivel', 'ruta')
+    )
+    indice = IndiceCuentas(cuentas, version=plan.version)
+    logger.info(
+        f"Índice del plan {plan.pk} construido: {len(indice)} cuentas en "
+        f"{(time.perf_counter() - inicio) * 1000:.1f} ms"
+    )
+    return indice
+
+
+def obtener_indice(plan):
+    """Índice del plan en este proceso, reconstruido si la versión del plan cambió"""
+    with _indices_lock:
+        indice = _indices.get(plan.pk)
+    if indice is not None and indice.version == plan.version:
+        return indice
+
+    indice = construir(plan)
+    with _indices_lock:
+        _indices[plan.pk] = indice
+    return indice
+
+
+def invalidar_indice(plan_id=None, **kwargs):
+    """Descarta el índice de un plan (o todos) en este proceso"""
+    with _indices_lock:
+        if plan_id is None:
+            _indices.clear()
+        else:
+            _indices.pop(plan_id, None)
+
@@ -0,0 +1,237 @@
+"""
+Instantáneas en memoria de los datos de referencia, compartidas por el proceso.
+
+Los planes de cuentas y las polaridades de los perfiles se leen mucho más de lo
+que se modifican. Cada proceso guarda, por PlanCuenta, una instantánea inmutable
+en arreglos compactos (array): códigos, mapa código -> ID, arreglo de madres e
+intervalos de cada subárbol en preorden. Así los acumulados por la jerarquía y
+las pruebas "es descendiente" no crean una instancia del modelo por cuenta ni
+siguen claves foráneas. Por Perfil guarda el mapa cuenta -> polaridad. Cada
+instantánea lleva la versión del plan o del perfil con que se construyó: antes
+de reutilizarla basta comparar ese número (una lectura por clave primaria, o
+ninguna si ya se tiene la instancia). Las señales incrementan las versiones, así
+que los demás procesos reconstruyen la suya en el siguiente uso.
+"""
+import logging
+import threading
+import time
+from array import array
+from types import MappingProxyType
+
+import numpy as np
+from django.db.models import F
+
+from perfiles.models import Perfil, PerfilPlanCuenta
+
+from .models import Cuenta, PlanCuenta
+
+logger = logging.getLogger(__name__)
+
+_planes = {}
+_perfiles = {}
+_lock = threading.Lock()
+
+
+class InstantaneaPlan:
+    """
+    Cuentas de un plan en arreglos paralelos indexados por posición, en
+    preorden (cada madre seguida de su subárbol, hermanas por código).
+    `madres[i]` es la posición de la cuenta madre de la cuenta i (-1 en las
+    raíces), `fines[i]` el final de su subárbol (el subárbol de i ocupa las
+    posiciones [i, fines[i])) y `grupos[i]` su grupo efectivo: el propio o el de
+    su ancestro más cercano que lo tenga (0 si ninguno).
+    """
+
+    def __init__(self, cuentas, version=0):
+        cuentas = list(cuentas)
+        self.version = version
+        por_id = {cuenta['id']: cuenta for cuenta in cuentas}
+        hijas = {}
+        for cuenta in sorted(cuentas, key=lambda c: c['cuenta']):
+            madre = cuenta['cuenta_madre_id'] if cuenta['cuenta_madre_id'] in por_id else None
+            hijas.setdefault(madre, []).append(cuenta['id'])
+
+        # Recorrido en profundidad iterativo: posición de entrada y fin del subárbol
+        orden, madres, fines, grupos = [], array('l'), array('l'), array('l')
+        pila = [(cuenta_id, -1) for cuenta_id in reversed(hijas.get(None, []))]
+        abiertas = []
+        while pila:
+            cuenta_id, madre = pila.pop()
+            while abiertas and abiertas[-1] != madre:
+                fines[abiertas.pop()] = len(orden)
+            posicion = len(orden)
+            grupo = por_id[cuenta_id]['grupo']
+            orden.append(cuenta_id)
+            madres.append(madre)
+            fines.append(0)
+            grupos.append(grupo if grupo is not None else (grupos[madre] if madre >= 0 else 0))
+            abiertas.append(posicion)
+            pila.extend((hija, posicion) for hija in reversed(hijas.get(cuenta_id, [])))
+        for posicion in abiertas:
+            fines[posicion] = len(orden)
+
+        self.ids = array('q', orden)
+        self.madres = madres
+        self.fines = fines
+        self.grupos = grupos
+        self.niveles = array('h', (por_id[cuenta_id]['nivel'] for cuenta_id in orden))
+        self.codigos = tuple(por_id[cuenta_id]['cuenta'] for cuenta_id in orden)
+        self.descripciones = tuple(por_id[cuenta_id]['descripcion'] for cuenta_id in orden)
+        self.posiciones = MappingProxyType({cuenta_id: i for i, cuenta_id in enumerate(orden)})
+        self.por_codigo = MappingProxyType({codigo: cuenta_id for codigo, cuenta_id in zip(self.codigos, orden)})
+
+        # Para acumular, por profundidad (de la más profunda a la raíz): las posiciones
+        # con madre, ya ordenadas por madre en preorden, y dónde empieza cada grupo de hermanas
+        profundidades = [0] * len(orden)
+        for posicion, madre in enumerate(madres):
+            if madre >= 0:
+                profundidades[posicion] = profundidades[madre] + 1
+        profundidades = np.array(profundidades, dtype=np.int64)
+        madres_np = np.array(madres, dtype=np.int64)
+        self._niveles = []
+        for profundidad in range(int(profundidades.max(initial=0)), 0, -1):
+            posiciones = np.flatnonzero(profundidades == profundidad)
+            destino = madres_np[posiciones]
+            inicios = np.flatnonzero(np.r_[True, destino[1:] != destino[:-1]])
+            self._niveles.append((posiciones, destino[inicios], inicios))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def id_de(self, codigo):
+        """ID de la cuenta con `codigo`, o None"""
+        return self.por_codigo.get(codigo)
+
+    def ancestros(self, cuenta_id):
+        """IDs de las cuentas madre de `cuenta_id`, de la más cercana a la raíz"""
+        posicion = self.madres[self.posiciones[cuenta_id]]
+        resultado = []
+        while posicion >= 0:
+            resultado.append(self.ids[posicion])
+            posicion = self.madres[posicion]
+        return resultado
+
+    def subarbol(self, cuenta_id):
+        """Posiciones de `cuenta_id` y sus descendientes (un rango contiguo)"""
+        posicion = self.posiciones[cuenta_id]
+        return range(posicion, self.fines[posicion])
+
+    def es_descendiente(self, cuenta_id, ancestro_id):
+        """True si `cuenta_id` está en el subárbol de `ancestro_id` (incluida ella misma)"""
+        posicion, ancestro = self.posiciones[cuenta_id], self.posiciones[ancestro_id]
+        return ancestro <= posicion < self.fines[ancestro]
+
+    def acumular(self, saldos, columnas):
+        """
+        Saldos acumulados por posición (propios más los de sus descendientes) a
+        partir de `saldos` ({cuenta_id: [valor por columna]}), como listas. Una
+        matriz posiciones x columnas que se suma hacia las madres un nivel a la
+        vez, del más profundo a la raíz (un np.add.reduceat por nivel sobre las
+        hermanas, contiguas en preorden), sin restas que pierdan centavos.
+        """
+        totales = np.zeros((len(self.ids), columnas))
+        propias = [cuenta_id for cuenta_id in saldos if cuenta_id in self.posiciones]
+        if propias:
+            posiciones = np.fromiter((self.posiciones[cuenta_id] for cuenta_id in propias), np.int64, len(propias))
+            totales[posiciones] = np.array([saldos[cuenta_id] for cuenta_id in propias], dtype=np.float64)
+        for posiciones, madres, inicios in self._niveles:
+            totales[madres] += np.add.reduceat(totales[posiciones], inicios, axis=0)
+        return totales.tolist()
+
+    def filas(self, saldos, columnas):
+        """Cuentas en preorden como dicts con su grupo efectivo y sus saldos acumulados"""
+        return [
+            {
+                'id': cuenta_id,
+                'cuenta': codigo,
+                'descripcion': descripcion,
+                'grupo': grupo or None,
+                'nivel': nivel,
+                'saldos': acumulados,
+            }
+            for cuenta_id, codigo, descripcion, grupo, nivel, acumulados in zip(
+                self.ids, self.codigos, self.descripciones, self.grupos, self.niveles, self.acumular(saldos, columnas)
+            )
+        ]
+
+
+class InstantaneaPerfil:
+    """Polaridad configurada de cada cuenta del perfil ({cuenta_id: '+' o '-'})"""
+
+    def __init__(self, polaridades, version=0):
+        self.version = version
+        self.polaridades = MappingProxyType(dict(polaridades))
+
+    def __len__(self):
+        return len(self.polaridades)
+
+
+def _version(modelo, objeto):
+    """(pk, versión) de una instancia o de una clave primaria; None si no existe"""
+    if isinstance(objeto, modelo):
+        return objeto.pk, objeto.version
+    version = modelo.objects.filter(pk=objeto).values_list('version', flat=True).first()
+    return None if version is None else (modelo._meta.pk.to_python(objeto), version)
+
+
+def _obtener(cache, modelo, objeto, construir):
+    clave_version = _version(modelo, objeto)
+    if clave_version is None:
+        return None
+    pk, version = clave_version
+    with _lock:
+        instantanea = cache.get(pk)
+    if instantanea is not None and instantanea.version == version:
+        return instantanea
+
+    inicio = time.perf_counter()
+    instantanea = construir(pk, version)
+    with _lock:
+        cache[pk] = instantanea
+    logger.info(
+        f"Instantánea de {modelo._meta.model_name} {pk} (v{version}) construida: {len(instantanea)} cuentas en "
+        f"{(time.perf_counter() - inicio) * 1000:.1f} ms"
+    )
+    return instantanea
+
+
+def instantanea_plan(plan):
+    """
+    Instantánea del plan (instancia o ID) en este proceso, reconstruida si su
+    versión cambió. None si el plan no existe
+    """
+    return _obtener(_planes, PlanCuenta, plan, lambda pk, version: InstantaneaPlan(
+        Cuenta.objects.filter(plan_cuentas_id=pk).values(
+            'id', 'cuenta', 'descripcion', 'grupo', 'nivel', 'ruta', 'cuenta_madre_id'
+        ),
+        version=version,
+    ))
+
+
+def instantanea_perfil(perfil):
+    """
+    Instantánea de las polaridades del perfil (instancia o ID) en este proceso,
+    reconstruida si su versión cambió. None si el perfil no existe
+    """
+    return _obtener(_perfiles, Perfil, perfil, lambda pk, version: InstantaneaPerfil(
+        PerfilPlanCuenta.objects.filter(perfil_id=pk).values_list('cuentas_id', 'polaridad'),
+        version=version,
+    ))
+
+
+def invalidar_perfil(perfil_id, **kwargs):
+    """Incrementa la versión del perfil y descarta su instantánea en este proceso"""
+    if perfil_id:
+        Perfil.objects.filter(pk=perfil_id).update(version=F('version') + 1)
+        with _lock:
+            _perfiles.pop(perfil_id, None)
+
+
+def invalidar_instantaneas(plan_id=None, **kwargs):
+    """Descarta la instantánea de un plan (o todas, de planes y perfiles) en este proceso"""
+    with _lock:
+        if plan_id is None:
+            _planes.clear()
+            _perfiles.clear()
+        else:
+            _planes.pop(plan_id, None)
@@ -0,0 +1,37 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from plan_cuentas.models import PlanCuenta
+from plan_cuentas.services import cargar_cuentas, leer_archivo_cuentas
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga las cuentas de un archivo CSV o JSON (cuenta, descripcion, cuenta_madre, grupo) '
+        'en un plan de cuentas existente, en bloque y nivel por nivel'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('plan_id', type=int, help='ID del plan de cuentas destino')
+        parser.add_argument('archivo', help='Ruta del archivo CSV o JSON')
+        parser.add_argument('--formato', choices=['csv', 'json'], help='Formato del archivo (por defecto, según la extensión)')
+        parser.add_argument('--lote', type=int, default=500, help='Cuentas por INSERT (por defecto 500)')
+
+    def handle(self, *args, **options):
+        try:
+            plan = PlanCuenta.objects.get(pk=options['plan_id'])
+        except PlanCuenta.DoesNotExist:
+            raise CommandError(f"No existe el plan de cuentas {options['plan_id']}")
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                filas = leer_archivo_cuentas(archivo, formato=options['formato'])
+            creadas = cargar_cuentas(plan, filas, batch_size=options['lote'])
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        except ValidationError as e:
+            for mensaje in e.messages:
+                self.stderr.write(f"  ✗ {mensaje}")
+            raise CommandError('El archivo tiene errores; no se cargó ninguna cuenta')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {creadas} cuentas cargadas en "{plan}"'))
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-19 12:22
+
+from django.db import migrations, models
+
+
+def calcular_rutas(apps, schema_editor):
+    Cuenta = apps.get_model('plan_cuentas', 'Cuenta')
+    cuentas = {c.id: c for c in Cuenta.objects.only('id', 'cuenta', 'cuenta_madre_id')}
+    resueltas = {}
+
+    def resolver(cuenta, visitadas=()):
+        if cuenta.id in resueltas:
+            return resueltas[cuenta.id]
+        madre = cuentas.get(cuenta.cuenta_madre_id)
+        if madre is None or madre.id in visitadas:
+            resultado = (cuenta.cuenta, 1)
+        else:
+            ruta_madre, nivel_madre = resolver(madre, visitadas + (cuenta.id,))
+            resultado = (f"{ruta_madre}/{cuenta.cuenta}", nivel_madre + 1)
+        resueltas[cuenta.id] = resultado
+        return resultado
+
+    for cuenta in cuentas.values():
+        cuenta.ruta, cuenta.nivel = resolver(cuenta)
+    Cuenta.objects.bulk_update(cuentas.values(), ['ruta', 'nivel'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_cuentas', '0003_add_perfil_to_cuenta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuenta',
+            name='nivel',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, help_text='Profundidad en la jerarquía (1 = cuenta raíz)', verbose_name='Nivel'),
+        ),
+        migrations.AddField(
+            model_name='cuenta',
+            name='ruta',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Códigos de las cuentas ancestro hasta esta cuenta', max_length=255, verbose_name='Ruta'),
+        ),
+        migrations.RunPython(calcular_rutas, migrations.RunPython.noop),
+    ]
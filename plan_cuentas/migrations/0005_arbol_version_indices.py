@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_cuentas', '0004_cuenta_ruta_nivel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plancuenta',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Contador de cambios en las cuentas del plan', verbose_name='Versión'),
+        ),
+        migrations.AddIndex(
+            model_name='cuenta',
+            index=models.Index(fields=['plan_cuentas', 'descripcion'], name='cuenta_plan_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuenta',
+            index=models.Index(fields=['cuenta_madre', 'cuenta'], name='cuenta_madre_codigo_idx'),
+        ),
+    ]
@@ -26,6 +26,14 @@ class PlanCuenta(models.Model):
         db_column="perfil_id",
         help_text="Perfil contable asociado"
     )
+    # Se incrementa con cada cambio en sus cuentas; forma parte de las claves
+    # de cache del árbol, así que las respuestas viejas dejan de usarse solas
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Versión",
+        help_text="Contador de cambios en las cuentas del plan"
+    )
 
     class Meta:
         verbose_name = "Plan de Cuentas"
@@ -97,12 +105,38 @@ class Cuenta(models.Model):
         null=True,
         blank=True,
     )
+    # Ruta materializada: códigos desde la raíz separados por SEPARADOR_RUTA
+    # (ej. "1/11/1105"). Las descendientes de una cuenta son las de ruta que
+    # empieza por "<ruta>/", sin recorrer la jerarquía.
+    ruta = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        verbose_name="Ruta",
+        help_text="Códigos de las cuentas ancestro hasta esta cuenta"
+    )
+    nivel = models.PositiveSmallIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Nivel",
+        help_text="Profundidad en la jerarquía (1 = cuenta raíz)"
+    )
+
+    SEPARADOR_RUTA = '/'
 
     class Meta:
         verbose_name = "Cuenta Contable"
         verbose_name_plural = "Cuentas Contables"
         ordering = ['plan_cuentas', 'cuenta']
         unique_together = ('plan_cuentas', 'cuenta')  # Código único por plan de cuentas
+        indexes = [
+            # Búsqueda por prefijo de descripción dentro de un plan (árbol y typeahead)
+            models.Index(fields=['plan_cuentas', 'descripcion'], name='cuenta_plan_desc_idx'),
+            # Hijas de una cuenta en orden de código (carga del árbol por niveles)
+            models.Index(fields=['cuenta_madre', 'cuenta'], name='cuenta_madre_codigo_idx'),
+        ]
 
     def clean(self):
         super().clean()
@@ -123,7 +157,36 @@ class Cuenta(models.Model):
         if not self.perfil and self.plan_cuentas and getattr(self.plan_cuentas, 'perfil_id', None):
             self.perfil_id = self.plan_cuentas.perfil_id
         self.full_clean()
+
+        ruta_anterior = None
+        if self.pk:
+            ruta_anterior = Cuenta.objects.filter(pk=self.pk).values_list('ruta', flat=True).first()
+        self.ruta, self.nivel = self.calcular_ruta(self.cuenta, self.cuenta_madre)
+        if 'update_fields' in kwargs and kwargs['update_fields'] is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'ruta', 'nivel'}
         super().save(*args, **kwargs)
 
+        if ruta_anterior and ruta_anterior != self.ruta:
+            self._mover_descendientes(ruta_anterior)
+
+    @classmethod
+    def calcular_ruta(cls, codigo, cuenta_madre=None):
+        """Retorna (ruta, nivel) de una cuenta con `codigo` bajo `cuenta_madre`"""
+        if cuenta_madre is None:
+            return codigo, 1
+        return f"{cuenta_madre.ruta}{cls.SEPARADOR_RUTA}{codigo}", cuenta_madre.nivel + 1
+
+    def _mover_descendientes(self, ruta_anterior):
+        """Reescribe la ruta de las descendientes tras cambiar el código o la cuenta madre"""
+        from django.db.models import F, Value
+        from django.db.models.functions import Concat, Substr
+
+        prefijo = ruta_anterior + self.SEPARADOR_RUTA
+        niveles = self.nivel - ruta_anterior.count(self.SEPARADOR_RUTA) - 1
+        Cuenta.objects.filter(plan_cuentas_id=self.plan_cuentas_id, ruta__startswith=prefijo).update(
+            ruta=Concat(Value(self.ruta + self.SEPARADOR_RUTA), Substr('ruta', len(prefijo) + 1)),
+            nivel=F('nivel') + niveles,
+        )
+
     def __str__(self):
         return f"{self.cuenta} - {self.descripcion}"
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .arbol import invalidar_arbol
+from .indice import invalidar_indice
+from .instantaneas import invalidar_instantaneas
+from .models import Cuenta
+
+
+@receiver(post_save, sender=Cuenta)
+@receiver(post_delete, sender=Cuenta)
+def cuenta_changed(sender, instance, raw=False, **kwargs):
+    """Nueva versión del plan (árbol cacheado, índice de búsqueda e instantánea) al crear, editar o eliminar una cuenta"""
+    if raw:
+        return
+    invalidar_arbol(instance.plan_cuentas_id)
+    invalidar_indice(instance.plan_cuentas_id)
+    invalidar_instantaneas(instance.plan_cuentas_id)
@@ -1,3 +1,277 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
 
-# Create your tests here.
+from empresas.models import Empresa
+from perfiles.models import Perfil
+from plan_cuentas.models import PlanCuenta, Cuenta
+from plan_cuentas.indice import invalidar_indice
+from plan_cuentas.instantaneas import InstantaneaPlan, instantanea_perfil, instantanea_plan, invalidar_instantaneas
+from plan_cuentas.services import cargar_cuentas, leer_archivo_cuentas
+
+User = get_user_model()
+
+CSV_PLAN = (
+    "cuenta,descripcion,cuenta_madre,grupo\n"
+    "110505,Caja general,1105,1\n"
+    "1,Activo,,1\n"
+    "11,Disponible,1,1\n"
+    "1105,Caja,11,1\n"
+    "4,Ingresos,,4\n"
+).encode()
+
+
+class PlanCuentaFixtureMixin:
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre="Acme")
+        self.perfil = Perfil.objects.create(nombre="General")
+        self.plan = PlanCuenta.objects.create(empresa=self.empresa, descripcion="Plan 2025", perfil=self.perfil)
+
+
+class CuentaRutaTests(PlanCuentaFixtureMixin, TestCase):
+    def test_ruta_y_cambio_de_codigo(self):
+        activo = Cuenta.objects.create(cuenta="1", descripcion="Activo", plan_cuentas=self.plan)
+        caja = Cuenta.objects.create(cuenta="1105", descripcion="Caja", plan_cuentas=self.plan, cuenta_madre=activo)
+        self.assertEqual((caja.ruta, caja.nivel), ("1/1105", 2))
+
+        activo.cuenta = "10"
+        activo.save()
+        caja.refresh_from_db()
+        self.assertEqual((caja.ruta, caja.nivel), ("10/1105", 2))
+
+
+class CargarCuentasTests(PlanCuentaFixtureMixin, TestCase):
+    def test_carga_por_niveles(self):
+        filas = leer_archivo_cuentas(SimpleUploadedFile('plan.csv', CSV_PLAN))
+        self.assertEqual(cargar_cuentas(self.plan, filas), 5)
+
+        hoja = Cuenta.objects.get(plan_cuentas=self.plan, cuenta="110505")
+        self.assertEqual(hoja.cuenta_madre.cuenta, "1105")
+        self.assertEqual((hoja.ruta, hoja.nivel), ("1/11/1105/110505", 4))
+        self.assertEqual(hoja.perfil_id, self.perfil.id)
+        self.assertEqual(hoja.grupo, 1)
+
+    def test_madre_existente_en_el_plan(self):
+        Cuenta.objects.create(cuenta="1", descripcion="Activo", plan_cuentas=self.plan)
+        cargar_cuentas(self.plan, [{'cuenta': '11', 'descripcion': 'Disponible', 'cuenta_madre': '1'}])
+        self.assertEqual(Cuenta.objects.get(plan_cuentas=self.plan, cuenta="11").ruta, "1/11")
+
+    def test_errores_no_cargan_nada(self):
+        filas = [
+            {'cuenta': '1', 'descripcion': 'Activo'},
+            {'cuenta': '1', 'descripcion': 'Duplicada'},
+            {'cuenta': '2', 'descripcion': 'Huérfana', 'cuenta_madre': '9'},
+        ]
+        with self.assertRaises(ValidationError):
+            cargar_cuentas(self.plan, filas)
+        self.assertFalse(Cuenta.objects.filter(plan_cuentas=self.plan).exists())
+
+    def test_ciclo(self):
+        filas = [
+            {'cuenta': '1', 'descripcion': 'A', 'cuenta_madre': '2'},
+            {'cuenta': '2', 'descripcion': 'B', 'cuenta_madre': '1'},
+        ]
+        with self.assertRaisesMessage(ValidationError, 'circular'):
+            cargar_cuentas(self.plan, filas)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class ImportarPlanViewTests(PlanCuentaFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.client.force_login(self.user)
+
+    def test_importar_csv(self):
+        response = self.client.post(
+            reverse('plan_cuentas:plan_cuenta_importar', args=[self.plan.id]),
+            {'archivo': SimpleUploadedFile('plan.csv', CSV_PLAN)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cuentas_creadas'], 5)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class ArbolPlanTests(PlanCuentaFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.client.force_login(self.user)
+        cargar_cuentas(self.plan, leer_archivo_cuentas(SimpleUploadedFile('plan.csv', CSV_PLAN)))
+
+    def test_nivel_con_conteo_de_hijas(self):
+        response = self.client.get(reverse('plan_cuentas:plan_cuenta_arbol', args=[self.plan.id]))
+        raices = response.json()['cuentas']
+        self.assertEqual([(c['cuenta'], c['hijas']) for c in raices], [('1', 1), ('4', 0)])
+
+        response = self.client.get(reverse('plan_cuentas:plan_cuenta_arbol', args=[self.plan.id]), {'madre': raices[0]['id']})
+        self.assertEqual([c['cuenta'] for c in response.json()['cuentas']], ['11'])
+
+    def test_cache_se_invalida_con_la_version(self):
+        url = reverse('plan_cuentas:plan_cuenta_arbol', args=[self.plan.id])
+        self.client.get(url)
+        with self.assertNumQueries(3):  # sesión, usuario y plan; el nivel sale de cache
+            self.client.get(url)
+
+        Cuenta.objects.create(cuenta="5", descripcion="Gastos", plan_cuentas=self.plan, grupo=5)
+        codigos = [c['cuenta'] for c in self.client.get(url).json()['cuentas']]
+        self.assertEqual(codigos, ['1', '4', '5'])
+
+    def test_busqueda_por_prefijo(self):
+        url = reverse('plan_cuentas:plan_cuenta_buscar', args=[self.plan.id])
+        self.assertEqual([c['cuenta'] for c in self.client.get(url, {'q': '110'}).json()['cuentas']], ['1105', '110505'])
+        resultado = self.client.get(url, {'q': 'caja g'}).json()['cuentas']
+        self.assertEqual([(c['cuenta'], c['ruta']) for c in resultado], [('110505', '1/11/1105/110505')])
+
+    def test_cuentas_madre_exige_prefijo(self):
+        url = reverse('plan_cuentas:get_cuentas_madre_ajax')
+        self.assertEqual(self.client.get(url, {'plan_id': self.plan.id}).json()['cuentas'], [])
+        cuentas = self.client.get(url, {'plan_id': self.plan.id, 'q': '11'}).json()['cuentas']
+        self.assertEqual([c['cuenta'] for c in cuentas], ['11', '1105', '110505'])
+
+    def test_formulario_solo_lista_la_cuenta_madre_elegida(self):
+        from plan_cuentas.forms import CuentaForm
+        caja = Cuenta.objects.get(plan_cuentas=self.plan, cuenta='1105')
+        form = CuentaForm(instance=caja)
+        self.assertEqual([c.cuenta for c in form.fields['cuenta_madre'].queryset], ['11'])
+
+        datos = {'cuenta': '1105', 'descripcion': 'Caja', 'plan_cuentas': self.plan.id, 'cuenta_madre': caja.cuenta_madre_id}
+        self.assertTrue(CuentaForm(datos, instance=caja).is_valid())
+
+    def test_detalle_y_listado_paginado(self):
+        response = self.client.get(reverse('plan_cuentas:plan_cuenta_detail', args=[self.plan.id]))
+        self.assertContains(response, 'arbolCuentas')
+        response = self.client.get(reverse('plan_cuentas:cuenta_list'))
+        self.assertEqual(response.context['total_cuentas'], 5)
+
+
+class IndiceCuentasTests(TestCase):
+    def setUp(self):
+        from plan_cuentas.indice import IndiceCuentas
+        self.indice = IndiceCuentas([
+            {'id': 1, 'cuenta': '1592', 'descripcion': 'Depreciación acumulada'},
+            {'id': 2, 'cuenta': '5160', 'descripcion': 'Gasto de depreciación'},
+            {'id': 3, 'cuenta': '1105', 'descripcion': 'Caja general'},
+            {'id': 4, 'cuenta': '110505', 'descripcion': 'Caja menor'},
+        ])
+
+    def test_prefijo_de_codigo(self):
+        self.assertEqual([c['id'] for c in self.indice.buscar('110')], [3, 4])
+
+    def test_palabras_sin_tildes(self):
+        # Primero la descripción que empieza por la consulta, luego el resto
+        self.assertEqual([c['id'] for c in self.indice.buscar('depreciacion')], [1, 2])
+        self.assertEqual([c['id'] for c in self.indice.buscar('DEPREC acum')], [1])
+        self.assertEqual(self.indice.buscar('caja mayor'), [])
+
+    def test_top_k_y_permitidas(self):
+        self.assertEqual(len(self.indice.buscar('caja', limite=1)), 1)
+        self.assertEqual([c['id'] for c in self.indice.buscar('caja', permitidas={4})], [4])
+
+
+class InstantaneasTests(PlanCuentaFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        invalidar_instantaneas()
+        cargar_cuentas(self.plan, leer_archivo_cuentas(SimpleUploadedFile('plan.csv', CSV_PLAN)))
+        self.plan.refresh_from_db()
+
+    def test_codigos_y_arreglo_de_madres(self):
+        instantanea = instantanea_plan(self.plan)
+        self.assertEqual(instantanea.codigos, ('1', '11', '1105', '110505', '4'))
+        self.assertEqual(list(instantanea.madres), [-1, 0, 1, 2, -1])
+        self.assertEqual(list(instantanea.fines), [4, 4, 4, 4, 5])
+        caja = instantanea.id_de('110505')
+        self.assertEqual([instantanea.codigos[instantanea.posiciones[i]] for i in instantanea.ancestros(caja)], ['1105', '11', '1'])
+        # Sin consultas mientras la versión del plan no cambie
+        with self.assertNumQueries(0):
+            self.assertIs(instantanea_plan(self.plan), instantanea)
+
+    def test_subarboles_y_acumulados(self):
+        instantanea = instantanea_plan(self.plan)
+        disponible, caja_general, ingresos = (instantanea.id_de(c) for c in ('11', '110505', '4'))
+        self.assertTrue(instantanea.es_descendiente(caja_general, disponible))
+        self.assertFalse(instantanea.es_descendiente(disponible, caja_general))
+        self.assertFalse(instantanea.es_descendiente(caja_general, ingresos))
+        self.assertEqual([instantanea.codigos[p] for p in instantanea.subarbol(disponible)], ['11', '1105', '110505'])
+
+        acumulados = instantanea.acumular({caja_general: [100.0, 5.0], ingresos: [-40.0, 0.0]}, 2)
+        self.assertEqual(acumulados, [[100.0, 5.0], [100.0, 5.0], [100.0, 5.0], [100.0, 5.0], [-40.0, 0.0]])
+        self.assertEqual([fila['grupo'] for fila in instantanea.filas({}, 1)], [1, 1, 1, 1, 4])
+
+    def test_grupo_mayor_que_un_byte(self):
+        Cuenta.objects.filter(plan_cuentas=self.plan, cuenta='4').update(grupo=300)
+        instantanea = InstantaneaPlan(
+            Cuenta.objects.filter(plan_cuentas=self.plan).values('id', 'cuenta', 'descripcion', 'grupo', 'nivel', 'cuenta_madre_id')
+        )
+        self.assertEqual(instantanea.filas({}, 1)[-1]['grupo'], 300)
+
+    def test_reconstruye_al_cambiar_la_version(self):
+        anterior = instantanea_plan(self.plan.id)
+        Cuenta.objects.create(cuenta="110510", descripcion="Caja menor", plan_cuentas=self.plan)
+        nueva = instantanea_plan(self.plan.id)
+        self.assertIsNot(nueva, anterior)
+        self.assertIsNotNone(nueva.id_de('110510'))
+        self.assertIsNone(instantanea_plan(0))
+
+    def test_polaridades_del_perfil(self):
+        from perfiles.models import PerfilPlanCuenta
+        self.assertEqual(len(instantanea_perfil(self.perfil.id)), 0)
+        caja = Cuenta.objects.get(plan_cuentas=self.plan, cuenta="1105")
+        configuracion = PerfilPlanCuenta.objects.create(
+            empresa=str(self.empresa.pk), cuentas_id=caja, perfil_id=self.perfil, polaridad='+'
+        )
+        self.assertEqual(dict(instantanea_perfil(self.perfil.id).polaridades), {caja.id: '+'})
+        configuracion.delete()
+        self.assertEqual(len(instantanea_perfil(self.perfil.id)), 0)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class TypeaheadViewTests(PlanCuentaFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        invalidar_indice()
+        self.user = User.objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.client.force_login(self.user)
+        cargar_cuentas(self.plan, leer_archivo_cuentas(SimpleUploadedFile('plan.csv', CSV_PLAN)))
+
+    def test_typeahead_refleja_cambios(self):
+        url = reverse('plan_cuentas:cuenta_typeahead', args=[self.plan.id])
+        self.assertEqual([c['cuenta'] for c in self.client.get(url, {'q': 'caja'}).json()['cuentas']], ['1105', '110505'])
+
+        Cuenta.objects.create(cuenta="110510", descripcion="Caja menor", plan_cuentas=self.plan)
+        self.assertEqual(len(self.client.get(url, {'q': 'caja'}).json()['cuentas']), 3)
+
+    def test_filtro_por_perfil(self):
+        from perfiles.models import PerfilPlanCuenta
+        caja = Cuenta.objects.get(plan_cuentas=self.plan, cuenta="1105")
+        PerfilPlanCuenta.objects.create(empresa=str(self.empresa.pk), cuentas_id=caja, perfil_id=self.perfil, polaridad='-')
+        response = self.client.get(
+            reverse('plan_cuentas:cuenta_typeahead', args=[self.plan.id]),
+            {'q': 'caja', 'perfil': self.perfil.id},
+        )
+        self.assertEqual([(c['cuenta'], c['polaridad']) for c in response.json()['cuentas']], [('1105', '-')])
+
+    def test_busqueda_en_listado(self):
+        response = self.client.get(reverse('plan_cuentas:cuenta_list'), {'search': 'disponíble', 'plan': self.plan.id})
+        self.assertEqual(response.context['total_cuentas'], 1)
+        response = self.client.get(reverse('plan_cuentas:cuenta_list'), {'search': '1', 'plan': self.plan.id})
+        self.assertEqual([c.cuenta for c in response.context['cuentas']], ['1', '11', '1105', '110505'])
+
+    def test_busqueda_en_listado_exige_plan(self):
+        from unittest import mock
+        with mock.patch('plan_cuentas.views.obtener_indice') as obtener:
+            response = self.client.get(reverse('plan_cuentas:cuenta_list'), {'search': 'caja'})
+        obtener.assert_not_called()
+        self.assertEqual(response.context['total_cuentas'], 0)
+
+    def test_busqueda_en_listado_limitada(self):
+        from unittest import mock
+        with mock.patch('plan_cuentas.views.LIMITE_LISTADO', 2):
+            response = self.client.get(reverse('plan_cuentas:cuenta_list'), {'search': '1', 'plan': self.plan.id})
+        self.assertEqual(response.context['total_cuentas'], 2)
+        self.assertTrue(response.context['resultados_limitados'])
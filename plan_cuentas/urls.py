@@ -10,6 +10,7 @@ urlpatterns = [
     path('editar/<int:id>/', views.plan_cuenta_edit, name='plan_cuenta_edit'),
     path('detalle/<int:id>/', views.plan_cuenta_detail, name='plan_cuenta_detail'),
     path('eliminar/<int:id>/', views.plan_cuenta_delete, name='plan_cuenta_delete'),
+    path('importar/<int:id>/', views.plan_cuenta_importar, name='plan_cuenta_importar'),
     
     # URLs para Cuentas Contables
     path('cuentas/', views.cuenta_list, name='cuenta_list'),
@@ -22,4 +23,7 @@ urlpatterns = [
     path('ajax/cuentas-por-empresa/', views.get_cuentas_by_empresa, name='get_cuentas_by_empresa'),
     path('ajax/cuentas-por-plan/<int:plan_id>/', views.cuentas_por_plan_ajax, name='cuentas_por_plan_ajax'),
     path('ajax/cuentas-madre/', views.get_cuentas_madre_ajax, name='get_cuentas_madre_ajax'),
+    path('ajax/arbol/<int:id>/', views.plan_cuenta_arbol, name='plan_cuenta_arbol'),
+    path('ajax/buscar/<int:id>/', views.plan_cuenta_buscar, name='plan_cuenta_buscar'),
+    path('ajax/typeahead/<int:id>/', views.cuenta_typeahead, name='cuenta_typeahead'),
 ]
\ No newline at end of file
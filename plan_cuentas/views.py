@@ -6,13 +6,22 @@ from django.db import transaction, IntegrityError
 from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.http import JsonResponse
+from django.core.exceptions import ValidationError
 from .models import PlanCuenta, Cuenta
+from .services import cargar_cuentas, leer_archivo_cuentas
+from . import arbol
+from .indice import MAX_RESULTADOS, obtener_indice
+from .instantaneas import instantanea_perfil
 from .forms import PlanCuentaForm, CuentaForm
 from empresas.models import Empresa
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Coincidencias de una búsqueda en el listado de cuentas (se paginan de a 50)
+LIMITE_LISTADO = 500
+
 @login_required
 def plan_cuenta_list(request):
     """Lista todos los planes de cuentas disponibles"""
@@ -70,26 +79,54 @@ def cuenta_list(request):
         # Obtener parámetros de filtrado
         search = request.GET.get('search', '')
         
+        plan_id = request.GET.get('plan', '')
+        
         # Query base
         cuentas = Cuenta.objects.all()
+        plan = None
+        if plan_id.isdigit():
+            plan = PlanCuenta.objects.only('id', 'version').filter(id=plan_id).first()
+            cuentas = cuentas.filter(plan_cuentas_id=plan_id)
         
-        # Aplicar filtros
-        if search:
-            cuentas = cuentas.filter(
-                Q(cuenta__icontains=search) |
-                Q(descripcion__icontains=search)
-            )
-        
-        # Ordenar por ID
-        cuentas = cuentas.order_by('id')
+        resultados_limitados = False
+        if search and plan is None:
+            # El índice es por plan: buscar en todos obligaría a construir el de cada uno
+            messages.info(request, "Seleccione un plan de cuentas para buscar")
+            cuentas = cuentas.none()
         
-        # Estadísticas
-        cuentas_con_descripcion = cuentas.exclude(descripcion__isnull=True).exclude(descripcion='').count()
+        if search and plan is not None:
+            # Búsqueda por prefijo en el índice en memoria del plan; se pagina en el
+            # orden del índice y solo se leen de la base de datos las cuentas de la página
+            resultados = obtener_indice(plan).buscar(search, limite=LIMITE_LISTADO + 1)
+            resultados_limitados = len(resultados) > LIMITE_LISTADO
+            resultados = resultados[:LIMITE_LISTADO]
+            cuentas_con_descripcion = sum(1 for cuenta in resultados if cuenta['descripcion'])
+            paginator = Paginator([cuenta['id'] for cuenta in resultados], 50)
+            page_obj = paginator.get_page(request.GET.get('page'))
+            por_id = Cuenta.objects.in_bulk(page_obj.object_list)
+            page_obj.object_list = [por_id[pk] for pk in page_obj.object_list if pk in por_id]
+        else:
+            # Ordenar por ID
+            cuentas = cuentas.order_by('id')
+            
+            # Estadísticas
+            cuentas_con_descripcion = cuentas.exclude(descripcion__isnull=True).exclude(descripcion='').count()
+            
+            # Paginación
+            paginator = Paginator(cuentas, 50)
+            page_obj = paginator.get_page(request.GET.get('page'))
         
         context = {
-            'cuentas': cuentas,
+            'cuentas': page_obj,
+            'page_obj': page_obj,
+            'is_paginated': page_obj.has_other_pages(),
+            'total_cuentas': paginator.count,
             'cuentas_con_descripcion': cuentas_con_descripcion,
             'search': search,
+            'plan_id': plan_id,
+            'planes': PlanCuenta.objects.select_related('empresa').order_by('descripcion'),
+            'resultados_limitados': resultados_limitados,
+            'limite_listado': LIMITE_LISTADO,
         }
         
         return render(request, 'plan_cuentas/cuenta_list.html', context)
@@ -246,8 +283,8 @@ def plan_cuenta_detail(request, id):
     """Ver detalles de un plan de cuentas"""
     plan = get_object_or_404(PlanCuenta, id=id)
     
-    # Obtener cuentas asociadas a este plan
-    cuentas_asociadas = Cuenta.objects.filter(plan_cuentas=plan).order_by('cuenta')
+    # Las cuentas se cargan por niveles desde plan_cuenta_arbol (plan-cuentas.js)
+    cuentas_asociadas = Cuenta.objects.filter(plan_cuentas=plan)
     
     # Estadísticas del plan
     stats = {
@@ -257,13 +294,36 @@ def plan_cuenta_detail(request, id):
     
     context = {
         'plan': plan,
-        'cuentas': cuentas_asociadas,
         'stats': stats,
     }
     
     return render(request, 'plan_cuentas/plan_detail.html', context)
 
 
+@login_required
+def plan_cuenta_importar(request, id):
+    """Cargar en bloque las cuentas de un archivo CSV o JSON en el plan"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    plan = get_object_or_404(PlanCuenta, id=id)
+    archivo = request.FILES.get('archivo')
+    if not archivo:
+        return JsonResponse({'success': False, 'error': 'Debe adjuntar un archivo'}, status=400)
+
+    try:
+        filas = leer_archivo_cuentas(archivo, formato=request.POST.get('formato') or None)
+        creadas = cargar_cuentas(plan, filas)
+        return JsonResponse({'success': True, 'plan_id': plan.id, 'cuentas_creadas': creadas})
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'errores': e.messages}, status=400)
+    except UnicodeDecodeError:
+        return JsonResponse({'success': False, 'error': 'El archivo debe estar codificado en UTF-8'}, status=400)
+    except Exception as e:
+        logger.error(f"Error al importar cuentas en el plan {plan.id}: {e}", exc_info=True)
+        return JsonResponse({'success': False, 'error': 'Error interno al importar las cuentas'}, status=500)
+
+
 @login_required
 def cuenta_detail(request, id):
     """Ver detalles de una cuenta contable"""
@@ -361,11 +421,16 @@ def cuentas_por_plan_ajax(request, plan_id):
 
 @login_required
 def get_cuentas_madre_ajax(request):
-    """Vista AJAX para obtener cuentas madre disponibles según el plan seleccionado"""
+    """
+    Vista AJAX para buscar cuentas madre del plan seleccionado: ?q= es el
+    prefijo del código o la descripción (obligatorio, para no enviar el plan
+    completo en cada dropdown) y el resultado se limita a LIMITE_BUSQUEDA
+    """
     plan_id = request.GET.get('plan_id')
     cuenta_actual_id = request.GET.get('cuenta_id')  # Para evitar auto-referencias
+    q = request.GET.get('q', '').strip()
     
-    if not plan_id:
+    if not plan_id or not q:
         return JsonResponse({'cuentas': []})
     
     try:
@@ -373,11 +438,85 @@ def get_cuentas_madre_ajax(request):
         cuentas_query = Cuenta.objects.filter(plan_cuentas_id=plan_id)
         if cuenta_actual_id:
             cuentas_query = cuentas_query.exclude(id=cuenta_actual_id)
+        cuentas_query = cuentas_query.filter(Q(cuenta__startswith=q) | Q(descripcion__istartswith=q))
         
-        cuentas = cuentas_query.values('id', 'cuenta', 'descripcion').order_by('cuenta')
+        cuentas = cuentas_query.values('id', 'cuenta', 'descripcion').order_by('cuenta')[:arbol.LIMITE_BUSQUEDA]
         
         return JsonResponse({
             'cuentas': list(cuentas)
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
+
+
+@login_required
+def plan_cuenta_arbol(request, id):
+    """
+    Un nivel del árbol de cuentas vía AJAX: hijas de ?madre=<id> (o las raíces),
+    con el número de hijas de cada una. Pagina con ?offset= y ?limit=.
+    """
+    plan = get_object_or_404(PlanCuenta, id=id)
+    try:
+        madre_id = request.GET.get('madre') or None
+        nivel = arbol.obtener_nivel(
+            plan,
+            madre_id=int(madre_id) if madre_id else None,
+            desplazamiento=request.GET.get('offset', 0),
+            limite=request.GET.get('limit', arbol.LIMITE_NIVEL),
+        )
+        return JsonResponse({
+            'plan_id': plan.id,
+            'version': plan.version,
+            'madre': madre_id,
+            **nivel,
+        })
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+
+
+@login_required
+def plan_cuenta_buscar(request, id):
+    """Búsqueda por prefijo de código o descripción dentro del plan vía AJAX (?q=)"""
+    plan = get_object_or_404(PlanCuenta, id=id)
+    try:
+        cuentas = arbol.buscar(plan, request.GET.get('q', ''), limite=request.GET.get('limit', arbol.LIMITE_BUSQUEDA))
+        return JsonResponse({'plan_id': plan.id, 'version': plan.version, 'cuentas': cuentas})
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+
+
+@login_required
+def cuenta_typeahead(request, id):
+    """
+    Autocompletado de cuentas del plan vía AJAX: ?q= (código o palabras de la
+    descripción, sin importar tildes), ?k= resultados (máx. 50) y ?perfil= para
+    limitar a las cuentas configuradas en un perfil (incluye su polaridad).
+    """
+    inicio = time.perf_counter()
+    plan = get_object_or_404(PlanCuenta.objects.only('id', 'version'), id=id)
+    try:
+        limite = max(1, min(int(request.GET.get('k', 10)), MAX_RESULTADOS))
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    polaridades = None
+    perfil_id = request.GET.get('perfil')
+    if perfil_id:
+        # Polaridades de todo el perfil: el índice ya limita el resultado a las cuentas del plan
+        instantanea = instantanea_perfil(perfil_id)
+        polaridades = instantanea.polaridades if instantanea is not None else {}
+    
+    resultados = obtener_indice(plan).buscar(
+        request.GET.get('q', ''),
+        limite=limite,
+        permitidas=polaridades.keys() if polaridades is not None else None,
+    )
+    cuentas = [
+        {**cuenta, 'polaridad': polaridades[cuenta['id']]} if polaridades is not None else cuenta
+        for cuenta in resultados
+    ]
+    return JsonResponse({
+        'plan_id': plan.id,
+        'cuentas': cuentas,
+        'tiempo_ms': round((time.perf_counter() - inicio) * 1000, 2),
+    })
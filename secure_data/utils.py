@@ -53,7 +53,8 @@ def send_2fa_email(user):
             recipient_list=[user.email],
             fail_silently=False,
         )
-        logger.info("[2FA][EMAIL] Email enviado exitosamente")
+        # Con QueuedEmailBackend el correo queda en la bandeja de salida y lo envía `enviar_correos`
+        logger.info("[2FA][EMAIL] Email encolado exitosamente")
         return True
     except Exception as e:
         logger.exception(f"[2FA][EMAIL] Error al enviar email: {str(e)}")
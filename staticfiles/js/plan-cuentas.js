@@ -533,70 +533,235 @@ document.addEventListener('DOMContentLoaded', function() {
     function initializeCuentaForm() {
         const planCuentasSelect = document.getElementById('id_plan_cuentas');
         const cuentaMadreSelect = document.getElementById('id_cuenta_madre');
+        const cuentaMadreBusqueda = document.getElementById('cuentaMadreBusqueda');
         
         if (planCuentasSelect && cuentaMadreSelect) {
+            // Al cambiar de plan la cuenta madre elegida ya no aplica
             planCuentasSelect.addEventListener('change', function() {
-                updateCuentaMadreOptions(this.value);
+                cuentaMadreSelect.innerHTML = '<option value="">Seleccione una cuenta madre (opcional)</option>';
+                if (cuentaMadreBusqueda) cuentaMadreBusqueda.value = '';
             });
             
-            // Cargar opciones iniciales si hay un plan seleccionado
-            if (planCuentasSelect.value) {
-                updateCuentaMadreOptions(planCuentasSelect.value);
+            if (cuentaMadreBusqueda) {
+                cuentaMadreBusqueda.addEventListener('input', debounce(() => {
+                    updateCuentaMadreOptions(planCuentasSelect.value, cuentaMadreBusqueda.value.trim());
+                }, 300));
             }
         }
     }
     
-    function updateCuentaMadreOptions(planId) {
+    /**
+     * Cuentas madre del plan que empiezan por `q` (código o descripción). El
+     * servidor limita el resultado: el plan completo nunca llega al dropdown
+     */
+    function updateCuentaMadreOptions(planId, q) {
         const cuentaMadreSelect = document.getElementById('id_cuenta_madre');
         const cuentaActualId = document.querySelector('input[name="cuenta_id"]')?.value;
         
-        if (!cuentaMadreSelect) return;
-        
-        // Limpiar opciones existentes
-        cuentaMadreSelect.innerHTML = '<option value="">Seleccione una cuenta madre (opcional)</option>';
+        if (!cuentaMadreSelect || !planId || !q) return;
         
-        if (!planId) return;
+        // La cuenta ya elegida se conserva aunque no esté entre los resultados
+        const seleccionada = cuentaMadreSelect.value ? cuentaMadreSelect.selectedOptions[0].cloneNode(true) : null;
         
-        // Mostrar loading
-        cuentaMadreSelect.innerHTML = '<option value="">Cargando...</option>';
-        cuentaMadreSelect.disabled = true;
-        
-        // Construir URL con parámetros
-        let url = `/plan-cuentas/ajax/cuentas-madre/?plan_id=${planId}`;
+        // Construir URL con parámetros; la ruta la pone el formulario (data-url)
+        const url = new URL(cuentaMadreSelect.dataset.url, window.location.origin);
+        url.searchParams.set('plan_id', planId);
+        url.searchParams.set('q', q);
         if (cuentaActualId) {
-            url += `&cuenta_id=${cuentaActualId}`;
+            url.searchParams.set('cuenta_id', cuentaActualId);
         }
         
         // Hacer petición AJAX
         fetch(url)
             .then(response => response.json())
             .then(data => {
-                // Restaurar estado
-                cuentaMadreSelect.disabled = false;
-                cuentaMadreSelect.innerHTML = '<option value="">Seleccione una cuenta madre (opcional)</option>';
-                
-                if (data.cuentas) {
-                    data.cuentas.forEach(cuenta => {
-                        const option = document.createElement('option');
-                        option.value = cuenta.id;
-                        option.textContent = `${cuenta.cuenta} - ${cuenta.descripcion}`;
-                        cuentaMadreSelect.appendChild(option);
-                    });
-                } else if (data.error) {
+                if (data.error) {
                     console.error('Error cargando cuentas madre:', data.error);
                     showNotification('Error al cargar las cuentas madre', 'error');
+                    return;
                 }
+                
+                cuentaMadreSelect.innerHTML = '<option value="">Seleccione una cuenta madre (opcional)</option>';
+                if (seleccionada && !data.cuentas.some(cuenta => String(cuenta.id) === seleccionada.value)) {
+                    cuentaMadreSelect.appendChild(seleccionada);
+                }
+                data.cuentas.forEach(cuenta => {
+                    const option = document.createElement('option');
+                    option.value = cuenta.id;
+                    option.textContent = `${cuenta.cuenta} - ${cuenta.descripcion}`;
+                    cuentaMadreSelect.appendChild(option);
+                });
+                cuentaMadreSelect.value = seleccionada ? seleccionada.value : '';
             })
             .catch(error => {
                 console.error('Error en la petición AJAX:', error);
-                cuentaMadreSelect.disabled = false;
-                cuentaMadreSelect.innerHTML = '<option value="">Error al cargar opciones</option>';
                 showNotification('Error de conexión al cargar las cuentas madre', 'error');
             });
     }
     
+    /**
+     * Árbol por niveles: cada nodo carga sus hijas al expandirse (plan_cuenta_arbol)
+     * y la búsqueda usa el índice por prefijo del servidor (plan_cuenta_buscar)
+     */
+    function initializeLazyTree() {
+        const container = document.getElementById('arbolCuentas');
+        if (!container) return;
+        
+        loadTreeLevel(container, null, container);
+        
+        const busqueda = document.getElementById('arbolBusqueda');
+        if (busqueda) {
+            busqueda.addEventListener('input', debounce(() => searchTree(container, busqueda.value.trim()), 300));
+        }
+    }
+    
+    function loadTreeLevel(container, madreId, target, offset = 0) {
+        const url = new URL(container.dataset.arbolUrl, window.location.origin);
+        if (madreId) {
+            url.searchParams.set('madre', madreId);
+        }
+        url.searchParams.set('offset', offset);
+        
+        return fetch(url)
+            .then(response => response.json())
+            .then(data => {
+                if (offset === 0) {
+                    target.innerHTML = '';
+                } else {
+                    const loadMore = target.querySelector(':scope > .tree-load-more');
+                    if (loadMore) loadMore.remove();
+                }
+                
+                if (data.error) {
+                    showNotification(data.error, 'error');
+                    return;
+                }
+                if (data.cuentas.length === 0 && offset === 0) {
+                    target.innerHTML = '<p class="text-gray-500 italic text-sm">No hay cuentas para mostrar</p>';
+                    return;
+                }
+                
+                data.cuentas.forEach(cuenta => target.appendChild(buildLazyNode(container, cuenta)));
+                
+                // Niveles con muchas cuentas se traen por páginas
+                const cargadas = offset + data.cuentas.length;
+                if (cargadas < data.total) {
+                    const loadMore = document.createElement('button');
+                    loadMore.type = 'button';
+                    loadMore.className = 'tree-load-more text-sm text-primary-600 hover:text-primary-800 mt-2';
+                    loadMore.textContent = `Cargar más (${data.total - cargadas} restantes)`;
+                    loadMore.addEventListener('click', () => loadTreeLevel(container, madreId, target, cargadas));
+                    target.appendChild(loadMore);
+                }
+            })
+            .catch(error => {
+                console.error('Error cargando el árbol de cuentas:', error);
+                showNotification('Error de conexión al cargar las cuentas', 'error');
+            });
+    }
+    
+    function buildLazyNode(container, cuenta) {
+        const node = document.createElement('div');
+        node.className = 'tree-node';
+        node.dataset.id = cuenta.id;
+        
+        const content = document.createElement('div');
+        content.className = 'tree-node-content';
+        content.dataset.codigo = cuenta.cuenta;
+        
+        const toggle = document.createElement('i');
+        toggle.className = cuenta.hijas > 0 ?
+            'fas fa-chevron-right tree-node-toggle' :
+            'fas fa-circle text-xs text-gray-400 mr-2';
+        
+        const codigo = document.createElement('code');
+        codigo.className = 'account-code mr-3';
+        codigo.textContent = cuenta.cuenta;
+        
+        const descripcion = document.createElement('a');
+        descripcion.className = 'font-medium hover:underline';
+        descripcion.href = container.dataset.detalleUrl.replace(/0\/$/, `${cuenta.id}/`);
+        descripcion.textContent = cuenta.descripcion;
+        
+        const meta = document.createElement('span');
+        meta.className = 'ml-auto text-xs text-gray-500';
+        meta.textContent = [
+            cuenta.hijas > 0 ? `${cuenta.hijas} subcuentas` : '',
+            cuenta.grupo ? `Grupo ${cuenta.grupo}` : '',
+        ].filter(Boolean).join(' · ');
+        
+        content.append(toggle, codigo, descripcion, meta);
+        node.appendChild(content);
+        
+        if (cuenta.hijas > 0) {
+            const children = document.createElement('div');
+            children.className = 'tree-children';
+            children.style.display = 'none';
+            node.appendChild(children);
+            toggle.addEventListener('click', () => expandLazyNode(container, node));
+        }
+        return node;
+    }
+    
+    function expandLazyNode(container, node) {
+        const children = node.querySelector(':scope > .tree-children');
+        const toggle = node.querySelector(':scope > .tree-node-content > .tree-node-toggle');
+        
+        if (children.style.display !== 'none') {
+            children.style.display = 'none';
+            toggle.classList.remove('expanded');
+            return;
+        }
+        
+        children.style.display = 'block';
+        toggle.classList.add('expanded');
+        
+        // Las hijas se piden una sola vez por nodo
+        if (!children.dataset.cargado) {
+            children.dataset.cargado = '1';
+            children.innerHTML = '<p class="text-gray-400 text-xs italic">Cargando...</p>';
+            loadTreeLevel(container, node.dataset.id, children);
+        }
+    }
+    
+    function searchTree(container, texto) {
+        if (!texto) {
+            loadTreeLevel(container, null, container);
+            return;
+        }
+        
+        const url = new URL(container.dataset.buscarUrl, window.location.origin);
+        url.searchParams.set('q', texto);
+        
+        fetch(url)
+            .then(response => response.json())
+            .then(data => {
+                container.innerHTML = '';
+                if (!data.cuentas || data.cuentas.length === 0) {
+                    container.innerHTML = '<p class="text-gray-500 italic text-sm">Sin resultados</p>';
+                    return;
+                }
+                data.cuentas.forEach(cuenta => {
+                    const node = buildLazyNode(container, cuenta);
+                    if (cuenta.nivel > 1) {
+                        // Mostrar la ruta para ubicar la cuenta en la jerarquía
+                        const ruta = document.createElement('span');
+                        ruta.className = 'text-xs text-gray-400 ml-2';
+                        ruta.textContent = cuenta.ruta;
+                        node.querySelector('.tree-node-content code').after(ruta);
+                    }
+                    container.appendChild(node);
+                });
+            })
+            .catch(error => {
+                console.error('Error en la búsqueda de cuentas:', error);
+                showNotification('Error de conexión al buscar cuentas', 'error');
+            });
+    }
+    
     // Inicializar formulario de cuenta cuando se carga la página
     initializeCuentaForm();
+    initializeLazyTree();
     
     // Exponer funciones globales necesarias
     window.toggleTreeView = toggleTreeView;
@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'estado', 'progreso', 'intentos', 'usuario', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'nombre', 'fecha_creacion')
+    search_fields = ('id', 'nombre', 'usuario__email')
+    readonly_fields = (
+        'id', 'nombre', 'parametros', 'resultado', 'error', 'progreso', 'mensaje',
+        'intentos', 'fecha_creacion', 'fecha_inicio', 'fecha_fin',
+    )
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TareasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tareas'
+    verbose_name = 'Tareas en Segundo Plano'
+
+    def ready(self):
+        """Registrar los manejadores definidos en los módulos `tareas.py` de cada app"""
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tareas')
@@ -0,0 +1,62 @@
+"""
+Worker local de tareas en segundo plano.
+
+Uso:
+    python manage.py procesar_tareas            # corre indefinidamente
+    python manage.py procesar_tareas --once     # vacía la cola y termina
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tareas import registry
+from tareas.worker import liberar_bloqueadas, procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano encoladas por las vistas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesa las tareas pendientes y termina',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando la cola está vacía (default: 2)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=30,
+            help='Minutos sin latido tras los cuales una tarea en proceso se considera bloqueada (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Worker iniciado. Tareas registradas: {', '.join(registry.manejadores_registrados()) or 'ninguna'}"
+        )
+        try:
+            while True:
+                close_old_connections()
+                liberadas = liberar_bloqueadas(options['timeout'])
+                if liberadas:
+                    self.stdout.write(self.style.WARNING(f"⚠ {liberadas} tareas bloqueadas devueltas a la cola"))
+
+                procesadas = procesar_pendientes()
+                if procesadas:
+                    self.stdout.write(f"  ✓ {procesadas} tareas procesadas")
+
+                if options['once']:
+                    break
+                if not procesadas:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker detenido')
+            return
+
+        self.stdout.write(self.style.SUCCESS('✅ Cola de tareas procesada'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarea',
+            name='latido',
+            field=models.DateTimeField(blank=True, help_text='Lo renueva el worker mientras ejecuta la tarea; sin latidos recientes se da por abandonada', null=True, verbose_name='Último Latido'),
+        ),
+    ]
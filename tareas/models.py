@@ -0,0 +1,107 @@
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+import uuid
+
+
+class Tarea(models.Model):
+    """
+    Tarea en segundo plano - Operación pesada (importaciones, reportes, envíos)
+    encolada desde una vista y ejecutada por el worker `procesar_tareas`
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADA = 'completada'
+    FALLIDA = 'fallida'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En Proceso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    nombre = models.CharField(
+        max_length=100,
+        verbose_name="Nombre de la Tarea",
+        help_text="Nombre con el que el manejador fue registrado"
+    )
+    parametros = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name="Parámetros")
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default=PENDIENTE,
+        verbose_name="Estado"
+    )
+    progreso = models.PositiveSmallIntegerField(default=0, verbose_name="Progreso (%)")
+    mensaje = models.CharField(max_length=255, blank=True, default='', verbose_name="Mensaje de Progreso")
+    resultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Resultado")
+    error = models.TextField(blank=True, default='', verbose_name="Error")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    max_intentos = models.PositiveSmallIntegerField(default=1, verbose_name="Máximo de Intentos")
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='tareas',
+        verbose_name="Usuario",
+        help_text="Usuario que encoló la tarea",
+        null=True,
+        blank=True
+    )
+    programada_para = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Programada Para",
+        help_text="La tarea no se ejecuta antes de esta fecha (reintentos con espera)"
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Inicio")
+    latido = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Último Latido",
+        help_text="Lo renueva el worker mientras ejecuta la tarea; sin latidos recientes se da por abandonada"
+    )
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Finalización")
+
+    class Meta:
+        verbose_name = "Tarea en Segundo Plano"
+        verbose_name_plural = "Tareas en Segundo Plano"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'programada_para'], name='tarea_estado_prog_idx'),
+        ]
+
+    @property
+    def terminada(self):
+        return self.estado in (self.COMPLETADA, self.FALLIDA)
+
+    def actualizar_progreso(self, progreso, mensaje=''):
+        """
+        Actualiza el progreso sin tocar el resto de campos, para que las vistas
+        de consulta lo vean mientras el manejador sigue trabajando. También
+        renueva el latido: la tarea sigue viva
+        """
+        self.progreso = max(0, min(100, int(progreso)))
+        self.mensaje = mensaje[:255]
+        self.latido = timezone.now()
+        Tarea.objects.filter(pk=self.pk).update(progreso=self.progreso, mensaje=self.mensaje, latido=self.latido)
+
+    def as_dict(self):
+        return {
+            'id': str(self.id),
+            'nombre': self.nombre,
+            'estado': self.estado,
+            'progreso': self.progreso,
+            'mensaje': self.mensaje,
+            'resultado': self.resultado,
+            'error': self.error,
+            'intentos': self.intentos,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
+            'latido': self.latido.isoformat() if self.latido else None,
+            'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None,
+        }
+
+    def __str__(self):
+        return f"{self.nombre} ({self.get_estado_display()})"
@@ -0,0 +1,59 @@
+"""
+Registro de manejadores de tareas en segundo plano.
+
+Cada app declara sus tareas en un módulo `tareas.py` con el decorador
+`registrar`; el módulo se importa automáticamente al iniciar Django
+(ver `TareasConfig.ready`). Las vistas encolan con `encolar` y el worker
+`procesar_tareas` las ejecuta fuera del ciclo request/response.
+"""
+import logging
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_manejadores = {}
+
+
+def registrar(nombre, max_intentos=1):
+    """
+    Decorador que registra `func(tarea, **parametros)` bajo `nombre`.
+    El valor que retorne el manejador se guarda como resultado de la tarea.
+    """
+    def decorator(func):
+        if nombre in _manejadores and _manejadores[nombre][0] is not func:
+            logger.warning(f"Manejador de tarea '{nombre}' registrado dos veces; se usa el último")
+        _manejadores[nombre] = (func, max_intentos)
+        return func
+    return decorator
+
+
+def obtener_manejador(nombre):
+    """Retorna (func, max_intentos) o None si la tarea no está registrada"""
+    return _manejadores.get(nombre)
+
+
+def manejadores_registrados():
+    return sorted(_manejadores)
+
+
+def encolar(nombre, parametros=None, usuario=None, max_intentos=None, programada_para=None):
+    """
+    Crea la tarea en estado pendiente y la retorna de inmediato.
+    Los parámetros deben ser serializables a JSON (ids, no instancias de modelos).
+    """
+    from .models import Tarea
+
+    manejador = obtener_manejador(nombre)
+    if manejador is None:
+        raise ValueError(f"No existe una tarea registrada con el nombre '{nombre}'")
+
+    tarea = Tarea.objects.create(
+        nombre=nombre,
+        parametros=parametros or {},
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+        max_intentos=max_intentos or manejador[1],
+        programada_para=programada_para or timezone.now(),
+    )
+    logger.info(f"Tarea encolada: {nombre} ({tarea.id})")
+    return tarea
@@ -0,0 +1,123 @@
+import time
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from tareas import registry
+from tareas.models import Tarea
+from tareas.worker import ejecutar, liberar_bloqueadas, procesar_pendientes, reclamar_siguiente
+
+User = get_user_model()
+
+
+@registry.registrar('tests.sumar')
+def _sumar(tarea, a, b):
+    tarea.actualizar_progreso(50, 'Sumando')
+    return {'total': a + b}
+
+
+@registry.registrar('tests.fallar', max_intentos=2)
+def _fallar(tarea):
+    raise RuntimeError('falla controlada')
+
+
+@registry.registrar('tests.invalida', max_intentos=3)
+def _invalida(tarea):
+    raise ValidationError('El asiento debe estar balanceado')
+
+
+@registry.registrar('tests.lenta')
+def _lenta(tarea, segundos):
+    time.sleep(segundos)
+    return {}
+
+
+class TareaWorkerTests(TestCase):
+    def test_encolar_y_procesar(self):
+        tarea = registry.encolar('tests.sumar', {'a': 2, 'b': 3})
+        self.assertEqual(tarea.estado, Tarea.PENDIENTE)
+
+        self.assertEqual(procesar_pendientes(), 1)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.COMPLETADA)
+        self.assertEqual(tarea.progreso, 100)
+        self.assertEqual(tarea.resultado, {'total': 5})
+        self.assertEqual(tarea.intentos, 1)
+
+    def test_reclamar_no_repite_tarea(self):
+        registry.encolar('tests.sumar', {'a': 1, 'b': 1})
+        self.assertIsNotNone(reclamar_siguiente())
+        self.assertIsNone(reclamar_siguiente())
+
+    def test_reintento_y_fallo_definitivo(self):
+        tarea = registry.encolar('tests.fallar')
+        ejecutar(reclamar_siguiente())
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.PENDIENTE)
+        self.assertGreater(tarea.programada_para, tarea.fecha_creacion)
+
+        Tarea.objects.filter(pk=tarea.pk).update(programada_para=tarea.fecha_creacion)
+        ejecutar(reclamar_siguiente())
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+        self.assertIn('falla controlada', tarea.error)
+
+    def test_encolar_tarea_desconocida(self):
+        with self.assertRaises(ValueError):
+            registry.encolar('tests.no_existe')
+
+    def test_error_de_validacion_no_se_reintenta(self):
+        tarea = registry.encolar('tests.invalida')
+        ejecutar(reclamar_siguiente())
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), (Tarea.FALLIDA, 1))
+        self.assertEqual(tarea.error, 'El asiento debe estar balanceado')
+
+    def test_liberar_solo_tareas_sin_latido(self):
+        viva = registry.encolar('tests.sumar', {'a': 1, 'b': 1})
+        abandonada = registry.encolar('tests.sumar', {'a': 2, 'b': 2})
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        Tarea.objects.update(estado=Tarea.EN_PROCESO, fecha_inicio=hace_una_hora, latido=hace_una_hora)
+        viva.actualizar_progreso(40, 'Sigue trabajando')
+
+        self.assertEqual(liberar_bloqueadas(30), 1)
+        viva.refresh_from_db()
+        abandonada.refresh_from_db()
+        self.assertEqual(viva.estado, Tarea.EN_PROCESO)
+        self.assertEqual(abandonada.estado, Tarea.PENDIENTE)
+
+
+class LatidoTareaTests(TransactionTestCase):
+    def test_latido_mientras_corre_el_manejador(self):
+        from unittest import mock
+        tarea = registry.encolar('tests.lenta', {'segundos': 0.3})
+        with mock.patch('tareas.worker.INTERVALO_LATIDO', 0.05):
+            tarea = reclamar_siguiente()
+            inicio = tarea.latido
+            ejecutar(tarea)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.COMPLETADA)
+        self.assertGreater(tarea.latido, inicio)
+
+
+@override_settings(TWO_FACTOR_BYPASS=True)
+class TareaViewsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('contador', 'contador@example.com', 'TestPass123!')
+        self.otro = User.objects.create_user('otro', 'otro@example.com', 'TestPass123!')
+        self.client.force_login(self.user)
+
+    def test_estado_de_tarea_propia(self):
+        tarea = registry.encolar('tests.sumar', {'a': 1, 'b': 2}, usuario=self.user)
+        response = self.client.get(reverse('tareas:tarea_estado', args=[tarea.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tarea']['estado'], Tarea.PENDIENTE)
+
+    def test_estado_de_tarea_ajena(self):
+        tarea = registry.encolar('tests.sumar', {'a': 1, 'b': 2}, usuario=self.otro)
+        response = self.client.get(reverse('tareas:tarea_estado', args=[tarea.id]))
+        self.assertEqual(response.status_code, 404)
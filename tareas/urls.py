@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'tareas'
+
+urlpatterns = [
+    path('', views.tarea_list, name='tarea_list'),
+    path('<uuid:id>/', views.tarea_estado, name='tarea_estado'),
+]
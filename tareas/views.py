@@ -0,0 +1,31 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from .models import Tarea
+
+
+def _tareas_visibles(user):
+    tareas = Tarea.objects.all()
+    if not user.is_staff:
+        tareas = tareas.filter(usuario=user)
+    return tareas
+
+
+@login_required
+def tarea_estado(request, id):
+    """Estado, progreso y resultado de una tarea (para polling desde el frontend)"""
+    tarea = get_object_or_404(_tareas_visibles(request.user), pk=id)
+    return JsonResponse({'success': True, 'tarea': tarea.as_dict()})
+
+
+@login_required
+def tarea_list(request):
+    """Últimas tareas del usuario; filtro opcional por estado"""
+    tareas = _tareas_visibles(request.user)
+    estado = request.GET.get('estado')
+    if estado:
+        tareas = tareas.filter(estado=estado)
+    return JsonResponse({
+        'success': True,
+        'tareas': [tarea.as_dict() for tarea in tareas[:50]],
+    })
@@ -0,0 +1,157 @@
+"""
+Ejecución de tareas en segundo plano.
+
+Las tareas se reclaman con un UPDATE condicional (estado=pendiente -> en_proceso),
+de modo que varios workers pueden correr a la vez sin ejecutar dos veces la misma
+tarea y sin bloquear filas mientras el manejador trabaja. Mientras el manejador
+corre, un hilo renueva el `latido` de la tarea; solo las tareas sin latidos
+recientes (worker detenido) vuelven a la cola.
+"""
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import registry
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+# Segundos de espera antes del primer reintento; se duplica en cada intento
+ESPERA_REINTENTO = getattr(settings, 'TAREAS_ESPERA_REINTENTO', 30)
+# Segundos entre latidos de una tarea en ejecución (muy por debajo del --timeout del worker)
+INTERVALO_LATIDO = getattr(settings, 'TAREAS_INTERVALO_LATIDO', 30)
+
+
+def reclamar_siguiente():
+    """Reclama la siguiente tarea pendiente lista para ejecutarse, o None"""
+    ahora = timezone.now()
+    candidatas = Tarea.objects.filter(
+        estado=Tarea.PENDIENTE,
+        programada_para__lte=ahora,
+    ).order_by('programada_para', 'fecha_creacion').values_list('pk', flat=True)[:10]
+
+    for pk in candidatas:
+        reclamada = Tarea.objects.filter(pk=pk, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.EN_PROCESO,
+            fecha_inicio=ahora,
+            latido=ahora,
+            intentos=F('intentos') + 1,
+        )
+        if reclamada:
+            return Tarea.objects.get(pk=pk)
+    return None
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea ya reclamada y persiste el resultado o el error"""
+    manejador = registry.obtener_manejador(tarea.nombre)
+    if manejador is None:
+        _marcar_fallida(tarea, f"No existe una tarea registrada con el nombre '{tarea.nombre}'")
+        return tarea
+
+    func, _ = manejador
+    logger.info(f"Ejecutando tarea {tarea.nombre} ({tarea.id}), intento {tarea.intentos}")
+    try:
+        with _latidos(tarea):
+            resultado = func(tarea, **(tarea.parametros or {}))
+    except ValidationError as e:
+        # Datos inválidos: reintentar daría el mismo error
+        logger.warning(f"Tarea {tarea.nombre} ({tarea.id}) rechazada: {'; '.join(e.messages)}")
+        _marcar_fallida(tarea, '; '.join(e.messages))
+        tarea.refresh_from_db()
+        return tarea
+    except Exception as e:
+        logger.error(f"Error en tarea {tarea.nombre} ({tarea.id}): {str(e)}", exc_info=True)
+        if tarea.intentos < tarea.max_intentos:
+            espera = ESPERA_REINTENTO * (2 ** (tarea.intentos - 1))
+            Tarea.objects.filter(pk=tarea.pk).update(
+                estado=Tarea.PENDIENTE,
+                programada_para=timezone.now() + timedelta(seconds=espera),
+                error=str(e),
+            )
+        else:
+            _marcar_fallida(tarea, traceback.format_exc())
+        tarea.refresh_from_db()
+        return tarea
+
+    tarea.resultado = resultado
+    tarea.estado = Tarea.COMPLETADA
+    tarea.progreso = 100
+    tarea.error = ''
+    tarea.fecha_fin = timezone.now()
+    tarea.save(update_fields=['resultado', 'estado', 'progreso', 'error', 'fecha_fin'])
+    logger.info(f"Tarea completada: {tarea.nombre} ({tarea.id})")
+    return tarea
+
+
+@contextmanager
+def _latidos(tarea):
+    """Renueva el latido de `tarea` cada INTERVALO_LATIDO segundos mientras dura el bloque"""
+    detener = threading.Event()
+
+    def latir():
+        try:
+            while not detener.wait(INTERVALO_LATIDO):
+                Tarea.objects.filter(pk=tarea.pk, estado=Tarea.EN_PROCESO).update(latido=timezone.now())
+        except Exception as e:
+            logger.warning(f"No se pudo renovar el latido de la tarea {tarea.id}: {str(e)}")
+        finally:
+            # El hilo tiene su propia conexión a la base de datos
+            connection.close()
+
+    hilo = threading.Thread(target=latir, name=f"latido-{tarea.id}", daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def _marcar_fallida(tarea, error):
+    Tarea.objects.filter(pk=tarea.pk).update(
+        estado=Tarea.FALLIDA,
+        error=error,
+        fecha_fin=timezone.now(),
+    )
+
+
+def liberar_bloqueadas(minutos):
+    """
+    Devuelve a pendiente las tareas en proceso sin latido hace más de `minutos`
+    (worker detenido a mitad de la ejecución); una tarea larga que sigue viva no
+    se toca. Retorna cuántas se liberaron.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    # Las filas anteriores al latido solo tienen fecha de inicio
+    sin_latido = Q(latido__lt=limite) | Q(latido__isnull=True, fecha_inicio__lt=limite)
+    liberadas = Tarea.objects.filter(
+        sin_latido,
+        estado=Tarea.EN_PROCESO,
+        intentos__lt=F('max_intentos'),
+    ).update(estado=Tarea.PENDIENTE, programada_para=timezone.now())
+    Tarea.objects.filter(
+        sin_latido,
+        estado=Tarea.EN_PROCESO,
+    ).update(estado=Tarea.FALLIDA, error='Tiempo de ejecución excedido', fecha_fin=timezone.now())
+    return liberadas
+
+
+def procesar_pendientes(max_tareas=None):
+    """Ejecuta tareas hasta vaciar la cola (o hasta `max_tareas`). Retorna cuántas procesó"""
+    procesadas = 0
+    while max_tareas is None or procesadas < max_tareas:
+        tarea = reclamar_siguiente()
+        if tarea is None:
+            break
+        ejecutar(tarea)
+        procesadas += 1
+    return procesadas